@@ -0,0 +1,369 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Optional, List, Dict
+
+# 生成する試合の期間とシーズン（前半 S1、後半 S2）
+START_DATE = datetime(2025, 1, 1)
+DAYS = 60
+SEASON_SPLIT_DAY = 30
+
+
+def generate_database(matches: int, users: int, mirror_rate: float, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db に分析用の試合履歴を生成
+
+    mirror_rate の割合で、user2 が user1 と同じクラス組合せ・選択クラスのミラー対戦にする。
+    クラス未登録（NULL）の古い形式の試合も少し混ぜる。
+    """
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    from models.snapshot import match_date_to_epoch
+    from config.settings import VALID_CLASSES
+
+    random.seed(seed)
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points) "
+        "VALUES (?, ?, ?, ?, 1500, 1500, 0, 0, 0, 0, 0, 0, 1, 100)",
+        [(i, str(100000 + i), f"user{i}", str(i)) for i in range(1, users + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO beyond_season (season_name, start_date) VALUES (?, ?)",
+        [('S1', START_DATE.strftime('%Y-%m-%d %H:%M:%S')),
+         ('S2', (START_DATE + timedelta(days=SEASON_SPLIT_DAY)).strftime('%Y-%m-%d %H:%M:%S'))]
+    )
+
+    rows = []
+    for _ in range(matches):
+        user1_id, user2_id = random.sample(range(1, users + 1), 2)
+        user1_pair = random.sample(VALID_CLASSES, 2)
+        user1_selected = random.choice(user1_pair)
+        if random.random() < mirror_rate:
+            user2_pair = random.sample(user1_pair, 2)
+            user2_selected = user1_selected
+        else:
+            user2_pair = random.sample(VALID_CLASSES, 2)
+            user2_selected = random.choice(user2_pair)
+        if random.random() < 0.02:
+            user2_pair, user2_selected = [None, None], None
+
+        played_at = START_DATE + timedelta(seconds=random.randrange(DAYS * 86400))
+        match_date = played_at.strftime('%Y-%m-%d %H:%M:%S')
+        season_name = 'S1' if played_at < START_DATE + timedelta(days=SEASON_SPLIT_DAY) else 'S2'
+        winner_id, loser_id = random.choice([(user1_id, user2_id), (user2_id, user1_id)])
+        rows.append((
+            user1_id, user2_id, match_date, match_date_to_epoch(match_date), season_name,
+            user1_pair[0], user1_pair[1], user2_pair[0], user2_pair[1],
+            winner_id, loser_id, user1_selected, user2_selected
+        ))
+
+    conn.executemany(
+        "INSERT INTO beyond_match_history (user1_id, user2_id, match_date, match_epoch, season_name, "
+        "user1_class_a, user1_class_b, user2_class_a, user2_class_b, user1_rating_change, user2_rating_change, "
+        "winner_user_id, loser_user_id, before_user1_rating, before_user2_rating, after_user1_rating, "
+        "after_user2_rating, user1_selected_class, user2_selected_class, user1_stay_flag, user2_stay_flag) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?, ?, 1500, 1500, 1500, 1500, ?, ?, 0, 0)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_date_condition(MatchHistory, start_date: Optional[str], end_date: Optional[str]):
+    """従来の日付範囲の条件（match_date の文字列比較、未指定の端は絞り込まない）"""
+    from sqlalchemy import and_, true
+
+    conditions = []
+    if start_date:
+        conditions.append(MatchHistory.match_date >= start_date)
+    if end_date:
+        conditions.append(MatchHistory.match_date <= end_date)
+    return and_(true(), *conditions)
+
+
+def legacy_analysis_data(session, selected_classes: List[str], season_name: Optional[str] = None,
+                         date_range: Optional[tuple] = None) -> List[Dict]:
+    """従来の投げられたクラスの分析（全試合を読み込んで Python のループで集計）"""
+    from config.database import MatchHistory
+    from config.settings import VALID_CLASSES
+    from sqlalchemy import or_, and_
+
+    query = session.query(MatchHistory).filter(MatchHistory.winner_user_id.isnot(None))
+    if season_name:
+        query = query.filter(MatchHistory.season_name == season_name)
+    elif date_range:
+        query = query.filter(legacy_date_condition(MatchHistory, *date_range))
+
+    if len(selected_classes) == 1:
+        class_name = selected_classes[0]
+        query = query.filter(or_(
+            MatchHistory.user1_selected_class == class_name,
+            MatchHistory.user2_selected_class == class_name
+        ))
+    else:
+        class1, class2 = selected_classes
+        query = query.filter(or_(
+            and_(MatchHistory.user1_class_a == class1, MatchHistory.user1_class_b == class2),
+            and_(MatchHistory.user1_class_a == class2, MatchHistory.user1_class_b == class1),
+            and_(MatchHistory.user2_class_a == class1, MatchHistory.user2_class_b == class2),
+            and_(MatchHistory.user2_class_a == class2, MatchHistory.user2_class_b == class1)
+        ))
+
+    if len(selected_classes) == 1:
+        class_name = selected_classes[0]
+        opponent_stats = {cls: {'total_matches': 0, 'opponent_wins': 0, 'my_wins': 0} for cls in VALID_CLASSES}
+        for match in query.all():
+            # 指定クラスを選択した側を自分とする（user1優先）
+            my_user_id = opponent_selected_class = None
+            if match.user1_selected_class == class_name:
+                my_user_id, opponent_selected_class = match.user1_id, match.user2_selected_class
+            elif match.user2_selected_class == class_name:
+                my_user_id, opponent_selected_class = match.user2_id, match.user1_selected_class
+
+            if opponent_selected_class and opponent_selected_class in opponent_stats:
+                stats = opponent_stats[opponent_selected_class]
+                stats['total_matches'] += 1
+                if match.winner_user_id == my_user_id:
+                    stats['my_wins'] += 1
+                else:
+                    stats['opponent_wins'] += 1
+
+        keys = [(cls, cls, cls) for cls in VALID_CLASSES]
+    else:
+        class_set = set(selected_classes)
+        opponent_stats = {}
+        for combo in combinations(VALID_CLASSES, 2):
+            combo = tuple(sorted(combo))
+            for selected_class in combo:
+                opponent_stats[(combo, selected_class)] = {'total_matches': 0, 'opponent_wins': 0, 'my_wins': 0}
+
+        for match in query.all():
+            # 指定組み合わせを登録した側を自分とする（user1優先）
+            user1_class_set = {match.user1_class_a, match.user1_class_b} if match.user1_class_a and match.user1_class_b else set()
+            user2_class_set = {match.user2_class_a, match.user2_class_b} if match.user2_class_a and match.user2_class_b else set()
+            my_user_id = opponent_key = None
+            if user1_class_set == class_set:
+                my_user_id = match.user1_id
+                if match.user2_class_a and match.user2_class_b:
+                    opponent_key = (tuple(sorted([match.user2_class_a, match.user2_class_b])), match.user2_selected_class)
+            elif user2_class_set == class_set:
+                my_user_id = match.user2_id
+                if match.user1_class_a and match.user1_class_b:
+                    opponent_key = (tuple(sorted([match.user1_class_a, match.user1_class_b])), match.user1_selected_class)
+
+            if opponent_key in opponent_stats:
+                stats = opponent_stats[opponent_key]
+                stats['total_matches'] += 1
+                if match.winner_user_id == my_user_id:
+                    stats['my_wins'] += 1
+                else:
+                    stats['opponent_wins'] += 1
+
+        keys = [(key, key[0], key[1]) for key in opponent_stats]
+
+    result = []
+    for key, combo, selected_class in keys:
+        stats = opponent_stats[key]
+        if stats['total_matches'] > 0:
+            result.append({
+                'opponent_class_combo': combo,
+                'opponent_selected_class': selected_class,
+                'total_matches': stats['total_matches'],
+                'opponent_wins': stats['opponent_wins'],
+                'my_wins': stats['my_wins'],
+                'win_rate': (stats['my_wins'] / stats['total_matches']) * 100
+            })
+    return result
+
+
+def legacy_single_class_analysis_data(session, user_id: int, selected_class: str, season_name: Optional[str] = None,
+                                      date_range: Optional[tuple] = None) -> List[Dict]:
+    """従来のユーザーの単一クラス分析（Python のループで集計）
+
+    従来は相手の選択クラスが未設定の試合で KeyError になり結果が空になっていたため、その試合は数えない。
+    """
+    from config.database import MatchHistory
+    from config.settings import VALID_CLASSES
+    from sqlalchemy import or_
+
+    query = session.query(MatchHistory).filter(MatchHistory.winner_user_id.isnot(None))
+    if season_name:
+        query = query.filter(MatchHistory.season_name == season_name)
+    elif date_range:
+        query = query.filter(legacy_date_condition(MatchHistory, *date_range))
+    query = query.filter(or_(
+        MatchHistory.user1_selected_class == selected_class,
+        MatchHistory.user2_selected_class == selected_class
+    ))
+
+    opponent_stats = {cls: {'total_matches': 0, 'opponent_wins': 0, 'my_wins': 0} for cls in VALID_CLASSES}
+    for match in query.all():
+        if match.user1_selected_class == selected_class and match.user1_id == user_id:
+            opponent_class = match.user2_selected_class
+        elif match.user2_selected_class == selected_class and match.user2_id == user_id:
+            opponent_class = match.user1_selected_class
+        else:
+            continue
+        if opponent_class not in opponent_stats:
+            continue
+        stats = opponent_stats[opponent_class]
+        stats['total_matches'] += 1
+        if match.winner_user_id == user_id:
+            stats['my_wins'] += 1
+        else:
+            stats['opponent_wins'] += 1
+
+    return [
+        {
+            'opponent_class': opponent_class,
+            'total_matches': stats['total_matches'],
+            'opponent_wins': stats['opponent_wins'],
+            'my_wins': stats['my_wins'],
+            'win_rate': (stats['my_wins'] / stats['total_matches']) * 100
+        }
+        for opponent_class, stats in opponent_stats.items() if stats['total_matches'] > 0
+    ]
+
+
+# 比較する期間（表示名, シーズン名, 日付範囲）
+PERIODS = [
+    ("全期間", None, None),
+    ("シーズンS1", 'S1', None),
+    ("日付（日の境界）", None, ('2025-01-10 00:00:00', '2025-02-05 23:59:59')),
+    ("日付（開始のみ日付）", None, ('2025-01-10', '2025-02-05 23:59:59')),
+    ("日付（終了のみ）", None, (None, '2025-01-20 23:59:59')),
+    ("日付（時刻指定）", None, ('2025-01-10 12:34:56', '2025-02-05 08:00:00')),
+]
+
+
+def analysis_cases():
+    """投げられたクラスの分析で比較する条件（期間 × 単体クラス・2クラスの組み合わせ）の一覧"""
+    from config.settings import VALID_CLASSES
+
+    class_sets = [[cls] for cls in VALID_CLASSES] + [list(pair) for pair in combinations(VALID_CLASSES, 2)]
+    return [
+        (period_label, selected_classes, season_name, date_range)
+        for period_label, season_name, date_range in PERIODS
+        for selected_classes in class_sets
+    ]
+
+
+def user_cases(users: int, samples: int, seed: int):
+    """ユーザーの単一クラス分析で比較する条件（期間 × ユーザー × クラス）の一覧"""
+    from config.settings import VALID_CLASSES
+
+    rng = random.Random(seed)
+    user_ids = rng.sample(range(1, users + 1), min(samples, users))
+    return [
+        (period_label, user_id, selected_class, season_name, date_range)
+        for period_label, season_name, date_range in PERIODS
+        for user_id in user_ids
+        for selected_class in VALID_CLASSES
+    ]
+
+
+def timed(call):
+    """呼び出しの結果と実行時間（ミリ秒）を返す"""
+    started = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    """対戦クラス分析の従来の Python ループと現在の集計（集計テーブル・スナップショット）の結果と時間を比較"""
+    parser = argparse.ArgumentParser(description="対戦クラス分析の従来の集計と現在の集計の結果・実行時間を比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--matches', type=int, default=20000, help="生成する試合数")
+    parser.add_argument('--users', type=int, default=200, help="生成するユーザー数")
+    parser.add_argument('--mirror-rate', type=float, default=0.2, help="ミラー対戦の割合")
+    parser.add_argument('--user-samples', type=int, default=5, help="ユーザー別の分析で比較するユーザー数")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='analysis_parity_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.matches, args.users, args.mirror_rate, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（{args.matches}試合, ミラー対戦 {args.mirror_rate:.0%}）")
+
+    from config.database import get_session
+    from models.matchup import MatchupModel
+    from models.snapshot import get_match_snapshot
+    from viewmodels.record_vm import RecordViewModel
+
+    if not MatchupModel().ensure_ready():
+        raise SystemExit("クラス相性集計テーブルを準備できませんでした")
+    if not get_match_snapshot().ensure_loaded():
+        raise SystemExit("分析用スナップショットを準備できませんでした")
+
+    record_vm = RecordViewModel()
+    season_ids = {season['season_name']: season['id'] for season in record_vm.season_model.get_all_seasons()}
+    session = get_session()
+    mismatches = 0
+    # 表示名 → [件数, 従来(ms), 現在(ms)]
+    timings = {}
+
+    def compare(label, case_label, legacy_call, current_call):
+        nonlocal mismatches
+        legacy, legacy_ms = timed(legacy_call)
+        session.expunge_all()
+        current, current_ms = timed(current_call)
+        totals = timings.setdefault(label, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += legacy_ms
+        totals[2] += current_ms
+        if legacy != current:
+            mismatches += 1
+            print(f"不一致: {label} {case_label}")
+            print(f"  従来: {legacy}")
+            print(f"  現在: {current}")
+
+    try:
+        for period_label, selected_classes, season_name, date_range in analysis_cases():
+            case_label = f"{period_label} {'+'.join(selected_classes)}"
+            legacy_call = lambda: legacy_analysis_data(session, selected_classes, season_name, date_range)
+            compare("クラス分析（集計テーブル）", case_label, legacy_call,
+                    lambda: record_vm._get_analysis_data(selected_classes, season_name, date_range))
+            compare("クラス分析（試合履歴の走査）", case_label, legacy_call,
+                    lambda: record_vm._scan_analysis_data(selected_classes, season_name, date_range))
+
+        for period_label, user_id, selected_class, season_name, date_range in user_cases(
+                args.users, args.user_samples, args.seed):
+            case_label = f"{period_label} user{user_id} {selected_class}"
+            season_id = season_ids.get(season_name) if season_name else None
+            compare("ユーザー別クラス分析（スナップショット）", case_label,
+                    lambda: legacy_single_class_analysis_data(session, user_id, selected_class, season_name, date_range),
+                    lambda: record_vm._get_single_class_analysis_data(user_id, selected_class, season_id, date_range))
+    finally:
+        session.close()
+
+    print()
+    print(f"{'分析':<28} {'件数':>6} {'従来(ms/件)':>12} {'現在(ms/件)':>12} {'高速化':>8}")
+    for label, (count, legacy_ms, current_ms) in timings.items():
+        speedup = legacy_ms / current_ms if current_ms else float('inf')
+        print(f"{label:<28} {count:>6} {legacy_ms / count:>12.2f} {current_ms / count:>12.2f} {speedup:>7.1f}x")
+    print()
+    print(f"不一致: {mismatches}件")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
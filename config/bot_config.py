@@ -9,7 +9,7 @@ from config.settings import (
     WELCOME_CHANNEL_ID, PROFILE_CHANNEL_ID, RANKING_CHANNEL_ID,
     PAST_RANKING_CHANNEL_ID, RATING_UPDATE_CHANNEL_ID, RECORD_CHANNEL_ID, PAST_RECORD_CHANNEL_ID,
     LAST_50_MATCHES_RECORD_CHANNEL_ID, MATCHING_CHANNEL_ID,
-    COMMAND_CHANNEL_ID, JST
+    COMMAND_CHANNEL_ID, JST, BACKUP_INTERVAL_HOURS
 )
 from viewmodels.matchmaking_vm import MatchmakingViewModel, ResultViewModel, CancelViewModel
 from viewmodels.ranking_vm import RankingViewModel
@@ -18,6 +18,7 @@ from views.ranking_view import RankingView, RankingUpdateView, PastRankingButton
 from views.user_view import RegisterView, ProfileView, NameChangeView, StayFunctionView, PremiumView, AchievementButtonView, NameChangeModal, check_premium_expiry, password_manager
 from views.record_view import CurrentSeasonRecordView, PastSeasonRecordView, Last50RecordView, DetailedRecordView
 from models.base import db_manager
+from models.writer import get_database_writer
 from utils.helpers import safe_purge_channel, safe_send_message
 from utils.helpers import safe_create_thread, safe_add_user_to_thread, assign_role
 
@@ -67,6 +68,28 @@ def create_bot_1():
         except Exception as e:
             logging.error(f"Error in daily_premium_reduction: {e}")
     
+    @tasks.loop(hours=BACKUP_INTERVAL_HOURS)
+    async def scheduled_backup():
+        """定期的にデータベースをオンラインバックアップし、古いバックアップを削除"""
+        try:
+            from models.backup import DatabaseBackup
+            result = await DatabaseBackup().run_scheduled()
+            logging.info(
+                f"💾 Scheduled backup completed: {result['file_path']} "
+                f"({result['pages_copied']} pages in {result['elapsed']:.2f}s, removed {len(result['removed'])})"
+            )
+        except Exception as e:
+            logging.error(f"Error in scheduled_backup: {e}")
+
+    @scheduled_backup.before_loop
+    async def before_scheduled_backup():
+        """最新のバックアップから BACKUP_INTERVAL_HOURS 経過するまで初回を待つ（再起動のたびにバックアップしない）"""
+        from models.backup import DatabaseBackup
+        delay = DatabaseBackup().seconds_until_due(BACKUP_INTERVAL_HOURS)
+        if delay > 0:
+            logging.info(f"Next scheduled backup in {delay / 3600:.1f}h")
+            await asyncio.sleep(delay)
+    
     @bot.event
     async def on_ready():
         """Bot1の起動時処理"""
@@ -208,6 +231,10 @@ def create_bot_1():
         daily_premium_reduction.start()
         logging.info("Daily premium reduction task started")
 
+    if not scheduled_backup.is_running():
+        scheduled_backup.start()
+        logging.info("Scheduled backup task started")
+
     @bot.event
     async def on_member_join(member: discord.Member):
         """メンバー参加時の処理"""
@@ -344,12 +371,17 @@ def create_bot_1():
             user1_rating, user2_rating = loser_rating, winner_rating
             user1_selected_class, user2_selected_class = loser_class, winner_class
         
-        # 試合結果を確定（新形式）
-        result = result_vm.finalize_match_with_classes(
-            user1_id, user2_id, user1_won, user2_won,
-            user1_rating, user2_rating,
-            user1_selected_class, user2_selected_class
-        )
+        # 試合結果を確定（新形式、失敗した場合は試合記録・ユーザー統計とも取り消される）
+        try:
+            result = await get_database_writer().submit(
+                result_vm.finalize_match_with_classes,
+                user1_id, user2_id, user1_won, user2_won,
+                user1_rating, user2_rating,
+                user1_selected_class, user2_selected_class
+            )
+        except Exception as e:
+            logging.error(f"Error finalizing match by admin: {e}")
+            result = {'success': False, 'message': '試合結果の確定に失敗しました。'}
         
         if result['success']:
             # ロールを削除
@@ -478,7 +510,7 @@ def create_bot_1():
             return
         
         # 信用ポイントを減点
-        new_points = user_model.update_trust_points(str(user.id), -points)
+        new_points = await get_database_writer().submit(user_model.update_trust_points, str(user.id), -points)
         if new_points is not None:
             await ctx.respond(f"{user.display_name} さんに {points} ポイントの減点が適用されました。現在の信用ポイント: {new_points}")
             
@@ -579,6 +611,200 @@ def create_bot_1():
             import traceback
             logging.error(traceback.format_exc())
     
+    @bot.slash_command(
+        name="replay_ratings",
+        description="試合履歴からシーズンのレート・勝敗数を再計算します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def replay_ratings(ctx: discord.ApplicationContext, apply: bool = False, season_name: str = None):
+        """試合履歴を時系列順に再生し、差分のある試合・ユーザーを更新（apply=False の場合は確認のみ）"""
+        from models.rating import RatingReplayEngine
+
+        await ctx.response.defer(ephemeral=True)
+
+        try:
+            if apply:
+                # 書き戻しは書き込みタスクで実行し、キューに並んだ他の書き込みと直列化する
+                summary = await get_database_writer().submit(
+                    RatingReplayEngine().run, season_name=season_name, dry_run=False
+                )
+            else:
+                # 再生の計算でイベントループを止めないよう別スレッドで実行
+                loop = asyncio.get_running_loop()
+                summary = await loop.run_in_executor(None, RatingReplayEngine().run, season_name, True)
+            mode = "反映しました" if apply else "確認のみ（apply:True で反映）"
+            await ctx.followup.send(
+                f"**🔁 レート再計算: {summary['season_name']}**\n"
+                f"試合数: {summary['matches']} / ユーザー数: {summary['users']}\n"
+                f"差分のある試合: {summary['changed_matches']}件\n"
+                f"差分のあるユーザー: {summary['changed_users']}人\n"
+                f"処理時間: {summary['elapsed']:.2f}秒\n"
+                f"{mode}",
+                ephemeral=True
+            )
+        except ValueError as e:
+            await ctx.followup.send(f"エラー: {e}", ephemeral=True)
+        except Exception as e:
+            await ctx.followup.send(f"❌ Error during rating replay: {e}", ephemeral=True)
+            logging.error(f"Error in replay_ratings: {e}")
+            import traceback
+            logging.error(traceback.format_exc())
+
+    @bot.slash_command(
+        name="archive_season",
+        description="終了したシーズンの試合履歴をアーカイブファイルへ移動します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def archive_season(ctx: discord.ApplicationContext, season_name: str):
+        """終了したシーズンの試合履歴を読み取り専用のアーカイブファイルへ移動"""
+        from models.archive import SeasonArchiveModel
+
+        await ctx.response.defer(ephemeral=True)
+
+        try:
+            # ファイルコピーでイベントループを止めないよう別スレッドで実行
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, SeasonArchiveModel().archive_season, season_name)
+            await ctx.followup.send(
+                f"**🗄️ シーズンアーカイブ: {result['season_name']}**\n"
+                f"移動した試合数: {result['match_count']}件\n"
+                f"ファイル: {result['file_path']}\n"
+                f"処理時間: {result['elapsed']:.2f}秒",
+                ephemeral=True
+            )
+        except ValueError as e:
+            await ctx.followup.send(f"エラー: {e}", ephemeral=True)
+        except Exception as e:
+            await ctx.followup.send(f"❌ Error during season archive: {e}", ephemeral=True)
+            logging.error(f"Error in archive_season: {e}")
+            import traceback
+            logging.error(traceback.format_exc())
+
+    @bot.slash_command(
+        name="backup_database",
+        description="稼働中のデータベースをオンラインでバックアップします",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def backup_database(ctx: discord.ApplicationContext):
+        """オンラインバックアップAPIでバックアップを作成し、所要時間とコピーしたページ数を表示"""
+        from models.backup import DatabaseBackup
+
+        await ctx.response.defer(ephemeral=True)
+
+        try:
+            result = await DatabaseBackup().run_scheduled()
+            await ctx.followup.send(
+                f"**💾 データベースバックアップ**\n"
+                f"ファイル: {result['file_path']}（{result['size_bytes'] / 1024 / 1024:.1f}MB）\n"
+                f"コピーしたページ数: {result['pages_copied']} / {result['total_pages']}"
+                f"（{result['steps']}ステップ, やり直し {result['restarts']}回）\n"
+                f"処理時間: {result['elapsed']:.2f}秒（コピー {result['copy_elapsed']:.2f}秒）\n"
+                f"削除した古いバックアップ: {len(result['removed'])}件",
+                ephemeral=True
+            )
+        except Exception as e:
+            await ctx.followup.send(f"❌ Error during backup: {e}", ephemeral=True)
+            logging.error(f"Error in backup_database: {e}")
+
+    @bot.slash_command(
+        name="cache_stats",
+        description="プロセス内キャッシュのヒット率を表示します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def cache_stats(ctx: discord.ApplicationContext):
+        """ユーザー・ページ描画・終了シーズンの各キャッシュの統計を表示"""
+        from models.user import user_cache
+        from models.season import closed_season_cache
+        from utils.helpers import rendered_page_cache
+
+        stats = user_cache.stats()
+        lines = [
+            "**📊 キャッシュ統計**",
+            f"ユーザー: {stats['size']}/{stats['maxsize']}件, ヒット {stats['hits']}, ミス {stats['misses']}, "
+            f"ヒット率 {stats['hit_rate']:.1%}, 破棄 {stats['invalidations']}回"
+        ]
+        for label, cache in (("ページ描画", rendered_page_cache), ("終了シーズン", closed_season_cache)):
+            lookups = cache.hits + cache.misses
+            hit_rate = cache.hits / lookups if lookups else 0.0
+            lines.append(f"{label}: ヒット {cache.hits}, ミス {cache.misses}, ヒット率 {hit_rate:.1%}")
+        await ctx.respond("\n".join(lines), ephemeral=True)
+
+    @bot.slash_command(
+        name="db_writer_stats",
+        description="書き込みタスクの待ち時間とバッチサイズの分布を表示します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def db_writer_stats(ctx: discord.ApplicationContext):
+        """書き込みタスクの件数・待ち時間・バッチサイズのヒストグラムを表示"""
+        stats = get_database_writer().stats()
+        
+        def format_histogram(histogram):
+            return "\n".join(f"`{label:>6}` {count}" for label, count in histogram.items() if count)
+        
+        await ctx.respond(
+            f"**✍️ 書き込みタスク**\n"
+            f"コマンド: {stats['commands']}件（失敗 {stats['failed_commands']}）, "
+            f"コミット: {stats['batches']}回（失敗 {stats['failed_batches']}）, 待機中: {stats['queued']}件\n"
+            f"平均待ち時間: {stats['mean_latency_ms']:.1f}ms, 平均バッチサイズ: {stats['mean_batch_size']:.1f}\n"
+            f"**待ち時間 (ms)**\n{format_histogram(stats['latency_ms']) or 'なし'}\n"
+            f"**バッチサイズ**\n{format_histogram(stats['batch_size']) or 'なし'}",
+            ephemeral=True
+        )
+
+    @bot.slash_command(
+        name="query_stats",
+        description="実行時間の長いSQL・モデル操作と遅いクエリの一覧を表示します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def query_stats_command(
+        ctx: discord.ApplicationContext,
+        order_by: discord.Option(str, "並び順", choices=["total_ms", "mean_ms", "max_ms", "count"], default="total_ms"),
+        limit: discord.Option(int, "表示件数", min_value=1, max_value=50, default=10),
+        reset: discord.Option(bool, "表示後に集計をリセットする", default=False)
+    ):
+        """SQLごと・モデル操作ごとの上位と直近の遅いクエリ（実行計画付き）をテキストファイルで送信"""
+        import io
+        from models.query_stats import query_stats
+
+        top = query_stats.top_statements(3, order_by)
+        summary = "\n".join(
+            f"`{row['total_ms']:.0f}ms / {row['count']}回 / 最大 {row['max_ms']:.0f}ms` {row['caller']}"
+            for row in top
+        )
+        slow_count = len(query_stats.slow_queries)
+        report = query_stats.format_report(limit, order_by)
+        if reset:
+            query_stats.reset()
+
+        await ctx.respond(
+            f"**⏱️ クエリ統計**（遅いクエリ: {slow_count}件）\n{summary or 'なし'}",
+            file=discord.File(io.BytesIO(report.encode('utf-8')), filename="query_stats.txt"),
+            ephemeral=True
+        )
+
+    @bot.slash_command(
+        name="reload_deck_classes",
+        description="デッキクラスの一覧をデータベースから読み込み直します",
+        default_member_permissions=discord.Permissions(administrator=True)
+    )
+    @commands.has_permissions(administrator=True)
+    async def reload_deck_classes(ctx: discord.ApplicationContext):
+        """beyond_deck_class の変更後にデッキクラスの参照データと選択肢を作り直す"""
+        from models.deck_class import deck_class_registry
+
+        class_names = deck_class_registry.reload()
+        await ctx.respond(
+            f"デッキクラスを読み込み直しました（{len(class_names)}件）: {', '.join(class_names)}\n"
+            f"※ 表示中のクラス選択メニューはチャンネルの再設定後に反映されます",
+            ephemeral=True
+        )
+
     # 名前変更コマンド（削除済み - プロフィールチャンネルのボタンを使用）
     # 名前変更はプロフィールチャンネルの「名前変更」ボタンから行えます
     
@@ -621,6 +847,9 @@ def create_bot_1():
                 # シーズン統計を確定
                 finalize_result = season_model.finalize_season(ended_season['id'])
                 
+                # 確定したシーズンのランキングを終了シーズンキャッシュに載せる
+                RankingViewModel().warm_past_season_cache()
+                
                 # 全ユーザーをリセット
                 reset_count = user_model.reset_users_for_new_season()
                 
@@ -777,7 +1006,7 @@ def create_bot_1():
             user_model = UserModel()
             
             # Premium日数を追加
-            success = user_model.add_premium_days(user_id, days)
+            success = await get_database_writer().submit(user_model.add_premium_days, user_id, days)
             if not success:
                 await ctx.respond("❌ ユーザーが見つからないか、Premium付与に失敗しました。", ephemeral=True)
                 return
@@ -824,7 +1053,7 @@ def create_bot_1():
                 return
             
             # Premium日数を0に設定
-            success = user_model.set_premium_days(user_id, 0)
+            success = await get_database_writer().submit(user_model.set_premium_days, user_id, 0)
             if not success:
                 await ctx.respond("❌ Premium取り消しに失敗しました。", ephemeral=True)
                 return
@@ -866,7 +1095,7 @@ def create_bot_1():
             user_model = UserModel()
             
             # Premium日数を設定
-            success = user_model.set_premium_days(user_id, days)
+            success = await get_database_writer().submit(user_model.set_premium_days, user_id, days)
             if not success:
                 await ctx.respond("❌ ユーザーが見つからないか、設定に失敗しました。", ephemeral=True)
                 return
@@ -959,6 +1188,12 @@ def create_bot_2():
         except Exception as e:
             logging.error(f"❌ Failed to sync Bot2 commands: {e}")
         
+        # 終了シーズンのランキングを事前にキャッシュ
+        try:
+            ranking_vm.warm_past_season_cache()
+        except Exception as e:
+            logging.error(f"❌ Failed to warm closed season cache: {e}")
+        
         # チャンネルの初期化
         global_ranking_view = await setup_bot2_channels(bot, ranking_vm)
         
@@ -1122,6 +1357,10 @@ def create_bots():
     # 設定の検証
     validate_config()
     
+    # SQLの実行時間の計測を開始（/query_stats で確認）
+    from models.query_stats import install_query_stats
+    install_query_stats()
+    
     bot1 = create_bot_1()
     bot2 = create_bot_2()
     
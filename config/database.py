@@ -1,11 +1,145 @@
-from sqlalchemy import create_engine
+import os
+import sqlite3
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, MetaData, Table, Column
 from sqlalchemy.ext.automap import automap_base
-from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker, aliased
 import logging
 
+from config.settings import QUERY_CACHE_SIZE, STATEMENT_CACHE_SIZE
+
 # データベース設定
 db_path = 'db/beyond_ratings.db'
-engine = create_engine(f'sqlite:///{db_path}', echo=False)
+engine = create_engine(
+    f'sqlite:///{db_path}',
+    echo=False,
+    query_cache_size=QUERY_CACHE_SIZE,
+    connect_args={'cached_statements': STATEMENT_CACHE_SIZE}
+)
+
+# シーズンアーカイブ設定
+SEASON_ARCHIVE_TABLE = 'beyond_season_archive'  # アーカイブ済みシーズンの一覧
+MATCH_HISTORY_ALL_VIEW = 'beyond_match_history_all'  # 現行テーブルとアーカイブを結合した全履歴ビュー
+
+@event.listens_for(engine, "connect")
+def attach_season_archives(dbapi_connection, connection_record):
+    """接続ごとにアーカイブ済みシーズンのファイルをATTACHし、全履歴のTEMPビューを作成
+    
+    アーカイブが1件もない場合も、ビューは現行テーブルのみを参照する形で作成する。
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        main_columns = [row[1] for row in cursor.execute("PRAGMA main.table_info(beyond_match_history)")]
+        if not main_columns:
+            return
+        
+        has_catalog = cursor.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (SEASON_ARCHIVE_TABLE,)
+        ).fetchone()
+        archives = cursor.execute(
+            f"SELECT season_name, file_path FROM main.{SEASON_ARCHIVE_TABLE} ORDER BY archived_at"
+        ).fetchall() if has_catalog else []
+        
+        selects = [f"SELECT {', '.join(main_columns)} FROM main.beyond_match_history"]
+        for index, (season_name, file_path) in enumerate(archives):
+            if not os.path.exists(file_path):
+                logging.error(f"Season archive file not found for {season_name}: {file_path}")
+                continue
+            
+            schema = f"season_archive_{index}"
+            try:
+                cursor.execute(f"ATTACH DATABASE ? AS {schema}", (file_path,))
+            except sqlite3.Error as e:
+                logging.error(f"Failed to attach season archive {season_name}: {e}")
+                continue
+            
+            # アーカイブ後に現行テーブルへ追加された列は NULL として結合
+            archive_columns = {row[1] for row in cursor.execute(f"PRAGMA {schema}.table_info(beyond_match_history)")}
+            projected = ', '.join(
+                column if column in archive_columns else f"NULL AS {column}" for column in main_columns
+            )
+            selects.append(f"SELECT {projected} FROM {schema}.beyond_match_history")
+        
+        cursor.execute(f"DROP VIEW IF EXISTS temp.{MATCH_HISTORY_ALL_VIEW}")
+        cursor.execute(f"CREATE TEMP VIEW {MATCH_HISTORY_ALL_VIEW} AS {' UNION ALL '.join(selects)}")
+    except sqlite3.Error as e:
+        logging.error(f"Failed to prepare match history view: {e}")
+    finally:
+        cursor.close()
+
+def migrate_match_epoch_column(engine):
+    """試合履歴に整数エポック列（match_epoch）とインデックスを追加し、未設定の行を埋める
+    
+    automapで列を反映させるため、テーブルのマッピング前に実行する。
+    match_date はJSTの文字列なので、UTCとして解釈した秒数からJSTのオフセットを引く。
+    """
+    from datetime import datetime
+    from sqlalchemy import text
+    from config.settings import JST
+    
+    jst_offset = int(datetime.now(JST).utcoffset().total_seconds())
+    
+    with engine.begin() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(beyond_match_history)"))]
+        if not columns:
+            return
+        
+        if 'match_epoch' not in columns:
+            conn.execute(text("ALTER TABLE beyond_match_history ADD COLUMN match_epoch INTEGER"))
+            logging.info("Added match_epoch column to beyond_match_history")
+        
+        backfilled = conn.execute(text(
+            "UPDATE beyond_match_history "
+            "SET match_epoch = CAST(strftime('%s', substr(match_date, 1, 19)) AS INTEGER) - :offset "
+            "WHERE match_epoch IS NULL AND match_date IS NOT NULL"
+        ), {'offset': jst_offset}).rowcount
+        if backfilled:
+            logging.info(f"Backfilled match_epoch for {backfilled} matches")
+        
+        # 期間指定（全体）とユーザー別の期間指定の両方をインデックスの範囲検索にする
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_beyond_match_history_epoch "
+            "ON beyond_match_history (match_epoch, id)"
+        ))
+        for column in ('user1_id', 'user2_id'):
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_beyond_match_history_{column}_epoch "
+                f"ON beyond_match_history ({column}, match_epoch, id)"
+            ))
+
+try:
+    migrate_match_epoch_column(engine)
+except Exception as e:
+    logging.error(f"Failed to migrate match_epoch column: {e}")
+
+# 書き込み中も読み取りがブロックされないようWALモードにする（ファイルに保存される設定）
+try:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+except Exception as e:
+    logging.error(f"Failed to enable WAL mode: {e}")
+
+# マイグレーション前に作成した接続（列追加前のビューを持つ）を破棄
+engine.dispose()
+
+# 読み取り専用エンジン（ランキング・戦績の表示用、書き込み用の接続プールとは分ける）
+from config.settings import (
+    READ_POOL_SIZE, READ_POOL_MAX_OVERFLOW, READ_STATEMENT_CACHE_SIZE, READ_QUERY_CACHE_SIZE
+)
+read_engine = create_engine(
+    f'sqlite:///file:{db_path}?mode=ro&uri=true',
+    echo=False,
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_POOL_MAX_OVERFLOW,
+    query_cache_size=READ_QUERY_CACHE_SIZE,
+    connect_args={'cached_statements': READ_STATEMENT_CACHE_SIZE}
+)
+event.listen(read_engine, "connect", attach_season_archives)
+
+@event.listens_for(read_engine, "connect")
+def set_query_only(dbapi_connection, connection_record):
+    """TEMPビュー作成後に query_only を有効にし、誤って書き込むSQLをエラーにする"""
+    dbapi_connection.execute("PRAGMA query_only = 1")
 
 Base = automap_base()
 Base.metadata.clear()
@@ -24,6 +158,25 @@ def get_session():
     """新しいセッションを取得"""
     return Session(engine)
 
+def get_read_session():
+    """読み取り専用エンジンのセッションを取得"""
+    return Session(read_engine)
+
+@contextmanager
+def read_snapshot():
+    """読み取り専用セッションを1つの読み取りトランザクション内で使う
+    
+    WALモードでは開始時点のスナップショットを最後まで読み続けるため、複数のクエリにまたがる
+    集計でも途中で確定した試合結果が混ざらず、書き込みをブロックすることもない。
+    """
+    session = get_read_session()
+    try:
+        session.connection().exec_driver_sql("BEGIN")
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
 def get_scoped_session():
     """スコープ付きセッションを取得"""
     return SessionLocal()
@@ -41,6 +194,18 @@ try:
     Season = Base.classes.beyond_season
     UserSeasonRecord = Base.classes.beyond_user_season_record
     
+    # 全シーズン（アーカイブ含む）の試合履歴を読み取るためのエンティティ
+    MatchHistoryAll = aliased(
+        MatchHistory,
+        Table(
+            MATCH_HISTORY_ALL_VIEW, MetaData(),
+            *[Column(column.name, column.type, primary_key=column.primary_key)
+              for column in MatchHistory.__table__.columns]
+        ),
+        adapt_on_names=True,
+        name='MatchHistoryAll'
+    )
+    
     logging.info("Database models mapped successfully")
     
 except Exception as e:
@@ -50,6 +50,53 @@ BASE_RATING_CHANGE = 20
 RATING_DIFF_MULTIPLIER = 0.025
 MAX_RATING_DIFF_FOR_MATCH = 300
 
+# 分析用スナップショット設定
+MATCH_SNAPSHOT_DIR = 'db/match_snapshot'  # 試合履歴の列指向スナップショット保存先
+MATCH_SNAPSHOT_FLUSH_INTERVAL = 64  # 追記をディスクに反映する間隔（試合数、未反映分は起動時の照合で再構築）
+
+# ページ描画キャッシュ設定
+RENDERED_PAGE_CACHE_SIZE = 128  # 描画済みEmbedページの保持数（全View共有）
+
+# ユーザーキャッシュ設定
+USER_CACHE_SIZE = 2048  # discord_id / ユーザーIDで引くユーザー情報の保持数
+
+# 現在のシーズンのキャッシュ設定
+CURRENT_SEASON_CACHE_TTL = 60  # 秒（/start_season・/end_season で即時更新され、期限は他プロセスからの変更に備えた保険）
+
+# 書き込み専用タスクの設定
+DB_WRITER_MAX_BATCH = 64  # 1回のコミットにまとめる書き込みコマンドの最大数
+
+# 書き込み用エンジンの設定
+QUERY_CACHE_SIZE = 1000  # SQLAlchemyのコンパイル済みSQLのキャッシュ数（models.statements の組み立て済みステートメントを含む）
+STATEMENT_CACHE_SIZE = 256  # 接続ごとのSQLiteプリペアドステートメントのキャッシュ数
+
+# 読み取り専用エンジンの設定（ランキング・戦績Bot用）
+READ_POOL_SIZE = 5  # 読み取り専用接続の常時保持数
+READ_POOL_MAX_OVERFLOW = 5  # 混雑時に追加で開く接続数
+READ_STATEMENT_CACHE_SIZE = 256  # 接続ごとのSQLiteプリペアドステートメントのキャッシュ数
+READ_QUERY_CACHE_SIZE = 1000  # SQLAlchemyのコンパイル済みSQLのキャッシュ数
+
+# バックアップ設定
+BACKUP_DIR = 'db/backup'  # 定期バックアップの保存先
+BACKUP_PAGES_PER_STEP = 256  # オンラインバックアップで1ステップにコピーするページ数
+BACKUP_STEP_PAUSE = 0.005  # ステップ間の待ち時間（秒）
+BACKUP_MAX_RESTARTS = 3  # 書き込みによるコピーのやり直しがこの回数を超えたら残りを一括でコピー
+BACKUP_INTERVAL_HOURS = 24  # 定期バックアップの間隔
+BACKUP_RETENTION = 7  # 残す定期バックアップの数
+BACKUP_COMPRESS = True  # gzipで圧縮して保存するか
+BACKUP_COMPRESS_LEVEL = 6  # gzipの圧縮レベル（9は大きなDBで時間がかかりすぎる）
+
+# クエリ計測設定
+SLOW_QUERY_THRESHOLD_MS = 100  # これ以上かかったSQLを実行計画とともに遅いクエリとして記録
+SLOW_QUERY_LOG_SIZE = 100  # 保持する遅いクエリの件数
+QUERY_STATS_MAX_STATEMENTS = 500  # 個別に集計するSQLの種類の上限（超えた分は (other) にまとめる）
+
+# シーズンアーカイブ設定
+SEASON_ARCHIVE_DIR = 'db/archive'  # 終了シーズンの試合履歴を移すSQLiteファイルの保存先
+
+# 終了シーズンキャッシュ設定
+CLOSED_SEASON_CACHE_PATH = 'db/closed_season_cache.json'  # 終了シーズンの一覧・ランキングの保存先（Noneでメモリのみ）
+
 # タイムアウト設定
 MATCHMAKING_TIMEOUT = 60  # マッチング待機タイムアウト（秒）
 RESULT_REPORT_TIMEOUT = 3 * 60 * 60  # 結果報告タイムアウト（3時間）
@@ -115,6 +162,15 @@ def setup_logging():
     root_logger.addHandler(file_handler)
     root_logger.addHandler(error_handler)
     
+    # 遅いクエリ専用ファイルハンドラー（models.query_stats が出力）
+    slow_query_logger = logging.getLogger('SlowQuery')
+    for handler in slow_query_logger.handlers[:]:
+        slow_query_logger.removeHandler(handler)
+    slow_query_handler = logging.FileHandler("logs/slow_query.log", encoding='utf-8')
+    slow_query_handler.setLevel(logging.WARNING)
+    slow_query_handler.setFormatter(formatter)
+    slow_query_logger.addHandler(slow_query_handler)
+    
     # SQLAlchemyのログレベルを調整
     logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
     logging.getLogger('discord').setLevel(logging.INFO)
@@ -58,6 +58,14 @@ class BotManager:
             if not bot.is_closed():
                 logging.info(f"🔌 Closing bot {i}...")
                 await bot.close()
+        
+        # キューに残った書き込みを実行してから終了
+        from models.writer import get_database_writer
+        await get_database_writer().close()
+        
+        # 分析用スナップショットの未反映の追記をディスクに反映
+        from models.snapshot import get_match_snapshot
+        get_match_snapshot().flush()
         logging.info("✅ Cleanup completed")
 
 async def main():
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, Text, Boolean, String, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, Text, Boolean, String, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -11,6 +11,12 @@ Base = declarative_base()
 
 class BeyondUser(Base):
     __tablename__ = 'beyond_user'
+    __table_args__ = (
+        Index('ix_beyond_user_latest_season_matched', 'latest_season_matched'),
+        Index('ux_beyond_user_discord_id', 'discord_id', unique=True),
+        Index('ux_beyond_user_user_name', 'user_name', unique=True),
+        Index('ux_beyond_user_shadowverse_id', 'shadowverse_id', unique=True),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     discord_id = Column(Text)
@@ -66,11 +72,20 @@ class BeyondDeckClass(Base):
 
 class BeyondMatchHistory(Base):
     __tablename__ = 'beyond_match_history'
+    __table_args__ = (
+        Index('ix_beyond_match_history_user1_id_date', 'user1_id', 'match_date', 'id'),
+        Index('ix_beyond_match_history_user2_id_date', 'user2_id', 'match_date', 'id'),
+        Index('ix_beyond_match_history_pair_date', 'user1_id', 'user2_id', 'match_date', 'id'),
+        Index('ix_beyond_match_history_epoch', 'match_epoch', 'id'),
+        Index('ix_beyond_match_history_user1_id_epoch', 'user1_id', 'match_epoch', 'id'),
+        Index('ix_beyond_match_history_user2_id_epoch', 'user2_id', 'match_epoch', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user1_id = Column(Integer, ForeignKey('beyond_user.id'))
     user2_id = Column(Integer, ForeignKey('beyond_user.id'))
     match_date = Column(Text)
+    match_epoch = Column(Integer)  # match_date（JST）のUNIX秒
     season_name = Column(Text)
     user1_class_a = Column(Text)
     user1_class_b = Column(Text)
@@ -105,6 +120,48 @@ class BeyondUserSeasonRecord(Base):
     max_win_streak = Column(Integer, default=0)
 
 
+class BeyondClassMatchup(Base):
+    __tablename__ = 'beyond_class_matchup'
+    __table_args__ = (
+        UniqueConstraint(
+            'season_name', 'match_day',
+            'my_class_a', 'my_class_b', 'my_selected_class',
+            'opp_class_a', 'opp_class_b', 'opp_selected_class'
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    season_name = Column(Text, nullable=False, default='')
+    match_day = Column(Text, nullable=False, default='')
+    my_class_a = Column(Text, nullable=False, default='')
+    my_class_b = Column(Text, nullable=False, default='')
+    my_selected_class = Column(Text, nullable=False, default='')
+    opp_class_a = Column(Text, nullable=False, default='')
+    opp_class_b = Column(Text, nullable=False, default='')
+    opp_selected_class = Column(Text, nullable=False, default='')
+    win_count = Column(Integer, nullable=False, default=0)
+    loss_count = Column(Integer, nullable=False, default=0)
+
+
+class BeyondHeadToHead(Base):
+    __tablename__ = 'beyond_head_to_head'
+    
+    user_low_id = Column(Integer, primary_key=True)
+    user_high_id = Column(Integer, primary_key=True)
+    low_wins = Column(Integer, nullable=False, default=0)
+    high_wins = Column(Integer, nullable=False, default=0)
+    last_match_date = Column(Text, nullable=False, default='')
+
+
+class BeyondSeasonArchive(Base):
+    __tablename__ = 'beyond_season_archive'
+    
+    season_name = Column(Text, primary_key=True)
+    file_path = Column(Text, nullable=False)
+    match_count = Column(Integer, nullable=False, default=0)
+    archived_at = Column(Text, nullable=False)
+
+
 def create_database():
     """空のデータベースとテーブルを作成"""
     Base.metadata.create_all(bind=engine)
@@ -1,12 +1,20 @@
 # models/__init__.py
 """データモデル関連のモジュール"""
 
-from .base import BaseModel, DatabaseManager, db_manager
+from .base import BaseModel, DatabaseManager, db_manager, UnitOfWork, unit_of_work
 from .user import UserModel
 from .season import SeasonModel
 from .match import MatchModel
+from .matchup import MatchupModel
+from .head_to_head import HeadToHeadModel
+from .archive import SeasonArchiveModel
+from .user_search import UserSearchModel
+from .deck_class import DeckClassRegistry, deck_class_registry
+from .read_models import UserRow, MatchRow
 
 __all__ = [
-    'BaseModel', 'DatabaseManager', 'db_manager',
-    'UserModel', 'SeasonModel', 'MatchModel'
+    'BaseModel', 'DatabaseManager', 'db_manager', 'UnitOfWork', 'unit_of_work',
+    'UserModel', 'SeasonModel', 'MatchModel', 'MatchupModel',
+    'HeadToHeadModel', 'SeasonArchiveModel', 'UserSearchModel', 'UserRow', 'MatchRow',
+    'DeckClassRegistry', 'deck_class_registry'
 ]
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import re
+import stat
+import time
+import sqlite3
+from datetime import datetime
+from typing import List, Dict, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from models.base import BaseModel
+from config.database import SEASON_ARCHIVE_TABLE, Season
+from config.settings import JST, SEASON_ARCHIVE_DIR
+
+_CREATE_CATALOG_SQL = f"""
+CREATE TABLE IF NOT EXISTS {SEASON_ARCHIVE_TABLE} (
+    season_name TEXT PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    match_count INTEGER NOT NULL DEFAULT 0,
+    archived_at TEXT NOT NULL
+)
+"""
+
+# アーカイブファイルに作成するインデックス（現行テーブルと同じ検索パターン用）
+_ARCHIVE_INDEX_COLUMNS = {
+    'user1_id_date': ('user1_id', 'match_date', 'id'),
+    'user2_id_date': ('user2_id', 'match_date', 'id'),
+    'pair_date': ('user1_id', 'user2_id', 'match_date', 'id'),
+    'epoch': ('match_epoch', 'id'),
+    'user1_id_epoch': ('user1_id', 'match_epoch', 'id'),
+    'user2_id_epoch': ('user2_id', 'match_epoch', 'id'),
+    'season': ('season_name',),
+}
+
+
+class SeasonArchiveModel(BaseModel):
+    """終了シーズンの試合履歴アーカイブ
+
+    終了したシーズンの試合を beyond_match_history からシーズンごとのSQLiteファイルへ移し、
+    読み取り専用にする。アーカイブは接続ごとにATTACHされ、beyond_match_history_all ビュー
+    （MatchHistoryAll）から現行テーブルと合わせて参照できる。
+    """
+    
+    def _ensure_catalog(self, session: Session):
+        """アーカイブ一覧テーブルを作成（未作成の場合のみ）"""
+        session.execute(text(_CREATE_CATALOG_SQL))
+    
+    def get_archives(self) -> List[Dict[str, Any]]:
+        """アーカイブ済みシーズンの一覧を取得"""
+        def _get_archives(session: Session):
+            self._ensure_catalog(session)
+            rows = session.execute(text(
+                f"SELECT season_name, file_path, match_count, archived_at "
+                f"FROM {SEASON_ARCHIVE_TABLE} ORDER BY archived_at"
+            )).all()
+            return [
+                {
+                    'season_name': row[0],
+                    'file_path': row[1],
+                    'match_count': row[2],
+                    'archived_at': row[3]
+                }
+                for row in rows
+            ]
+        
+        return self.safe_execute(_get_archives) or []
+    
+    def is_archived(self, season_name: str) -> bool:
+        """シーズンがアーカイブ済みかどうか"""
+        return any(archive['season_name'] == season_name for archive in self.get_archives())
+    
+    def archive_season(self, season_name: str) -> Dict[str, Any]:
+        """終了したシーズンの試合履歴をアーカイブファイルへ移動
+        
+        移動は1トランザクションで行い、件数が一致しない場合は何も変更しない。
+        完了後は接続プール（読み取り専用を含む）と書き込みタスクの接続を破棄し、
+        以降の接続でアーカイブがATTACHされるようにする。
+        """
+        from config.database import db_path, engine, read_engine
+        from models.writer import get_database_writer
+        
+        def _get_season(session: Session):
+            season = session.query(Season).filter(Season.season_name == season_name).first()
+            if not season:
+                raise ValueError(f"シーズン '{season_name}' が見つかりません")
+            if season.end_date is None:
+                raise ValueError(f"シーズン '{season_name}' はまだ終了していません")
+            return season.id
+        
+        season_id = self.execute_with_session(_get_season)
+        if self.is_archived(season_name):
+            raise ValueError(f"シーズン '{season_name}' は既にアーカイブ済みです")
+        
+        os.makedirs(SEASON_ARCHIVE_DIR, exist_ok=True)
+        file_path = os.path.join(SEASON_ARCHIVE_DIR, f"season_{season_id}.db")
+        if os.path.exists(file_path):
+            raise ValueError(f"アーカイブファイルが既に存在します: {file_path}")
+        
+        started = time.perf_counter()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            conn.execute("ATTACH DATABASE ? AS archive", (file_path,))
+            
+            # 現行テーブルと同じ定義でアーカイブ側のテーブルを作成
+            table_sql = conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'beyond_match_history'"
+            ).fetchone()[0]
+            table_sql = re.sub(
+                r'^CREATE TABLE\s+("?)beyond_match_history\1', 'CREATE TABLE archive.beyond_match_history',
+                table_sql, count=1
+            )
+            conn.execute(table_sql)
+            columns = [row[1] for row in conn.execute("PRAGMA archive.table_info(beyond_match_history)")]
+            
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(_CREATE_CATALOG_SQL)
+                moved = conn.execute(
+                    "INSERT INTO archive.beyond_match_history SELECT * FROM main.beyond_match_history "
+                    "WHERE season_name = ?", (season_name,)
+                ).rowcount
+                archived = conn.execute(
+                    "SELECT COUNT(*) FROM archive.beyond_match_history"
+                ).fetchone()[0]
+                if archived != moved:
+                    raise RuntimeError(f"Archived row count mismatch: {archived} != {moved}")
+                
+                # 現行テーブルに新しい試合が残らないと、移動後に試合IDが再利用されて重複する
+                archived_max_id, remaining_max_id = conn.execute(
+                    "SELECT (SELECT MAX(id) FROM archive.beyond_match_history), "
+                    "(SELECT MAX(id) FROM main.beyond_match_history WHERE season_name IS NOT ?)",
+                    (season_name,)
+                ).fetchone()
+                if archived_max_id is not None and (remaining_max_id or 0) < archived_max_id:
+                    raise ValueError(
+                        f"シーズン '{season_name}' より後の試合がないため、試合IDの重複を避けるためアーカイブできません"
+                    )
+                
+                conn.execute("DELETE FROM main.beyond_match_history WHERE season_name = ?", (season_name,))
+                conn.execute(
+                    f"INSERT INTO main.{SEASON_ARCHIVE_TABLE} (season_name, file_path, match_count, archived_at) "
+                    f"VALUES (?, ?, ?, ?)",
+                    (season_name, file_path, moved, datetime.now(JST).strftime('%Y-%m-%d %H:%M:%S'))
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            
+            for name, index_columns in _ARCHIVE_INDEX_COLUMNS.items():
+                if all(column in columns for column in index_columns):
+                    conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS archive.ix_beyond_match_history_{name} "
+                        f"ON beyond_match_history ({', '.join(index_columns)})"
+                    )
+            conn.execute("DETACH DATABASE archive")
+        except Exception:
+            conn.close()
+            if not self.is_archived(season_name) and os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        conn.close()
+        
+        # アーカイブは以後変更しないため読み取り専用にする
+        os.chmod(file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        engine.dispose()
+        read_engine.dispose()
+        # 書き込みタスクは接続を保持し続けるため、dispose() では接続し直されない
+        get_database_writer().reset_connection()
+        
+        elapsed = time.perf_counter() - started
+        self.logger.info(f"Archived {moved} matches of season {season_name} to {file_path} in {elapsed:.2f}s")
+        
+        return {
+            'season_name': season_name,
+            'file_path': file_path,
+            'match_count': moved,
+            'elapsed': elapsed
+        }
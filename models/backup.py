@@ -0,0 +1,158 @@
+import os
+import re
+import gzip
+import time
+import shutil
+import sqlite3
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from config.settings import (
+    JST, BACKUP_DIR, BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE,
+    BACKUP_MAX_RESTARTS, BACKUP_RETENTION, BACKUP_COMPRESS, BACKUP_COMPRESS_LEVEL
+)
+
+# 定期バックアップのファイル名（保持数の管理はこの形式のファイルのみ対象）
+_BACKUP_FILE_PATTERN = re.compile(r'^beyond_ratings_\d{8}_\d{6}\.db(\.gz)?$')
+
+
+class _TooManyRestarts(Exception):
+    """バックアップ中の書き込みによる再開が多すぎる場合に中断するための例外"""
+
+
+class DatabaseBackup:
+    """SQLiteのオンラインバックアップAPIによる稼働中のデータベースのバックアップ
+
+    pages_per_step ページずつコピーし、各ステップの間で step_pause 秒待って書き込みや
+    他の読み取りに譲る。途中で他の接続から書き込まれるとSQLiteはコピーを最初からやり直すため、
+    やり直しが max_restarts 回を超えた場合は残りを1ステップでコピーする（WALモードでは
+    その間も書き込みはブロックされない）。
+    """
+
+    def __init__(self, backup_dir: str = BACKUP_DIR):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.backup_dir = backup_dir
+
+    def backup(self, dest_path: Optional[str] = None, pages_per_step: int = BACKUP_PAGES_PER_STEP,
+               compress: bool = BACKUP_COMPRESS, step_pause: float = BACKUP_STEP_PAUSE,
+               max_restarts: int = BACKUP_MAX_RESTARTS) -> Dict[str, Any]:
+        """バックアップを作成し、所要時間・コピーしたページ数などを返す
+
+        dest_path を省略すると backup_dir に日時付きのファイル名で作成する。
+        compress を指定すると gzip で圧縮した .gz ファイルを残す。
+        """
+        from config.database import db_path
+
+        if dest_path is None:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            timestamp = datetime.now(JST).strftime('%Y%m%d_%H%M%S')
+            dest_path = os.path.join(self.backup_dir, f"beyond_ratings_{timestamp}.db")
+        tmp_path = f"{dest_path}.tmp"
+
+        progress = {'steps': 0, 'pages_copied': 0, 'total_pages': 0, 'restarts': 0, 'remaining': None}
+
+        def _on_progress(status, remaining, total):
+            previous = progress['remaining']
+            # 残りページ数が増えた場合は書き込みによりコピーが最初からやり直されている
+            if previous is not None and remaining > previous:
+                progress['restarts'] += 1
+                if progress['restarts'] > max_restarts:
+                    raise _TooManyRestarts()
+                previous = None
+            progress['steps'] += 1
+            progress['pages_copied'] += (total if previous is None else previous) - remaining
+            progress['remaining'] = remaining
+            progress['total_pages'] = total
+            if remaining and step_pause:
+                time.sleep(step_pause)
+
+        started = time.perf_counter()
+        source = sqlite3.connect(db_path)
+        try:
+            target = sqlite3.connect(tmp_path)
+            try:
+                try:
+                    source.backup(target, pages=pages_per_step, progress=_on_progress)
+                except _TooManyRestarts:
+                    self.logger.warning(
+                        f"Backup restarted {progress['restarts']} times due to writes; copying the rest in one step"
+                    )
+                    progress['remaining'] = None
+                    source.backup(target, pages=-1, progress=_on_progress)
+                integrity = target.execute("PRAGMA quick_check").fetchone()[0]
+            finally:
+                target.close()
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            source.close()
+
+        if integrity != 'ok':
+            os.remove(tmp_path)
+            raise RuntimeError(f"Backup failed quick_check: {integrity}")
+
+        copied = time.perf_counter()
+        if compress:
+            output_path = f"{dest_path}.gz"
+            with open(tmp_path, 'rb') as src, gzip.open(f"{output_path}.tmp", 'wb', compresslevel=BACKUP_COMPRESS_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(tmp_path)
+            os.replace(f"{output_path}.tmp", output_path)
+        else:
+            output_path = dest_path
+            os.replace(tmp_path, output_path)
+
+        elapsed = time.perf_counter() - started
+        result = {
+            'file_path': output_path,
+            'elapsed': elapsed,
+            'copy_elapsed': copied - started,
+            'pages_copied': progress['pages_copied'],
+            'total_pages': progress['total_pages'],
+            'steps': progress['steps'],
+            'restarts': progress['restarts'],
+            'size_bytes': os.path.getsize(output_path),
+            'compressed': compress
+        }
+        self.logger.info(
+            f"Database backed up to {output_path} in {elapsed:.2f}s (copy {result['copy_elapsed']:.2f}s) "
+            f"({result['pages_copied']} pages, {result['steps']} steps, {result['restarts']} restarts)"
+        )
+        return result
+
+    def prune(self, retention: int = BACKUP_RETENTION) -> List[str]:
+        """定期バックアップのうち新しい retention 件を残して削除し、削除したファイルを返す"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        backups = sorted(name for name in os.listdir(self.backup_dir) if _BACKUP_FILE_PATTERN.match(name))
+        removed = []
+        for name in backups[:max(0, len(backups) - retention)]:
+            os.remove(os.path.join(self.backup_dir, name))
+            removed.append(name)
+        if removed:
+            self.logger.info(f"Removed {len(removed)} old backups")
+        return removed
+
+    def seconds_until_due(self, interval_hours: float) -> float:
+        """最新の定期バックアップから interval_hours 経過するまでの秒数（なければ0）
+
+        再起動のたびにバックアップして保持数の枠を使い切らないよう、定期バックアップの
+        初回をこの秒数だけ遅らせる。
+        """
+        if not os.path.isdir(self.backup_dir):
+            return 0.0
+        backups = [name for name in os.listdir(self.backup_dir) if _BACKUP_FILE_PATTERN.match(name)]
+        if not backups:
+            return 0.0
+        latest = max(os.path.getmtime(os.path.join(self.backup_dir, name)) for name in backups)
+        return max(0.0, latest + interval_hours * 3600 - time.time())
+
+    async def run_scheduled(self, retention: int = BACKUP_RETENTION) -> Dict[str, Any]:
+        """イベントループを止めないよう別スレッドでバックアップし、古いバックアップを削除"""
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.backup)
+        result['removed'] = await loop.run_in_executor(None, self.prune, retention)
+        return result
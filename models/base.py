@@ -4,7 +4,82 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 import os
-import shutil
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 書き込み専用スレッドが実行中のバッチのセッション（models.writer が設定する）
+writer_context = threading.local()
+
+class UnitOfWork:
+    """1つのインタラクションの処理中のモデル呼び出しで共有するセッション
+    
+    最初のモデル呼び出しでセッション（接続）を1つ開き、以降の呼び出しはそれを使う。
+    書き込みは終了時にまとめて1回コミットする。read_only を指定した場合は読み取りだけを
+    共有し、書き込みがあればその呼び出しの終了時にコミットして書き込みロックを保持しない。
+    """
+    
+    def __init__(self, read_only: bool = False):
+        self.read_only = read_only
+        self.thread_id = threading.get_ident()
+        self.depth = 0
+        self.calls = 0
+        self._session: Optional[Session] = None
+    
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            from config.database import get_session
+            self._session = get_session()
+        return self._session
+    
+    def in_transaction(self) -> bool:
+        """未コミットの書き込みがあるか（SQLiteのトランザクションが開始されているか）"""
+        if self._session is None:
+            return False
+        return self._session.connection().connection.dbapi_connection.in_transaction
+    
+    def close(self, commit: bool):
+        """書き込みをコミット（commit が偽ならロールバック）してセッションを閉じる"""
+        if self._session is None:
+            return
+        try:
+            if commit:
+                self._session.commit()
+            else:
+                self._session.rollback()
+        finally:
+            self._session.close()
+            self._session = None
+
+# 実行中のインタラクションの UnitOfWork（unit_of_work が設定する）
+current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('current_unit_of_work', default=None)
+
+@contextmanager
+def unit_of_work(read_only: bool = False):
+    """ブロック内のモデル呼び出し（execute_with_session）で1つのセッションを共有する
+    
+    インタラクションのコールバックで、Discordへの応答を待つ前のDB処理をまとめて囲む。
+    例外で抜けた場合は書き込みをロールバックする。既に UnitOfWork の中であればそれに参加する。
+    別スレッド（run_in_executor・書き込み専用タスク）からの呼び出しは共有せず、従来どおり実行する。
+    """
+    active = current_unit_of_work.get()
+    if active is not None:
+        yield active
+        return
+    
+    uow = UnitOfWork(read_only)
+    token = current_unit_of_work.set(uow)
+    try:
+        yield uow
+    except BaseException:
+        uow.close(commit=False)
+        raise
+    else:
+        uow.close(commit=not read_only)
+    finally:
+        current_unit_of_work.reset(token)
 
 class BaseModel(ABC):
     """ベースモデルクラス"""
@@ -18,22 +93,87 @@ class BaseModel(ABC):
         return get_session()
     
     def execute_with_session(self, func, *args, **kwargs):
-        """セッションを使用して関数を実行"""
-        session = self.get_session()
+        """セッションを使用して関数を実行
+        
+        書き込み専用タスク（models.writer）のバッチ内で呼ばれた場合は、そのセッションの
+        SAVEPOINT 内で実行し、コミットはバッチ全体でまとめて行う。
+        unit_of_work の中で呼ばれた場合は、そのセッションを使い、コミットは終了時にまとめて行う。
+        実行時間は呼び出し元のメソッドごとに models.query_stats で集計する。
+        """
+        from models.query_stats import query_stats, operation_name
+        
+        name = operation_name(func)
+        previous = query_stats.begin_operation(name)
+        started = time.perf_counter()
         try:
-            result = func(session, *args, **kwargs)
-            session.commit()
-            return result
+            writer_session = getattr(writer_context, 'session', None)
+            if writer_session is not None:
+                try:
+                    with writer_session.begin_nested():
+                        return func(writer_session, *args, **kwargs)
+                except Exception as e:
+                    self.logger.error(f"Error in {func.__name__} (writer batch): {e}")
+                    raise
+            
+            uow = current_unit_of_work.get()
+            if uow is not None and uow.thread_id == threading.get_ident():
+                return self._execute_in_unit_of_work(uow, func, *args, **kwargs)
+            
+            session = self.get_session()
+            try:
+                result = func(session, *args, **kwargs)
+                session.commit()
+                return result
+            except SQLAlchemyError as e:
+                session.rollback()
+                self.logger.error(f"Database error in {func.__name__}: {e}")
+                raise
+            except Exception as e:
+                session.rollback()
+                self.logger.error(f"Unexpected error in {func.__name__}: {e}")
+                raise
+            finally:
+                session.close()
+        finally:
+            query_stats.end_operation(name, (time.perf_counter() - started) * 1000, previous)
+    
+    def _execute_in_unit_of_work(self, uow: UnitOfWork, func, *args, **kwargs):
+        """UnitOfWork のセッションで関数を実行
+        
+        失敗した場合はこの呼び出しの書き込みだけを取り消す。先行する呼び出しの未コミットの
+        書き込みがあれば SAVEPOINT まで、なければトランザクションごとロールバックする。
+        呼び出しの間で結果が古くならないよう、終了時にセッションからオブジェクトを外す。
+        """
+        session = uow.session
+        if uow.depth:
+            # モデル呼び出しの中からの呼び出しは外側の呼び出しの一部として実行
+            return func(session, *args, **kwargs)
+        
+        uow.depth += 1
+        uow.calls += 1
+        try:
+            if uow.in_transaction():
+                with session.begin_nested():
+                    return func(session, *args, **kwargs)
+            
+            try:
+                result = func(session, *args, **kwargs)
+                session.flush()
+                if uow.read_only and uow.in_transaction():
+                    session.commit()
+                return result
+            except Exception:
+                session.rollback()
+                raise
         except SQLAlchemyError as e:
-            session.rollback()
-            self.logger.error(f"Database error in {func.__name__}: {e}")
+            self.logger.error(f"Database error in {func.__name__} (unit of work): {e}")
             raise
         except Exception as e:
-            session.rollback()
-            self.logger.error(f"Unexpected error in {func.__name__}: {e}")
+            self.logger.error(f"Unexpected error in {func.__name__} (unit of work): {e}")
             raise
         finally:
-            session.close()
+            uow.depth -= 1
+            session.expunge_all()
     
     def safe_execute(self, func, *args, **kwargs):
         """安全に関数を実行（例外をキャッチ）"""
@@ -42,6 +182,23 @@ class BaseModel(ABC):
         except Exception as e:
             self.logger.error(f"Error in safe_execute: {e}")
             return None
+    
+    def safe_read(self, func, *args, **kwargs):
+        """読み取り専用エンジンのスナップショット内で関数を実行（例外をキャッチ）"""
+        from config.database import read_snapshot
+        from models.query_stats import query_stats, operation_name
+        
+        name = operation_name(func)
+        previous = query_stats.begin_operation(name)
+        started = time.perf_counter()
+        try:
+            with read_snapshot() as session:
+                return func(session, *args, **kwargs)
+        except Exception as e:
+            self.logger.error(f"Error in safe_read ({func.__name__}): {e}")
+            return None
+        finally:
+            query_stats.end_operation(name, (time.perf_counter() - started) * 1000, previous)
 
 class DatabaseManager:
     """データベース操作の共通管理クラス"""
@@ -60,6 +217,41 @@ class DatabaseManager:
             self.logger.info(f"User table contains {user_count} records")
             
             session.close()
+            
+            # 試合履歴のページング用インデックス
+            from models.match import MatchModel
+            if not MatchModel().ensure_history_indexes():
+                self.logger.warning("Match history indexes could not be created")
+            
+            # ランキング用インデックス
+            from models.user import UserModel
+            if not UserModel().ensure_ranking_indexes():
+                self.logger.warning("User ranking index could not be created")
+            
+            # ユーザー登録の一意制約
+            if not UserModel().ensure_unique_constraints():
+                self.logger.warning("User unique indexes are incomplete; registration will pre-check duplicates")
+            
+            # ユーザー名検索の索引（ユーザー数と一致しなければ再構築）
+            from models.user_search import UserSearchModel
+            if not UserSearchModel().ensure_ready():
+                self.logger.warning("User search index is not ready; user search will scan the user table")
+            
+            # クラス相性集計テーブルの準備（空の場合は試合履歴から再構築）
+            from models.matchup import MatchupModel
+            if not MatchupModel().ensure_ready():
+                self.logger.warning("Matchup table is not ready; opponent analysis will scan match history")
+            
+            # ユーザー間の対戦成績集計テーブルの準備
+            from models.head_to_head import HeadToHeadModel
+            if not HeadToHeadModel().ensure_ready():
+                self.logger.warning("Head-to-head table is not ready; opponent records will scan match history")
+            
+            # 分析用スナップショットの読み込み（なければSQLiteから再構築）
+            from models.snapshot import get_match_snapshot
+            if not get_match_snapshot().ensure_loaded():
+                self.logger.warning("Match snapshot is not available; analytics will query SQLite")
+            
             return True
             
         except Exception as e:
@@ -67,13 +259,13 @@ class DatabaseManager:
             return False
     
     def backup_database(self, backup_path: str) -> bool:
-        """データベースのバックアップを作成"""
+        """データベースのバックアップを作成（オンラインバックアップAPIを使い、書き込み中でも安全にコピー）"""
         try:
             from config.database import db_path
+            from models.backup import DatabaseBackup
             
             if os.path.exists(db_path):
-                shutil.copy2(db_path, backup_path)
-                self.logger.info(f"Database backed up to {backup_path}")
+                DatabaseBackup().backup(backup_path, compress=False)
                 return True
             else:
                 self.logger.error(f"Database file not found: {db_path}")
@@ -0,0 +1,103 @@
+import logging
+import threading
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy import select
+from config.database import get_session, DeckClass
+from config.settings import VALID_CLASSES
+
+
+class DeckClassRegistry:
+    """デッキクラスの参照データ（プロセス内で一度だけ読み込む）
+
+    beyond_deck_class を id 順に読み込み、各クラスに 1 から始まる整数コードを割り当てる
+    （0 は未設定）。コードは列指向スナップショットなど集計・保存用の整数表現に使う。
+    クラス選択メニューの SelectOption も読み込み時に一度だけ作成する。
+    管理者がクラスを変更した場合は reload() で明示的に読み込み直す。
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.lock = threading.Lock()
+        self._names: Optional[Tuple[str, ...]] = None
+        self._codes: Dict[str, int] = {}
+        self._options: Dict[Tuple[bool, bool], list] = {}
+
+    def _load(self) -> Tuple[str, ...]:
+        """未読み込みであればDBから読み込む（読み込めない場合は VALID_CLASSES を使う）"""
+        if self._names is not None:
+            return self._names
+        with self.lock:
+            if self._names is None:
+                names = []
+                session = get_session()
+                try:
+                    names = list(session.execute(
+                        select(DeckClass.class_name).order_by(DeckClass.id)
+                    ).scalars())
+                except Exception as e:
+                    self.logger.error(f"Error loading deck classes: {e}")
+                finally:
+                    session.close()
+
+                names = [name for name in dict.fromkeys(names) if name]
+                if not names:
+                    self.logger.warning("No deck classes found in database, using VALID_CLASSES")
+                    names = list(VALID_CLASSES)
+
+                self._codes = {name: code for code, name in enumerate(names, start=1)}
+                self._options = {}
+                self._names = tuple(names)
+                self.logger.info(f"Loaded {len(names)} deck classes")
+        return self._names
+
+    def reload(self) -> List[str]:
+        """DBから読み込み直し、クラス名の一覧を返す"""
+        with self.lock:
+            self._names = None
+        return self.class_names
+
+    @property
+    def class_names(self) -> List[str]:
+        """クラス名の一覧（コード順）"""
+        return list(self._load())
+
+    def is_valid(self, class_name: str) -> bool:
+        """有効なクラス名かどうか"""
+        self._load()
+        return class_name in self._codes
+
+    def code_of(self, class_name: Optional[str]) -> int:
+        """クラス名の整数コード（未設定・未登録は 0）"""
+        self._load()
+        return self._codes.get(class_name, 0) if class_name else 0
+
+    def name_of(self, code: int) -> Optional[str]:
+        """整数コードのクラス名（0・範囲外は None）"""
+        names = self._load()
+        return names[code - 1] if 0 < code <= len(names) else None
+
+    def select_options(self, include_all: bool = False, indexed_values: bool = False) -> list:
+        """クラス選択メニューの SelectOption 一覧（読み込み時に一度だけ作成）
+
+        include_all を指定すると先頭に「全クラス」を加え、indexed_values を指定すると
+        値を "クラス名_番号" にする（2クラス登録用）。返すリストはコピーなので変更してよい。
+        """
+        import discord
+
+        names = self._load()
+        key = (include_all, indexed_values)
+        options = self._options.get(key)
+        if options is None:
+            options = [discord.SelectOption(label="全クラス", value="all_classes")] if include_all else []
+            options.extend(
+                discord.SelectOption(label=name, value=f"{name}_{i}" if indexed_values else name)
+                for i, name in enumerate(names)
+            )
+            with self.lock:
+                # 作成中に reload() された場合は古い一覧を保存しない
+                if self._names is names:
+                    self._options[key] = options
+        return list(options)
+
+# プロセス内で共有するデッキクラス参照データ
+deck_class_registry = DeckClassRegistry()
@@ -0,0 +1,145 @@
+from typing import Optional, Dict, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from models.base import BaseModel
+from config.database import MATCH_HISTORY_ALL_VIEW
+
+# 対戦成績集計テーブル
+HEAD_TO_HEAD_TABLE = 'beyond_head_to_head'
+
+_CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {HEAD_TO_HEAD_TABLE} (
+    user_low_id INTEGER NOT NULL,
+    user_high_id INTEGER NOT NULL,
+    low_wins INTEGER NOT NULL DEFAULT 0,
+    high_wins INTEGER NOT NULL DEFAULT 0,
+    last_match_date TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (user_low_id, user_high_id)
+)
+"""
+
+# 反映の取り消し時は last_match_date に空文字を渡し、最終対戦日時を変えない
+_UPSERT_SQL = f"""
+INSERT INTO {HEAD_TO_HEAD_TABLE} (user_low_id, user_high_id, low_wins, high_wins, last_match_date)
+VALUES (:user_low_id, :user_high_id, :low_wins, :high_wins, :last_match_date)
+ON CONFLICT (user_low_id, user_high_id) DO UPDATE SET
+    low_wins = low_wins + excluded.low_wins,
+    high_wins = high_wins + excluded.high_wins,
+    last_match_date = max(last_match_date, excluded.last_match_date)
+"""
+
+_REBUILD_SQL = f"""
+INSERT INTO {HEAD_TO_HEAD_TABLE} (user_low_id, user_high_id, low_wins, high_wins, last_match_date)
+SELECT min(user1_id, user2_id), max(user1_id, user2_id),
+       SUM(CASE WHEN winner_user_id = min(user1_id, user2_id) THEN 1 ELSE 0 END),
+       SUM(CASE WHEN winner_user_id = max(user1_id, user2_id) THEN 1 ELSE 0 END),
+       COALESCE(MAX(match_date), '')
+FROM {MATCH_HISTORY_ALL_VIEW}
+WHERE winner_user_id IS NOT NULL
+  AND after_user1_rating IS NOT NULL
+  AND after_user2_rating IS NOT NULL
+GROUP BY min(user1_id, user2_id), max(user1_id, user2_id)
+"""
+
+
+class HeadToHeadModel(BaseModel):
+    """ユーザー間の対戦成績集計のデータベース操作
+
+    2人のユーザーIDの組 (小さいID, 大きいID) ごとに双方の勝利数と最終対戦日時を保持する。
+    """
+
+    # プロセス内でテーブル作成済みかどうか
+    _table_ready = False
+
+    def _ensure_table(self, session: Session):
+        """集計テーブルを作成（未作成の場合のみ）"""
+        if HeadToHeadModel._table_ready:
+            return
+        session.execute(text(_CREATE_TABLE_SQL))
+        HeadToHeadModel._table_ready = True
+
+    def ensure_ready(self) -> bool:
+        """集計テーブルを準備し、空であれば試合履歴から再構築"""
+        def _ensure(session: Session):
+            self._ensure_table(session)
+            has_rows = session.execute(text(f"SELECT 1 FROM {HEAD_TO_HEAD_TABLE} LIMIT 1")).first()
+            if has_rows:
+                return False
+            has_matches = session.execute(text(
+                f"SELECT 1 FROM {MATCH_HISTORY_ALL_VIEW} WHERE winner_user_id IS NOT NULL LIMIT 1"
+            )).first()
+            return bool(has_matches)
+
+        try:
+            needs_rebuild = self.execute_with_session(_ensure)
+        except Exception as e:
+            self.logger.error(f"Error preparing head-to-head table: {e}")
+            return False
+
+        if needs_rebuild:
+            return self.rebuild() is not None
+        return True
+
+    def rebuild(self) -> Optional[int]:
+        """試合履歴から集計テーブルを全件再構築し、作成した行数を返す"""
+        def _rebuild(session: Session):
+            self._ensure_table(session)
+            session.execute(text(f"DELETE FROM {HEAD_TO_HEAD_TABLE}"))
+            session.execute(text(_REBUILD_SQL))
+            count = session.execute(text(f"SELECT COUNT(*) FROM {HEAD_TO_HEAD_TABLE}")).scalar()
+            self.logger.info(f"Head-to-head table rebuilt with {count} rows")
+            return count
+
+        return self.safe_execute(_rebuild)
+
+    def apply_match(self, session: Session, match, sign: int = 1):
+        """完了した試合を集計に反映（呼び出し元のセッション内で実行）
+
+        sign=-1 を指定すると反映済みの試合を取り消す。
+        """
+        if match is None or match.winner_user_id is None:
+            return
+        if match.user1_id is None or match.user2_id is None:
+            return
+
+        self._ensure_table(session)
+
+        user_low_id, user_high_id = sorted((match.user1_id, match.user2_id))
+        session.execute(text(_UPSERT_SQL), {
+            'user_low_id': user_low_id,
+            'user_high_id': user_high_id,
+            'low_wins': sign if match.winner_user_id == user_low_id else 0,
+            'high_wins': sign if match.winner_user_id == user_high_id else 0,
+            'last_match_date': (match.match_date or '') if sign > 0 else '',
+        })
+
+    def get_record(self, user_id: int, opponent_id: int) -> Optional[Dict[str, Any]]:
+        """2人の対戦成績を user_id の視点で取得
+
+        対戦がない場合は試合数0の成績を返す。集計テーブルが利用できない場合は None を返す。
+        """
+        def _get_record(session: Session):
+            # 読み取り専用の接続ではテーブルを作成できないため、準備済みでなければ呼び出し元の走査に任せる
+            if not HeadToHeadModel._table_ready:
+                return None
+            
+            user_low_id, user_high_id = sorted((user_id, opponent_id))
+            row = session.execute(text(
+                f"SELECT low_wins, high_wins, last_match_date FROM {HEAD_TO_HEAD_TABLE} "
+                f"WHERE user_low_id = :user_low_id AND user_high_id = :user_high_id"
+            ), {'user_low_id': user_low_id, 'user_high_id': user_high_id}).first()
+
+            low_wins, high_wins, last_match_date = row if row else (0, 0, '')
+            if user_id == user_low_id:
+                user_wins, opponent_wins = low_wins, high_wins
+            else:
+                user_wins, opponent_wins = high_wins, low_wins
+
+            return {
+                'user_wins': user_wins,
+                'opponent_wins': opponent_wins,
+                'total_matches': user_wins + opponent_wins,
+                'last_match_date': last_match_date or None
+            }
+
+        return self.safe_read(_get_record)
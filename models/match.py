@@ -1,10 +1,16 @@
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_, or_
+from sqlalchemy import desc, and_, or_, text, func, true, select
 from models.base import BaseModel
-from config.database import MatchHistory, User
-from config.settings import JST, BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER
+from models.matchup import MatchupModel
+from models.head_to_head import HeadToHeadModel
+from models.snapshot import match_date_to_epoch, stage_snapshot_matches
+from models.read_models import MatchRow, MATCH_ALL_ROW_COLUMNS
+from models.statements import MATCH_PLACEHOLDER
+from models.rating import calculate_rating_change, calculate_rating_change_from_result
+from config.database import MatchHistory, MatchHistoryAll, User, Season
+from config.settings import JST
 
 class MatchModel(BaseModel):
     """試合履歴関連のデータベース操作"""
@@ -12,7 +18,10 @@ class MatchModel(BaseModel):
     def __init__(self):
         super().__init__()
         self.MatchHistory = MatchHistory
+        self.MatchHistoryAll = MatchHistoryAll
         self.User = User
+        self.matchup_model = MatchupModel()
+        self.head_to_head_model = HeadToHeadModel()
     
     def _match_to_dict(self, match) -> Dict[str, Any]:
         """MatchHistoryオブジェクトを辞書に変換"""
@@ -61,6 +70,7 @@ class MatchModel(BaseModel):
                 user1_id=user1_id,
                 user2_id=user2_id,
                 match_date=match_date,
+                **self._epoch_fields(match_date),
                 season_name=season_name,
                 user1_class_a=user1_class_a,
                 user1_class_b=user1_class_b,
@@ -94,13 +104,12 @@ class MatchModel(BaseModel):
         """試合結果を確定（クラス情報付き）"""
         def _finalize_match(session: Session):
             # プレースホルダー試合を検索
-            match = session.query(self.MatchHistory).filter(
-                self.MatchHistory.user1_id == user1_id,
-                self.MatchHistory.user2_id == user2_id,
-                self.MatchHistory.before_user1_rating == before_user1_rating,
-                self.MatchHistory.before_user2_rating == before_user2_rating,
-                self.MatchHistory.after_user1_rating.is_(None)
-            ).order_by(desc(self.MatchHistory.id)).first()
+            match = session.scalars(MATCH_PLACEHOLDER, {
+                'user1_id': user1_id,
+                'user2_id': user2_id,
+                'before_user1_rating': before_user1_rating,
+                'before_user2_rating': before_user2_rating
+            }).first()
             
             # レーティング変動を計算
             user1_rating_change = after_user1_rating - before_user1_rating
@@ -122,14 +131,22 @@ class MatchModel(BaseModel):
                 match.loser_user_id = loser_user_id
                 match.user1_selected_class = user1_selected_class
                 match.user2_selected_class = user2_selected_class
-                return match
             else:
                 # プレースホルダーが見つからない場合は新規作成
-                return self._create_new_match_record_with_classes(
+                match = self._create_new_match_record_with_classes(
                     session, user1_id, user2_id, user1_rating_change, user2_rating_change,
                     winner_user_id, loser_user_id, before_user1_rating, before_user2_rating,
                     after_user1_rating, after_user2_rating, user1_selected_class, user2_selected_class
                 )
+            
+            # クラス相性集計・対戦成績集計に反映
+            self.matchup_model.apply_match(session, match)
+            self.head_to_head_model.apply_match(session, match)
+            
+            # 分析用スナップショットへはコミット後に追記
+            session.flush()
+            stage_snapshot_matches(session, [self._match_to_dict(match)])
+            return match
         
         return self.execute_with_session(_finalize_match)
     
@@ -140,13 +157,12 @@ class MatchModel(BaseModel):
         """試合結果を確定（旧式、後方互換性のため残す）"""
         def _finalize_match(session: Session):
             # プレースホルダー試合を検索
-            match = session.query(self.MatchHistory).filter(
-                self.MatchHistory.user1_id == user1_id,
-                self.MatchHistory.user2_id == user2_id,
-                self.MatchHistory.before_user1_rating == before_user1_rating,
-                self.MatchHistory.before_user2_rating == before_user2_rating,
-                self.MatchHistory.after_user1_rating.is_(None)
-            ).order_by(desc(self.MatchHistory.id)).first()
+            match = session.scalars(MATCH_PLACEHOLDER, {
+                'user1_id': user1_id,
+                'user2_id': user2_id,
+                'before_user1_rating': before_user1_rating,
+                'before_user2_rating': before_user2_rating
+            }).first()
             
             # レーティング変動を計算
             user1_rating_change = after_user1_rating - before_user1_rating
@@ -166,14 +182,22 @@ class MatchModel(BaseModel):
                 match.after_user2_rating = after_user2_rating
                 match.winner_user_id = winner_user_id
                 match.loser_user_id = loser_user_id
-                return match
             else:
                 # プレースホルダーが見つからない場合は新規作成
-                return self._create_new_match_record(
+                match = self._create_new_match_record(
                     session, user1_id, user2_id, user1_rating_change, user2_rating_change,
                     winner_user_id, loser_user_id, before_user1_rating, before_user2_rating,
                     after_user1_rating, after_user2_rating
                 )
+            
+            # クラス相性集計・対戦成績集計に反映
+            self.matchup_model.apply_match(session, match)
+            self.head_to_head_model.apply_match(session, match)
+            
+            # 分析用スナップショットへはコミット後に追記
+            session.flush()
+            stage_snapshot_matches(session, [self._match_to_dict(match)])
+            return match
         
         return self.execute_with_session(_finalize_match)
     
@@ -193,6 +217,7 @@ class MatchModel(BaseModel):
             user1_id=user1_id,
             user2_id=user2_id,
             match_date=match_date,
+            **self._epoch_fields(match_date),
             season_name="Unknown",  # 通常はプレースホルダーから取得
             user1_class_a=user1.class1 if user1 else None,
             user1_class_b=user1.class2 if user1 else None,
@@ -230,6 +255,7 @@ class MatchModel(BaseModel):
             user1_id=user1_id,
             user2_id=user2_id,
             match_date=match_date,
+            **self._epoch_fields(match_date),
             season_name="Unknown",  # 通常はプレースホルダーから取得
             user1_class_a=user1.class1 if user1 else None,
             user1_class_b=user1.class2 if user1 else None,
@@ -251,39 +277,200 @@ class MatchModel(BaseModel):
         return new_match
     
 
-    def get_user_match_history(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
-        """ユーザーの試合履歴を取得（辞書形式で返す）"""
+    def get_user_match_history(self, user_id: int, limit: int = 50) -> List[MatchRow]:
+        """ユーザーの試合履歴を取得（辞書と同じキーで参照できる MatchRow で返す）"""
         def _get_history(session: Session):
-            query = session.query(self.MatchHistory).filter(
+            statement = select(*MATCH_ALL_ROW_COLUMNS).where(
                 or_(
-                    self.MatchHistory.user1_id == user_id,
-                    self.MatchHistory.user2_id == user_id
+                    self.MatchHistoryAll.user1_id == user_id,
+                    self.MatchHistoryAll.user2_id == user_id
                 )
-            ).order_by(desc(self.MatchHistory.match_date))
+            ).order_by(desc(self.MatchHistoryAll.match_date))
             
             # limitがNoneの場合は全履歴を取得
             if limit is not None:
-                query = query.limit(limit)
+                statement = statement.limit(limit)
             
-            matches = query.all()
-            
-            # セッション内で辞書に変換
-            return [self._match_to_dict(match) for match in matches]
+            # 必要な列だけを読み取りモデルとして取得
+            return [MatchRow._make(row) for row in session.execute(statement)]
         
         return self.safe_execute(_get_history) or []
     
-    def get_user_vs_user_history(self, user1_id: int, user2_id: int) -> List[Dict[str, Any]]:
-        """特定のユーザー間の対戦履歴を取得（辞書形式で返す）"""
+    def _epoch_fields(self, match_date: str) -> Dict[str, Any]:
+        """試合作成時に設定するエポック列（列がない古いデータベースでは空）"""
+        if hasattr(self.MatchHistory, 'match_epoch'):
+            return {'match_epoch': match_date_to_epoch(match_date)}
+        return {}
+    
+    def date_range_condition(self, start_date: Optional[str], end_date: Optional[str]):
+        """match_date の範囲条件（両端を含む）を整数エポック列で作成
+        
+        match_epoch 列がない古いデータベースでは文字列比較にフォールバックする。
+        """
+        mh = self.MatchHistoryAll
+        conditions = []
+        if hasattr(mh, 'match_epoch'):
+            if start_date:
+                conditions.append(mh.match_epoch >= match_date_to_epoch(start_date))
+            if end_date:
+                conditions.append(mh.match_epoch <= match_date_to_epoch(end_date))
+        else:
+            if start_date:
+                conditions.append(mh.match_date >= start_date)
+            if end_date:
+                conditions.append(mh.match_date <= end_date)
+        return and_(true(), *conditions)
+    
+    def newest_first_order(self) -> Tuple[Any, ...]:
+        """新しい順の並び順（match_epoch 列がない場合は match_date の文字列順）"""
+        mh = self.MatchHistoryAll
+        if hasattr(mh, 'match_epoch'):
+            return (mh.match_epoch.desc(), mh.id.desc())
+        return (mh.match_date.desc(), mh.id.desc())
+    
+    def _completed_condition(self):
+        """結果が確定した試合の条件"""
+        return and_(
+            self.MatchHistoryAll.winner_user_id.isnot(None),
+            self.MatchHistoryAll.after_user1_rating.isnot(None),
+            self.MatchHistoryAll.after_user2_rating.isnot(None)
+        )
+    
+    def ensure_history_indexes(self) -> bool:
+        """ユーザー別・ユーザー間履歴のキーセットページング用インデックスを作成"""
+        def _ensure(session: Session):
+            for column in ('user1_id', 'user2_id'):
+                session.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_beyond_match_history_{column}_date "
+                    f"ON beyond_match_history ({column}, match_date, id)"
+                ))
+            session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_beyond_match_history_pair_date "
+                "ON beyond_match_history (user1_id, user2_id, match_date, id)"
+            ))
+            return True
+        
+        return bool(self.safe_execute(_ensure))
+    
+    def count_user_matches(self, user_id: int, completed_only: bool = True) -> int:
+        """ユーザーの試合数を取得"""
+        def _count(session: Session):
+            total = 0
+            for user_column in (self.MatchHistoryAll.user1_id, self.MatchHistoryAll.user2_id):
+                query = session.query(func.count(self.MatchHistoryAll.id)).filter(user_column == user_id)
+                if completed_only:
+                    query = query.filter(self._completed_condition())
+                total += query.scalar() or 0
+            return total
+        
+        return self.safe_execute(_count) or 0
+    
+    def _history_page(self, conditions: List[Any], page_size: int, cursor: Optional[Tuple[str, int]],
+                      newer: bool, completed_only: bool) -> Dict[str, Any]:
+        """条件ごとにキーセットで取得した試合を統合して1ページ分返す
+        
+        OR条件だと全履歴のソートになるため、条件ごとにインデックス順で取得して統合する。
+        """
+        def _get_page(session: Session):
+            mh = self.MatchHistoryAll
+            rows = []
+            
+            for condition in conditions:
+                query = select(*MATCH_ALL_ROW_COLUMNS).where(condition)
+                if completed_only:
+                    query = query.where(self._completed_condition())
+                
+                if cursor is not None:
+                    cursor_date, cursor_id = cursor
+                    if newer:
+                        query = query.where(or_(
+                            mh.match_date > cursor_date,
+                            and_(mh.match_date == cursor_date, mh.id > cursor_id)
+                        ))
+                    else:
+                        query = query.where(or_(
+                            mh.match_date < cursor_date,
+                            and_(mh.match_date == cursor_date, mh.id < cursor_id)
+                        ))
+                
+                if newer:
+                    query = query.order_by(mh.match_date, mh.id)
+                else:
+                    query = query.order_by(desc(mh.match_date), desc(mh.id))
+                
+                rows.extend(MatchRow._make(row) for row in session.execute(query.limit(page_size + 1)))
+            
+            rows.sort(key=lambda match: (match.match_date or '', match.id), reverse=not newer)
+            
+            # 1件多く取得して続きの有無を判定
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            if newer:
+                rows.reverse()
+            
+            return {
+                'matches': rows,
+                'first_cursor': (rows[0].match_date, rows[0].id) if rows else None,
+                'last_cursor': (rows[-1].match_date, rows[-1].id) if rows else None,
+                'has_newer': has_more if newer else cursor is not None,
+                'has_older': cursor is not None if newer else has_more
+            }
+        
+        return self.safe_execute(_get_page) or {
+            'matches': [], 'first_cursor': None, 'last_cursor': None,
+            'has_newer': False, 'has_older': False
+        }
+    
+    def get_user_match_history_page(self, user_id: int, page_size: int = 8,
+                                    cursor: Optional[Tuple[str, int]] = None, newer: bool = False,
+                                    completed_only: bool = True) -> Dict[str, Any]:
+        """ユーザーの試合履歴を (match_date, id) のキーセットで1ページ分取得
+        
+        cursor を指定しない場合は最新のページを返す。newer=False のときは cursor より古い試合、
+        newer=True のときは cursor より新しい試合を返す（いずれも新しい順）。
+        戻り値の first_cursor / last_cursor を次の呼び出しに渡すと前後のページを取得できる。
+        """
+        conditions = [self.MatchHistoryAll.user1_id == user_id, self.MatchHistoryAll.user2_id == user_id]
+        return self._history_page(conditions, page_size, cursor, newer, completed_only)
+    
+    def get_user_vs_user_history_page(self, user1_id: int, user2_id: int, page_size: int = 8,
+                                      cursor: Optional[Tuple[str, int]] = None, newer: bool = False,
+                                      completed_only: bool = True) -> Dict[str, Any]:
+        """特定のユーザー間の対戦履歴をキーセットで1ページ分取得（引数は get_user_match_history_page と同じ）"""
+        mh = self.MatchHistoryAll
+        conditions = [
+            and_(mh.user1_id == user1_id, mh.user2_id == user2_id),
+            and_(mh.user1_id == user2_id, mh.user2_id == user1_id)
+        ]
+        return self._history_page(conditions, page_size, cursor, newer, completed_only)
+    
+    def iter_user_match_history(self, user_id: int, batch_size: int = 500,
+                                completed_only: bool = True) -> Iterator[Dict[str, Any]]:
+        """ユーザーの試合履歴を新しい順に1件ずつ返すジェネレータ（エクスポート用）
+        
+        キーセットで batch_size 件ずつ取得するため、全履歴をメモリに載せない。
+        """
+        cursor = None
+        while True:
+            page = self.get_user_match_history_page(
+                user_id, page_size=batch_size, cursor=cursor, completed_only=completed_only
+            )
+            yield from page['matches']
+            if not page['has_older']:
+                return
+            cursor = page['last_cursor']
+    
+    def get_user_vs_user_history(self, user1_id: int, user2_id: int) -> List[MatchRow]:
+        """特定のユーザー間の対戦履歴を取得（辞書と同じキーで参照できる MatchRow で返す）"""
         def _get_vs_history(session: Session):
-            matches = session.query(self.MatchHistory).filter(
+            statement = select(*MATCH_ALL_ROW_COLUMNS).where(
                 or_(
-                    and_(self.MatchHistory.user1_id == user1_id, self.MatchHistory.user2_id == user2_id),
-                    and_(self.MatchHistory.user1_id == user2_id, self.MatchHistory.user2_id == user1_id)
+                    and_(self.MatchHistoryAll.user1_id == user1_id, self.MatchHistoryAll.user2_id == user2_id),
+                    and_(self.MatchHistoryAll.user1_id == user2_id, self.MatchHistoryAll.user2_id == user1_id)
                 )
-            ).order_by(desc(self.MatchHistory.match_date)).all()
+            ).order_by(desc(self.MatchHistoryAll.match_date))
             
-            # セッション内で辞書に変換
-            return [self._match_to_dict(match) for match in matches]
+            return [MatchRow._make(row) for row in session.execute(statement)]
         
         return self.safe_execute(_get_vs_history) or []
     
@@ -291,26 +478,26 @@ class MatchModel(BaseModel):
                                user_stay_flag: int = None) -> List[Dict[str, Any]]:
         """ユーザーの特定シーズンの試合履歴を取得（辞書形式で返す）"""
         def _get_season_matches(session: Session):
-            query = session.query(self.MatchHistory).filter(
+            query = session.query(self.MatchHistoryAll).filter(
                 or_(
-                    self.MatchHistory.user1_id == user_id,
-                    self.MatchHistory.user2_id == user_id
+                    self.MatchHistoryAll.user1_id == user_id,
+                    self.MatchHistoryAll.user2_id == user_id
                 ),
-                self.MatchHistory.season_name == season_name
+                self.MatchHistoryAll.season_name == season_name
             )
             
             # stay_flagが指定されている場合はフィルタリング
             if user_stay_flag is not None:
                 query = query.filter(
                     or_(
-                        and_(self.MatchHistory.user1_id == user_id, 
-                             self.MatchHistory.user1_stay_flag == user_stay_flag),
-                        and_(self.MatchHistory.user2_id == user_id, 
-                             self.MatchHistory.user2_stay_flag == user_stay_flag)
+                        and_(self.MatchHistoryAll.user1_id == user_id, 
+                             self.MatchHistoryAll.user1_stay_flag == user_stay_flag),
+                        and_(self.MatchHistoryAll.user2_id == user_id, 
+                             self.MatchHistoryAll.user2_stay_flag == user_stay_flag)
                     )
                 )
             
-            matches = query.order_by(desc(self.MatchHistory.match_date)).all()
+            matches = query.order_by(desc(self.MatchHistoryAll.match_date)).all()
             
             # セッション内で辞書に変換
             return [self._match_to_dict(match) for match in matches]
@@ -321,19 +508,19 @@ class MatchModel(BaseModel):
                               season_name: str = None) -> List[Dict[str, Any]]:
         """ユーザーの特定クラスでの試合履歴を取得（selected_classベース、辞書形式で返す）"""
         def _get_class_matches(session: Session):
-            query = session.query(self.MatchHistory).filter(
+            query = session.query(self.MatchHistoryAll).filter(
                 or_(
-                    and_(self.MatchHistory.user1_id == user_id,
-                         self.MatchHistory.user1_selected_class == class_name),
-                    and_(self.MatchHistory.user2_id == user_id,
-                         self.MatchHistory.user2_selected_class == class_name)
+                    and_(self.MatchHistoryAll.user1_id == user_id,
+                         self.MatchHistoryAll.user1_selected_class == class_name),
+                    and_(self.MatchHistoryAll.user2_id == user_id,
+                         self.MatchHistoryAll.user2_selected_class == class_name)
                 )
             )
             
             if season_name:
-                query = query.filter(self.MatchHistory.season_name == season_name)
+                query = query.filter(self.MatchHistoryAll.season_name == season_name)
             
-            matches = query.order_by(desc(self.MatchHistory.match_date)).all()
+            matches = query.order_by(desc(self.MatchHistoryAll.match_date)).all()
             
             # セッション内で辞書に変換
             return [self._match_to_dict(match) for match in matches]
@@ -347,34 +534,34 @@ class MatchModel(BaseModel):
             if len(classes) == 1:
                 # 単一クラス
                 class_name = classes[0]
-                query = session.query(self.MatchHistory).filter(
+                query = session.query(self.MatchHistoryAll).filter(
                     or_(
-                        and_(self.MatchHistory.user1_id == user_id,
-                             or_(self.MatchHistory.user1_class_a == class_name,
-                                 self.MatchHistory.user1_class_b == class_name)),
-                        and_(self.MatchHistory.user2_id == user_id,
-                             or_(self.MatchHistory.user2_class_a == class_name,
-                                 self.MatchHistory.user2_class_b == class_name))
+                        and_(self.MatchHistoryAll.user1_id == user_id,
+                             or_(self.MatchHistoryAll.user1_class_a == class_name,
+                                 self.MatchHistoryAll.user1_class_b == class_name)),
+                        and_(self.MatchHistoryAll.user2_id == user_id,
+                             or_(self.MatchHistoryAll.user2_class_a == class_name,
+                                 self.MatchHistoryAll.user2_class_b == class_name))
                     )
                 )
             elif len(classes) == 2:
                 # クラスの組み合わせ
                 class1, class2 = classes
-                query = session.query(self.MatchHistory).filter(
+                query = session.query(self.MatchHistoryAll).filter(
                     or_(
-                        and_(self.MatchHistory.user1_id == user_id,
+                        and_(self.MatchHistoryAll.user1_id == user_id,
                              or_(
-                                 and_(self.MatchHistory.user1_class_a == class1,
-                                      self.MatchHistory.user1_class_b == class2),
-                                 and_(self.MatchHistory.user1_class_a == class2,
-                                      self.MatchHistory.user1_class_b == class1)
+                                 and_(self.MatchHistoryAll.user1_class_a == class1,
+                                      self.MatchHistoryAll.user1_class_b == class2),
+                                 and_(self.MatchHistoryAll.user1_class_a == class2,
+                                      self.MatchHistoryAll.user1_class_b == class1)
                              )),
-                        and_(self.MatchHistory.user2_id == user_id,
+                        and_(self.MatchHistoryAll.user2_id == user_id,
                              or_(
-                                 and_(self.MatchHistory.user2_class_a == class1,
-                                      self.MatchHistory.user2_class_b == class2),
-                                 and_(self.MatchHistory.user2_class_a == class2,
-                                      self.MatchHistory.user2_class_b == class1)
+                                 and_(self.MatchHistoryAll.user2_class_a == class1,
+                                      self.MatchHistoryAll.user2_class_b == class2),
+                                 and_(self.MatchHistoryAll.user2_class_a == class2,
+                                      self.MatchHistoryAll.user2_class_b == class1)
                              ))
                     )
                 )
@@ -382,9 +569,9 @@ class MatchModel(BaseModel):
                 return []
             
             if season_name:
-                query = query.filter(self.MatchHistory.season_name == season_name)
+                query = query.filter(self.MatchHistoryAll.season_name == season_name)
             
-            matches = query.order_by(desc(self.MatchHistory.match_date)).all()
+            matches = query.order_by(desc(self.MatchHistoryAll.match_date)).all()
             
             # セッション内で辞書に変換
             return [self._match_to_dict(match) for match in matches]
@@ -394,40 +581,12 @@ class MatchModel(BaseModel):
     def calculate_rating_change(self, player_rating: float, opponent_rating: float, 
                                player_wins: int, opponent_wins: int) -> float:
         """レーティング変動を計算"""
-        rating_diff = player_rating - opponent_rating
-        increment_per_win = RATING_DIFF_MULTIPLIER * abs(rating_diff)
-        
-        if player_rating > opponent_rating:
-            if player_wins > opponent_wins:
-                rating_change = BASE_RATING_CHANGE - increment_per_win
-            else:
-                rating_change = -(BASE_RATING_CHANGE + increment_per_win)
-        else:
-            if player_wins > opponent_wins:
-                rating_change = BASE_RATING_CHANGE + increment_per_win
-            else:
-                rating_change = -(BASE_RATING_CHANGE - increment_per_win)
-        
-        return rating_change
+        return calculate_rating_change(player_rating, opponent_rating, player_wins, opponent_wins)
     
     def calculate_rating_change_from_result(self, player_rating: float, opponent_rating: float, 
                                            player_won: bool) -> float:
         """勝敗結果からレーティング変動を計算"""
-        rating_diff = player_rating - opponent_rating
-        increment_per_win = RATING_DIFF_MULTIPLIER * abs(rating_diff)
-        
-        if player_rating > opponent_rating:
-            if player_won:
-                rating_change = BASE_RATING_CHANGE - increment_per_win
-            else:
-                rating_change = -(BASE_RATING_CHANGE + increment_per_win)
-        else:
-            if player_won:
-                rating_change = BASE_RATING_CHANGE + increment_per_win
-            else:
-                rating_change = -(BASE_RATING_CHANGE - increment_per_win)
-        
-        return rating_change
+        return calculate_rating_change_from_result(player_rating, opponent_rating, player_won)
     
     def get_match_by_id(self, match_id: int) -> Optional[Dict[str, Any]]:
         """IDで試合履歴を取得（辞書形式で返す）"""
@@ -439,11 +598,22 @@ class MatchModel(BaseModel):
     
     def reverse_match_result(self, match_id: int) -> bool:
         """試合結果を反転"""
+        closed_season_ids = []
+        
         def _reverse_match(session: Session):
             match = session.query(self.MatchHistory).filter_by(id=match_id).first()
             if not match:
                 return False
             
+            # 終了済みシーズンの試合であれば、そのシーズンのキャッシュを破棄する
+            season = session.query(Season).filter_by(season_name=match.season_name).first()
+            if season and season.end_date is not None:
+                closed_season_ids.append(season.id)
+            
+            # クラス相性集計・対戦成績集計から反転前の結果を取り消す
+            self.matchup_model.apply_match(session, match, sign=-1)
+            self.head_to_head_model.apply_match(session, match, sign=-1)
+            
             # 勝敗とレート変動を反転
             match.winner_user_id, match.loser_user_id = match.loser_user_id, match.winner_user_id
             match.user1_rating_change = -match.user1_rating_change
@@ -473,9 +643,19 @@ class MatchModel(BaseModel):
                     user2.win_count -= 1
                     user2.loss_count += 1
             
+            # 反転後の結果をクラス相性集計・対戦成績集計に反映
+            self.matchup_model.apply_match(session, match)
+            self.head_to_head_model.apply_match(session, match)
+            
+            stage_snapshot_matches(session, [self._match_to_dict(match)])
             return True
         
-        return self.execute_with_session(_reverse_match)
+        result = self.execute_with_session(_reverse_match)
+        
+        if closed_season_ids:
+            from models.season import closed_season_cache
+            closed_season_cache.invalidate(closed_season_ids[0])
+        return result
     
     def get_recent_matches(self, limit: int = 100) -> List[Dict[str, Any]]:
         """最近の試合履歴を取得（辞書形式で返す）"""
@@ -513,9 +693,10 @@ class MatchModel(BaseModel):
             from models.user import UserModel
             user_model = UserModel()
             opponents = []
+            opponent_data = user_model.get_users_by_ids(opponent_ids)
             
             for opponent_id in opponent_ids:
-                opponent = user_model.get_user_by_id(opponent_id)
+                opponent = opponent_data.get(opponent_id)
                 if opponent:
                     opponents.append(opponent)
                 
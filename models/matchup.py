@@ -0,0 +1,303 @@
+from typing import Optional, List, Dict, Any, Tuple
+from itertools import combinations
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from models.base import BaseModel
+from config.database import MATCH_HISTORY_ALL_VIEW
+
+# クラス相性集計テーブル
+MATCHUP_TABLE = 'beyond_class_matchup'
+
+# 集計キー（シーズン × 日付 × 視点 × 自分のクラス組合せ・選択クラス × 相手のクラス組合せ・選択クラス）
+#
+# is_primary は user1 視点の行が 1、user2 視点の行が 0。
+# 従来の分析（user1 を優先して自分側を決める）と同じ数え方にするため、
+# user2 視点の行は user1 が同じクラス（組合せ）を選んでいない場合のみ数える。
+MATCHUP_KEY_COLUMNS = (
+    'season_name', 'match_day', 'is_primary',
+    'my_class_a', 'my_class_b', 'my_selected_class',
+    'opp_class_a', 'opp_class_b', 'opp_selected_class',
+)
+
+_CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {MATCHUP_TABLE} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    season_name TEXT NOT NULL DEFAULT '',
+    match_day TEXT NOT NULL DEFAULT '',
+    is_primary INTEGER NOT NULL DEFAULT 1,
+    my_class_a TEXT NOT NULL DEFAULT '',
+    my_class_b TEXT NOT NULL DEFAULT '',
+    my_selected_class TEXT NOT NULL DEFAULT '',
+    opp_class_a TEXT NOT NULL DEFAULT '',
+    opp_class_b TEXT NOT NULL DEFAULT '',
+    opp_selected_class TEXT NOT NULL DEFAULT '',
+    win_count INTEGER NOT NULL DEFAULT 0,
+    loss_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE ({', '.join(MATCHUP_KEY_COLUMNS)})
+)
+"""
+
+_CREATE_INDEX_SQL = (
+    f"CREATE INDEX IF NOT EXISTS ix_{MATCHUP_TABLE}_my_selected "
+    f"ON {MATCHUP_TABLE} (my_selected_class, season_name, match_day)",
+    f"CREATE INDEX IF NOT EXISTS ix_{MATCHUP_TABLE}_my_pair "
+    f"ON {MATCHUP_TABLE} (my_class_a, my_class_b, season_name, match_day)",
+)
+
+_UPSERT_SQL = f"""
+INSERT INTO {MATCHUP_TABLE} ({', '.join(MATCHUP_KEY_COLUMNS)}, win_count, loss_count)
+VALUES (:season_name, :match_day, :is_primary, :my_class_a, :my_class_b, :my_selected_class,
+        :opp_class_a, :opp_class_b, :opp_selected_class, :win_count, :loss_count)
+ON CONFLICT ({', '.join(MATCHUP_KEY_COLUMNS)}) DO UPDATE SET
+    win_count = win_count + excluded.win_count,
+    loss_count = loss_count + excluded.loss_count
+"""
+
+
+def _orientation_select(me: str, opp: str) -> str:
+    """試合履歴を片側視点の行に変換するSELECT文を生成"""
+    return f"""
+    SELECT COALESCE(season_name, '') AS season_name,
+           COALESCE(substr(match_date, 1, 10), '') AS match_day,
+           {1 if me == 'user1' else 0} AS is_primary,
+           CASE WHEN {me}_class_a IS NOT NULL AND {me}_class_b IS NOT NULL
+                THEN min({me}_class_a, {me}_class_b) ELSE '' END AS my_class_a,
+           CASE WHEN {me}_class_a IS NOT NULL AND {me}_class_b IS NOT NULL
+                THEN max({me}_class_a, {me}_class_b) ELSE '' END AS my_class_b,
+           COALESCE({me}_selected_class, '') AS my_selected_class,
+           CASE WHEN {opp}_class_a IS NOT NULL AND {opp}_class_b IS NOT NULL
+                THEN min({opp}_class_a, {opp}_class_b) ELSE '' END AS opp_class_a,
+           CASE WHEN {opp}_class_a IS NOT NULL AND {opp}_class_b IS NOT NULL
+                THEN max({opp}_class_a, {opp}_class_b) ELSE '' END AS opp_class_b,
+           COALESCE({opp}_selected_class, '') AS opp_selected_class,
+           CASE WHEN winner_user_id = {me}_id THEN 1 ELSE 0 END AS won
+    FROM {MATCH_HISTORY_ALL_VIEW}
+    WHERE winner_user_id IS NOT NULL
+    """
+
+
+_REBUILD_SQL = f"""
+INSERT INTO {MATCHUP_TABLE} ({', '.join(MATCHUP_KEY_COLUMNS)}, win_count, loss_count)
+SELECT {', '.join(MATCHUP_KEY_COLUMNS)}, SUM(won), SUM(1 - won)
+FROM ({_orientation_select('user1', 'user2')} UNION ALL {_orientation_select('user2', 'user1')})
+GROUP BY {', '.join(MATCHUP_KEY_COLUMNS)}
+"""
+
+
+def _day_range(start_date: Optional[str], end_date: Optional[str]) -> Optional[Tuple[str, str]]:
+    """日時の範囲を日単位の範囲に変換（日の境界に揃っていない場合は None）
+
+    開始は 'YYYY-MM-DD' か 'YYYY-MM-DD 00:00:00'、終了は 'YYYY-MM-DD 23:59:59' の場合のみ
+    集計テーブルの日付で正確に絞り込める。未指定の端は空文字（絞り込まない）。
+    """
+    start_day = end_day = ''
+    if start_date:
+        if start_date[10:19] not in ('', ' 00:00:00'):
+            return None
+        start_day = start_date[:10]
+    if end_date:
+        if end_date[10:19] != ' 23:59:59':
+            return None
+        end_day = end_date[:10]
+    return start_day, end_day
+
+
+def _class_pair(class_a: Optional[str], class_b: Optional[str]) -> Tuple[str, str]:
+    """クラス組合せを正規化（ソート済みタプル、未登録は空文字）"""
+    if class_a and class_b:
+        return tuple(sorted((class_a, class_b)))
+    return ('', '')
+
+
+class MatchupModel(BaseModel):
+    """クラス相性集計（マッチアップ行列）のデータベース操作
+
+    完了した試合を両プレイヤーの視点で1行ずつ集計し、
+    (シーズン, 日付, 自分のクラス組合せ, 自分の選択クラス, 相手のクラス組合せ, 相手の選択クラス)
+    ごとの勝敗数を保持する。両視点の行は is_primary で区別し、分析時は従来と同じく
+    自分側を user1 優先で決めるため、ミラー対戦は1回だけ数える。
+    """
+
+    # プロセス内でテーブル作成済みかどうか
+    _table_ready = False
+
+    def _ensure_table(self, session: Session):
+        """集計テーブルとインデックスを作成（未作成の場合のみ）
+
+        is_primary 列がない旧形式のテーブルは削除して作り直す（ensure_ready で再構築される）。
+        """
+        if MatchupModel._table_ready:
+            return
+        columns = {row[1] for row in session.execute(text(f"PRAGMA table_info({MATCHUP_TABLE})"))}
+        if columns and 'is_primary' not in columns:
+            self.logger.info("Matchup table has no orientation column; dropping it for rebuild")
+            session.execute(text(f"DROP TABLE {MATCHUP_TABLE}"))
+        session.execute(text(_CREATE_TABLE_SQL))
+        for index_sql in _CREATE_INDEX_SQL:
+            session.execute(text(index_sql))
+        MatchupModel._table_ready = True
+
+    def ensure_ready(self) -> bool:
+        """集計テーブルを準備し、空であれば試合履歴から再構築"""
+        def _ensure(session: Session):
+            self._ensure_table(session)
+            has_rows = session.execute(text(f"SELECT 1 FROM {MATCHUP_TABLE} LIMIT 1")).first()
+            if has_rows:
+                return False
+            has_matches = session.execute(text(
+                f"SELECT 1 FROM {MATCH_HISTORY_ALL_VIEW} WHERE winner_user_id IS NOT NULL LIMIT 1"
+            )).first()
+            return bool(has_matches)
+
+        try:
+            needs_rebuild = self.execute_with_session(_ensure)
+        except Exception as e:
+            self.logger.error(f"Error preparing matchup table: {e}")
+            return False
+
+        if needs_rebuild:
+            return self.rebuild() is not None
+        return True
+
+    def rebuild(self) -> Optional[int]:
+        """試合履歴から集計テーブルを全件再構築し、作成した行数を返す"""
+        def _rebuild(session: Session):
+            self._ensure_table(session)
+            session.execute(text(f"DELETE FROM {MATCHUP_TABLE}"))
+            session.execute(text(_REBUILD_SQL))
+            count = session.execute(text(f"SELECT COUNT(*) FROM {MATCHUP_TABLE}")).scalar()
+            self.logger.info(f"Matchup table rebuilt with {count} rows")
+            return count
+
+        return self.safe_execute(_rebuild)
+
+    def apply_match(self, session: Session, match, sign: int = 1):
+        """完了した試合を集計に反映（呼び出し元のセッション内で実行）
+
+        sign=-1 を指定すると反映済みの試合を取り消す。
+        """
+        if match is None or match.winner_user_id is None:
+            return
+
+        self._ensure_table(session)
+
+        season_name = match.season_name or ''
+        match_day = (match.match_date or '')[:10]
+        user1_pair = _class_pair(match.user1_class_a, match.user1_class_b)
+        user2_pair = _class_pair(match.user2_class_a, match.user2_class_b)
+        user1_selected = getattr(match, 'user1_selected_class', None) or ''
+        user2_selected = getattr(match, 'user2_selected_class', None) or ''
+        user1_won = match.winner_user_id == match.user1_id
+        user2_won = match.winner_user_id == match.user2_id
+
+        rows = [
+            (1, user1_pair, user1_selected, user2_pair, user2_selected, user1_won),
+            (0, user2_pair, user2_selected, user1_pair, user1_selected, user2_won),
+        ]
+
+        for is_primary, my_pair, my_selected, opp_pair, opp_selected, won in rows:
+            session.execute(text(_UPSERT_SQL), {
+                'season_name': season_name,
+                'match_day': match_day,
+                'is_primary': is_primary,
+                'my_class_a': my_pair[0],
+                'my_class_b': my_pair[1],
+                'my_selected_class': my_selected,
+                'opp_class_a': opp_pair[0],
+                'opp_class_b': opp_pair[1],
+                'opp_selected_class': opp_selected,
+                'win_count': sign if won else 0,
+                'loss_count': 0 if won else sign,
+            })
+
+    def get_opponent_class_stats(self, selected_classes: List[str], season_name: Optional[str] = None,
+                                 date_range: Optional[tuple] = None) -> Optional[List[Dict[str, Any]]]:
+        """投げられたクラスの分析データを集計テーブルから取得
+
+        selected_classes が1つの場合はそのクラスを選択した対戦を相手の選択クラス別に、
+        2つの場合はその組合せを登録した対戦を相手の組合せ・選択クラス別に集計する。
+        自分側は従来どおり user1 を優先する（ミラー対戦は user1 視点の1回だけ数える）。
+        集計テーブルが利用できない場合や、date_range が日の境界に揃っておらず
+        日単位の集計では正確に絞り込めない場合は None を返す。
+        """
+        conditions = []
+        params = {}
+
+        if season_name:
+            conditions.append("season_name = :season_name")
+            params['season_name'] = season_name
+        elif date_range:
+            day_range = _day_range(*date_range)
+            if day_range is None:
+                return None
+            start_day, end_day = day_range
+            if start_day:
+                conditions.append("match_day >= :start_day")
+                params['start_day'] = start_day
+            if end_day:
+                conditions.append("match_day <= :end_day")
+                params['end_day'] = end_day
+
+        if len(selected_classes) == 1:
+            # user2 視点の行は user1 が同じクラスを選択していない場合のみ
+            conditions.append("my_selected_class = :my_selected_class")
+            conditions.append("(is_primary = 1 OR opp_selected_class <> my_selected_class)")
+            params['my_selected_class'] = selected_classes[0]
+            group_columns = "opp_selected_class"
+        else:
+            # user2 視点の行は user1 が同じ組合せを登録していない場合のみ
+            my_pair = _class_pair(selected_classes[0], selected_classes[1])
+            conditions.append("my_class_a = :my_class_a AND my_class_b = :my_class_b")
+            conditions.append("(is_primary = 1 OR opp_class_a <> my_class_a OR opp_class_b <> my_class_b)")
+            params['my_class_a'], params['my_class_b'] = my_pair
+            group_columns = "opp_class_a, opp_class_b, opp_selected_class"
+
+        def _get_stats(session: Session):
+            from config.settings import VALID_CLASSES
+
+            # 読み取り専用の接続ではテーブルを作成できないため、準備済みでなければ走査に任せる
+            if not MatchupModel._table_ready:
+                return None
+
+            rows = session.execute(text(
+                f"SELECT {group_columns}, SUM(win_count), SUM(loss_count) "
+                f"FROM {MATCHUP_TABLE} WHERE {' AND '.join(conditions)} "
+                f"GROUP BY {group_columns}"
+            ), params).all()
+
+            result = []
+
+            if len(selected_classes) == 1:
+                counts = {row[0]: (row[1] or 0, row[2] or 0) for row in rows}
+                for opponent_class in VALID_CLASSES:
+                    my_wins, opponent_wins = counts.get(opponent_class, (0, 0))
+                    total_matches = my_wins + opponent_wins
+                    if total_matches > 0:
+                        result.append({
+                            'opponent_class_combo': opponent_class,  # 単一クラス名
+                            'opponent_selected_class': opponent_class,
+                            'total_matches': total_matches,
+                            'opponent_wins': opponent_wins,
+                            'my_wins': my_wins,
+                            'win_rate': (my_wins / total_matches) * 100
+                        })
+            else:
+                counts = {(row[0], row[1], row[2]): (row[3] or 0, row[4] or 0) for row in rows}
+                for combo in combinations(VALID_CLASSES, 2):
+                    combo = tuple(sorted(combo))
+                    for selected_class in combo:
+                        my_wins, opponent_wins = counts.get((combo[0], combo[1], selected_class), (0, 0))
+                        total_matches = my_wins + opponent_wins
+                        if total_matches > 0:
+                            result.append({
+                                'opponent_class_combo': combo,  # タプル形式で保持
+                                'opponent_selected_class': selected_class,
+                                'total_matches': total_matches,
+                                'opponent_wins': opponent_wins,
+                                'my_wins': my_wins,
+                                'win_rate': (my_wins / total_matches) * 100
+                            })
+
+            return result
+
+        return self.safe_read(_get_stats)
@@ -0,0 +1,267 @@
+import re
+import time
+import logging
+import threading
+from collections import deque, Counter
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, List, Dict, Any
+from sqlalchemy import event
+from models.writer import Histogram
+from config.settings import (
+    JST, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_SIZE, QUERY_STATS_MAX_STATEMENTS
+)
+
+# SQL・モデル操作の実行時間（ミリ秒）のヒストグラムの区切り
+QUERY_LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+# 統計の上限を超えた新しいSQLをまとめる集計先
+OTHER_STATEMENTS_KEY = '(other)'
+
+# 呼び出し元のモデル操作が不明な場合（セッションを直接使う箇所など）
+UNKNOWN_OPERATION = '(direct)'
+
+# 実行計画を取得するSQL（BEGIN・SAVEPOINT・PRAGMA などは対象外）
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+# IN (?, ?, ...) の個数違いを同じSQLとして集計する
+_IN_PARAMS = re.compile(r'\?(?:\s*,\s*\?)+')
+_WHITESPACE = re.compile(r'\s+')
+
+# 遅いクエリの記録先（setup_logging で logs/slow_query.log にも出力する）
+slow_query_logger = logging.getLogger('SlowQuery')
+
+# 実行中のモデル操作（BaseModel.execute_with_session・safe_read が設定する）
+_operation_context = threading.local()
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """集計用にSQLの空白とINのプレースホルダー数を正規化（同じSQLは繰り返し実行されるためキャッシュする）"""
+    return _IN_PARAMS.sub('?, ...', _WHITESPACE.sub(' ', statement).strip())
+
+
+def operation_name(func) -> str:
+    """モデルのメソッド内で定義した関数から呼び出し元のメソッド名を取得
+
+    例: UserModel.get_user_by_discord_id.<locals>._get_user → UserModel.get_user_by_discord_id
+    """
+    qualname = getattr(func, '__qualname__', None) or getattr(func, '__name__', repr(func))
+    return qualname.split('.<locals>', 1)[0]
+
+
+class _LatencyStats:
+    """1つのSQLまたはモデル操作の実行回数と実行時間"""
+
+    __slots__ = ('count', 'total_ms', 'max_ms', 'histogram', 'callers', 'plan')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = Histogram(QUERY_LATENCY_BUCKETS_MS)
+        self.callers = Counter()
+        self.plan: Optional[str] = None
+
+    def observe(self, elapsed_ms: float, caller: Optional[str] = None):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram.observe(elapsed_ms)
+        if caller is not None:
+            self.callers[caller] += 1
+
+    def to_dict(self, key: str) -> Dict[str, Any]:
+        caller = self.callers.most_common(1)
+        return {
+            'statement': key,
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'caller': caller[0][0] if caller else None,
+            'histogram': self.histogram.snapshot(),
+            'plan': self.plan
+        }
+
+
+class QueryStats:
+    """SQLとモデル操作の実行時間の計測と遅いクエリの記録
+
+    エンジンの before_cursor_execute / after_cursor_execute イベントでSQLごとの実行時間を、
+    BaseModel.execute_with_session でモデル操作ごとの実行時間を集計する。
+    threshold_ms 以上かかったSQLは実行計画（EXPLAIN QUERY PLAN）とともに
+    直近 SLOW_QUERY_LOG_SIZE 件を保持し、SlowQuery ロガーにも出力する。
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+                 max_statements: int = QUERY_STATS_MAX_STATEMENTS):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.lock = threading.Lock()
+        self.threshold_ms = threshold_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, _LatencyStats] = {}
+        self.operations: Dict[str, _LatencyStats] = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.started_at = datetime.now(JST)
+
+    def install(self, *engines):
+        """エンジンにSQL計測のイベントを登録（登録済みのエンジンは無視）"""
+        for engine in engines:
+            if event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+                continue
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+            self.logger.info(f"Query timing installed on {engine.url}")
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_start_time')
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        caller = getattr(_operation_context, 'name', None) or UNKNOWN_OPERATION
+        key = normalize_statement(statement)
+
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = OTHER_STATEMENTS_KEY
+                    stats = self.statements.get(key)
+                if stats is None:
+                    stats = self.statements[key] = _LatencyStats()
+            stats.observe(elapsed_ms, caller)
+            need_plan = stats.plan is None and key != OTHER_STATEMENTS_KEY
+
+        if elapsed_ms >= self.threshold_ms:
+            self._record_slow_query(cursor, statement, parameters, executemany, elapsed_ms, caller, stats, need_plan)
+
+    def _record_slow_query(self, cursor, statement, parameters, executemany, elapsed_ms, caller, stats, need_plan):
+        """遅いクエリを記録（実行計画はSQLごとに初回のみ取得）"""
+        plan = stats.plan
+        if need_plan and not executemany and _EXPLAINABLE.match(statement):
+            plan = self._explain(cursor, statement, parameters)
+            with self.lock:
+                stats.plan = plan
+
+        entry = {
+            'time': datetime.now(JST),
+            'elapsed_ms': elapsed_ms,
+            'statement': normalize_statement(statement),
+            'parameters': repr(parameters)[:200],
+            'caller': caller,
+            'plan': plan
+        }
+        with self.lock:
+            self.slow_queries.append(entry)
+        slow_query_logger.warning(
+            f"{elapsed_ms:.1f}ms in {caller}: {entry['statement']} {entry['parameters']}"
+            + (f"\n{plan}" if plan else "")
+        )
+
+    def _explain(self, cursor, statement: str, parameters) -> Optional[str]:
+        """同じ接続で EXPLAIN QUERY PLAN を実行し、ツリーを字下げした文字列で返す"""
+        try:
+            rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+        except Exception as e:
+            self.logger.debug(f"Failed to explain slow query: {e}")
+            return None
+
+        depths = {0: -1}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depth = depths.get(parent_id, -1) + 1
+            depths[node_id] = depth
+            lines.append(f"{'  ' * depth}{detail}")
+        return "\n".join(lines)
+
+    def begin_operation(self, name: str) -> Optional[str]:
+        """モデル操作の開始（以降のSQLをこの操作の呼び出しとして集計）、直前の操作名を返す"""
+        previous = getattr(_operation_context, 'name', None)
+        _operation_context.name = name
+        return previous
+
+    def end_operation(self, name: str, elapsed_ms: float, previous: Optional[str]):
+        """モデル操作の終了（実行時間を記録し、呼び出し元の操作名に戻す）"""
+        _operation_context.name = previous
+        with self.lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = _LatencyStats()
+            stats.observe(elapsed_ms)
+
+    def top_statements(self, limit: int = 10, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """SQLごとの統計を order_by（total_ms / mean_ms / max_ms / count）の降順で取得"""
+        with self.lock:
+            rows = [stats.to_dict(key) for key, stats in self.statements.items()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+
+    def top_operations(self, limit: int = 10, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """モデル操作ごとの統計を order_by の降順で取得"""
+        with self.lock:
+            rows = [stats.to_dict(key) for key, stats in self.operations.items()]
+        for row in rows:
+            row['operation'] = row.pop('statement')
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+
+    def recent_slow_queries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """直近の遅いクエリ（新しい順）"""
+        with self.lock:
+            return list(self.slow_queries)[::-1][:limit]
+
+    def format_report(self, limit: int = 10, order_by: str = 'total_ms') -> str:
+        """SQL・モデル操作の上位と直近の遅いクエリを実行計画付きのテキストにまとめる"""
+        def format_histogram(histogram):
+            return ", ".join(f"{label}:{count}" for label, count in histogram.items() if count)
+
+        lines = [f"集計開始: {self.started_at.strftime('%Y-%m-%d %H:%M:%S')}（並び順: {order_by}）", "", "== SQL =="]
+        for row in self.top_statements(limit, order_by):
+            lines.append(
+                f"[{row['count']}回, 合計 {row['total_ms']:.1f}ms, 平均 {row['mean_ms']:.2f}ms, "
+                f"最大 {row['max_ms']:.1f}ms] 主な呼び出し元: {row['caller']}"
+            )
+            lines.append(f"  {row['statement']}")
+            lines.append(f"  分布(ms): {format_histogram(row['histogram'])}")
+            if row['plan']:
+                lines.extend(f"  | {line}" for line in row['plan'].splitlines())
+
+        lines += ["", "== モデル操作 =="]
+        for row in self.top_operations(limit, order_by):
+            lines.append(
+                f"[{row['count']}回, 合計 {row['total_ms']:.1f}ms, 平均 {row['mean_ms']:.2f}ms, "
+                f"最大 {row['max_ms']:.1f}ms] {row['operation']}"
+            )
+
+        lines += ["", f"== 遅いクエリ（{self.threshold_ms}ms以上、新しい順） =="]
+        for entry in self.recent_slow_queries(limit):
+            lines.append(
+                f"{entry['time'].strftime('%m-%d %H:%M:%S')} {entry['elapsed_ms']:.1f}ms {entry['caller']}"
+            )
+            lines.append(f"  {entry['statement']}")
+            lines.append(f"  params: {entry['parameters']}")
+            if entry['plan']:
+                lines.extend(f"  | {line}" for line in entry['plan'].splitlines())
+        return "\n".join(lines)
+
+    def reset(self):
+        """集計をすべて破棄"""
+        with self.lock:
+            self.statements.clear()
+            self.operations.clear()
+            self.slow_queries.clear()
+            self.started_at = datetime.now(JST)
+
+
+# プロセス内で共有するクエリ計測
+query_stats = QueryStats()
+
+
+def install_query_stats():
+    """書き込み用・読み取り専用の両エンジンにSQL計測を登録"""
+    from config.database import engine, read_engine
+    query_stats.install(engine, read_engine)
@@ -0,0 +1,463 @@
+import time
+import logging
+from typing import Optional, Dict, Any, List
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from models.base import BaseModel
+from config.database import MatchHistory, MatchHistoryAll, User
+from config.settings import BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER, DEFAULT_RATING
+
+# 再計算結果と保存値の比較許容誤差
+RATING_TOLERANCE = 1e-6
+
+
+def calculate_rating_change_from_result(player_rating, opponent_rating, player_won,
+                                        base_change: float = BASE_RATING_CHANGE,
+                                        multiplier: float = RATING_DIFF_MULTIPLIER):
+    """勝敗結果からレーティング変動を計算
+
+    勝利時は base_change、敗北時は -base_change を基準に、
+    レート差 × multiplier だけ高レート側が不利になるよう補正する。
+    スカラーとNumPy配列のどちらにも対応する。
+    """
+    sign = np.where(player_won, 1.0, -1.0) if isinstance(player_won, np.ndarray) else (1.0 if player_won else -1.0)
+    return sign * base_change - multiplier * (player_rating - opponent_rating)
+
+
+def calculate_rating_change(player_rating: float, opponent_rating: float,
+                            player_wins: int, opponent_wins: int) -> float:
+    """勝利数からレーティング変動を計算（旧形式）"""
+    return calculate_rating_change_from_result(player_rating, opponent_rating, player_wins > opponent_wins)
+
+
+def plan_replay(matches: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """再生計画を作成（ユーザー・アカウント番号、stay 有効化の検出、ウェーブ分割）
+
+    アカウント番号は ユーザー番号 × 2 + stay_flag。各ウェーブには同じユーザーが
+    1回しか現れないため、ウェーブ内の試合はまとめて配列演算で更新できる。
+    """
+    match_count = len(matches['id'])
+    user_ids, inverse = np.unique(
+        np.concatenate([matches['user1_id'], matches['user2_id']]), return_inverse=True
+    )
+    user1_index = inverse[:match_count]
+    user2_index = inverse[match_count:]
+    flag1 = matches['user1_stay_flag'].astype(np.int64)
+    flag2 = matches['user2_stay_flag'].astype(np.int64)
+
+    # ウェーブ割り当てと stay 有効化（通常→stay）の検出
+    wave = np.empty(match_count, dtype=np.int64)
+    reset1 = np.zeros(match_count, dtype=bool)
+    reset2 = np.zeros(match_count, dtype=bool)
+    next_wave = [0] * len(user_ids)
+    last_flag = [0] * len(user_ids)
+    for i in range(match_count):
+        u1, u2 = user1_index[i], user2_index[i]
+        reset1[i] = flag1[i] == 1 and last_flag[u1] == 0
+        reset2[i] = flag2[i] == 1 and last_flag[u2] == 0
+        last_flag[u1], last_flag[u2] = flag1[i], flag2[i]
+        wave[i] = max(next_wave[u1], next_wave[u2])
+        next_wave[u1] = next_wave[u2] = wave[i] + 1
+
+    waves = []
+    if match_count:
+        order = np.argsort(wave, kind='stable')
+        boundaries = np.searchsorted(wave[order], np.arange(1, int(wave.max()) + 1))
+        waves = np.split(order, boundaries)
+
+    return {
+        'user_ids': user_ids,
+        'user1_index': user1_index,
+        'user2_index': user2_index,
+        'account1': user1_index * 2 + flag1,
+        'account2': user2_index * 2 + flag2,
+        'reset1': reset1,
+        'reset2': reset2,
+        'user1_won': matches['user1_won'],
+        'waves': waves,
+        'last_stay_flag': np.array(last_flag, dtype=np.int64),
+    }
+
+
+class RatingReplayEngine(BaseModel):
+    """試合履歴からレーティング・勝敗数・連勝数を時系列順に再計算する
+
+    各ユーザーを stay_flag ごとの2つのアカウント（通常 / stay）として扱い、
+    同じユーザーが重複しない試合の組（ウェーブ）単位でNumPy配列をまとめて更新する。
+    """
+
+    def __init__(self, base_change: float = BASE_RATING_CHANGE,
+                 multiplier: float = RATING_DIFF_MULTIPLIER,
+                 initial_rating: float = DEFAULT_RATING):
+        super().__init__()
+        self.base_change = base_change
+        self.multiplier = multiplier
+        self.initial_rating = initial_rating
+
+    def load_matches(self, session: Session, season_name: str) -> Dict[str, np.ndarray]:
+        """シーズンの完了した試合を時系列順に配列として読み込む（アーカイブ済みシーズンも対象）"""
+        rows = session.query(
+            MatchHistoryAll.id,
+            MatchHistoryAll.user1_id,
+            MatchHistoryAll.user2_id,
+            MatchHistoryAll.winner_user_id,
+            MatchHistoryAll.user1_stay_flag,
+            MatchHistoryAll.user2_stay_flag,
+            MatchHistoryAll.before_user1_rating,
+            MatchHistoryAll.before_user2_rating,
+            MatchHistoryAll.after_user1_rating,
+            MatchHistoryAll.after_user2_rating,
+            MatchHistoryAll.user1_rating_change,
+            MatchHistoryAll.user2_rating_change
+        ).filter(
+            MatchHistoryAll.season_name == season_name,
+            MatchHistoryAll.winner_user_id.isnot(None)
+        ).order_by(MatchHistoryAll.match_date, MatchHistoryAll.id).all()
+
+        def _column(index, dtype, default=0):
+            return np.array([row[index] if row[index] is not None else default for row in rows], dtype=dtype)
+
+        user1_ids = _column(1, np.int64)
+        return {
+            'id': _column(0, np.int64),
+            'user1_id': user1_ids,
+            'user2_id': _column(2, np.int64),
+            'user1_won': _column(3, np.int64) == user1_ids,
+            'user1_stay_flag': _column(4, np.int8).astype(bool),
+            'user2_stay_flag': _column(5, np.int8).astype(bool),
+            'before_user1_rating': _column(6, np.float64, np.nan),
+            'before_user2_rating': _column(7, np.float64, np.nan),
+            'after_user1_rating': _column(8, np.float64, np.nan),
+            'after_user2_rating': _column(9, np.float64, np.nan),
+            'user1_rating_change': _column(10, np.float64, np.nan),
+            'user2_rating_change': _column(11, np.float64, np.nan),
+        }
+
+    def replay(self, matches: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """試合配列を再生し、各試合の前後レートとアカウント状態を返す"""
+        plan = plan_replay(matches)
+        match_count = len(matches['id'])
+        user_ids = plan['user_ids']
+        user1_index, user2_index = plan['user1_index'], plan['user2_index']
+        account1, account2 = plan['account1'], plan['account2']
+        reset1, reset2 = plan['reset1'], plan['reset2']
+
+        account_count = len(user_ids) * 2
+        rating = np.full(account_count, float(self.initial_rating))
+        wins = np.zeros(account_count, dtype=np.int64)
+        losses = np.zeros(account_count, dtype=np.int64)
+        streak = np.zeros(len(user_ids), dtype=np.int64)
+        max_streak = np.zeros(len(user_ids), dtype=np.int64)
+
+        before1 = np.empty(match_count)
+        before2 = np.empty(match_count)
+        change1 = np.empty(match_count)
+        change2 = np.empty(match_count)
+
+        for idx in plan['waves']:
+            a1, a2 = account1[idx], account2[idx]
+            u1, u2 = user1_index[idx], user2_index[idx]
+            won1 = matches['user1_won'][idx]
+
+            # stay 有効化時は stay アカウントと連勝数をリセット
+            for accounts, users, resets in ((a1, u1, reset1[idx]), (a2, u2, reset2[idx])):
+                rating[accounts[resets]] = self.initial_rating
+                wins[accounts[resets]] = 0
+                losses[accounts[resets]] = 0
+                streak[users[resets]] = 0
+
+            r1, r2 = rating[a1], rating[a2]
+            c1 = calculate_rating_change_from_result(r1, r2, won1, self.base_change, self.multiplier)
+            c2 = calculate_rating_change_from_result(r2, r1, ~won1, self.base_change, self.multiplier)
+
+            before1[idx], before2[idx] = r1, r2
+            change1[idx], change2[idx] = c1, c2
+            rating[a1] = r1 + c1
+            rating[a2] = r2 + c2
+
+            wins[a1] += won1
+            losses[a1] += ~won1
+            wins[a2] += ~won1
+            losses[a2] += won1
+
+            streak[u1] = np.where(won1, streak[u1] + 1, 0)
+            streak[u2] = np.where(won1, 0, streak[u2] + 1)
+            max_streak[u1] = np.maximum(max_streak[u1], streak[u1])
+            max_streak[u2] = np.maximum(max_streak[u2], streak[u2])
+
+        return {
+            'user_ids': user_ids,
+            'waves': len(plan['waves']),
+            'before_user1_rating': before1,
+            'before_user2_rating': before2,
+            'user1_rating_change': change1,
+            'user2_rating_change': change2,
+            'rating': rating,
+            'win_count': wins,
+            'loss_count': losses,
+            'win_streak': streak,
+            'max_win_streak': max_streak,
+            'last_stay_flag': plan['last_stay_flag'],
+        }
+
+    def _changed_match_rows(self, matches: Dict[str, np.ndarray], result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """保存値と異なる試合行の更新内容を作成"""
+        after1 = result['before_user1_rating'] + result['user1_rating_change']
+        after2 = result['before_user2_rating'] + result['user2_rating_change']
+        recomputed = {
+            'before_user1_rating': result['before_user1_rating'],
+            'before_user2_rating': result['before_user2_rating'],
+            'after_user1_rating': after1,
+            'after_user2_rating': after2,
+            'user1_rating_change': result['user1_rating_change'],
+            'user2_rating_change': result['user2_rating_change'],
+        }
+
+        differs = np.zeros(len(matches['id']), dtype=bool)
+        for column, values in recomputed.items():
+            stored = matches[column]
+            differs |= np.isnan(stored) | (np.abs(stored - values) > RATING_TOLERANCE)
+
+        return [
+            {'id': int(matches['id'][i]), **{column: float(values[i]) for column, values in recomputed.items()}}
+            for i in np.flatnonzero(differs)
+        ]
+
+    def _changed_user_rows(self, session: Session, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """現在シーズンのユーザー統計のうち、再計算結果と異なるものの更新内容を作成"""
+        user_ids = result['user_ids']
+        users = session.query(User).filter(User.id.in_(user_ids.tolist())).all()
+        position = {int(user_id): i for i, user_id in enumerate(user_ids)}
+
+        def _account(account):
+            return {
+                'rating': float(result['rating'][account]),
+                'win_count': int(result['win_count'][account]),
+                'loss_count': int(result['loss_count'][account]),
+                'total_matches': int(result['win_count'][account] + result['loss_count'][account]),
+            }
+
+        fresh = {'rating': float(self.initial_rating), 'win_count': 0, 'loss_count': 0, 'total_matches': 0}
+
+        rows = []
+        for user in users:
+            i = position[user.id]
+            stayed_after_last_match = user.stay_flag == 1 and result['last_stay_flag'][i] == 0
+
+            expected = {}
+            if user.stay_flag == 1:
+                main = fresh if stayed_after_last_match else _account(i * 2 + 1)
+                expected.update({f'stayed_{key}': value for key, value in _account(i * 2).items()})
+            else:
+                main = _account(i * 2)
+            expected.update(main)
+            expected['win_streak'] = 0 if stayed_after_last_match else int(result['win_streak'][i])
+            expected['max_win_streak'] = int(result['max_win_streak'][i])
+
+            changed = {}
+            for column, value in expected.items():
+                stored = getattr(user, column)
+                if stored is None or abs(stored - value) > RATING_TOLERANCE:
+                    changed[column] = value
+            if changed:
+                rows.append({'id': user.id, **changed})
+
+        return rows
+
+    def run(self, season_name: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """シーズンの試合履歴を再生し、差分のある行のみ書き戻す
+
+        season_name を省略した場合は現在のシーズンを対象とする。
+        ユーザー統計は現在のシーズンを再生した場合のみ更新する。
+        アーカイブ済みシーズンは読み取り専用のため dry_run のみ実行できる。
+        稼働中に書き戻す場合は、他の書き込みと並行しないよう書き込みタスク（models.writer）から実行する。
+        """
+        from models.season import SeasonModel
+        current_season_name = SeasonModel().get_current_season_name()
+        season_name = season_name or current_season_name
+        if not season_name:
+            raise ValueError("対象のシーズンが見つかりません")
+        if not dry_run:
+            from models.archive import SeasonArchiveModel
+            if SeasonArchiveModel().is_archived(season_name):
+                raise ValueError(f"シーズン '{season_name}' はアーカイブ済みのため書き戻せません（dry_runのみ可能）")
+
+        def _run(session: Session):
+            started = time.perf_counter()
+
+            matches = self.load_matches(session, season_name)
+            result = self.replay(matches)
+            match_rows = self._changed_match_rows(matches, result)
+            user_rows = self._changed_user_rows(session, result) if season_name == current_season_name else []
+
+            if not dry_run:
+                if match_rows:
+                    session.execute(update(MatchHistory), match_rows)
+                    # 分析用スナップショットのレート変動もコミット後に再構築
+                    from models.snapshot import stage_snapshot_invalidation
+                    stage_snapshot_invalidation(session)
+                if user_rows:
+                    session.execute(update(User), user_rows)
+            else:
+                session.rollback()
+
+            return {
+                'season_name': season_name,
+                'matches': len(matches['id']),
+                'users': len(result['user_ids']),
+                'waves': result['waves'],
+                'changed_matches': len(match_rows),
+                'changed_users': len(user_rows),
+                'dry_run': dry_run,
+                'elapsed': time.perf_counter() - started
+            }
+
+        summary = self.execute_with_session(_run)
+        self.logger.info(
+            f"Rating replay for season {summary['season_name']}: {summary['matches']} matches, "
+            f"{summary['changed_matches']} match rows and {summary['changed_users']} users "
+            f"{'would change' if dry_run else 'updated'} ({summary['elapsed']:.2f}s)"
+        )
+
+        return summary
+
+
+def sweep_final_ratings(plan: Dict[str, Any], base_changes: np.ndarray, multipliers: np.ndarray,
+                        initial_rating: float = DEFAULT_RATING) -> np.ndarray:
+    """複数のパラメータ組を同時に再生し、最終レート（組数 × アカウント数）を返す
+
+    プロセスプールから呼び出せるようモジュール関数として定義する。
+    """
+    base_changes = np.asarray(base_changes, dtype=np.float64)[:, None]
+    multipliers = np.asarray(multipliers, dtype=np.float64)[:, None]
+    rating = np.full((len(base_changes), len(plan['user_ids']) * 2), float(initial_rating))
+
+    for idx in plan['waves']:
+        a1, a2 = plan['account1'][idx], plan['account2'][idx]
+        won1 = plan['user1_won'][idx]
+
+        for accounts, resets in ((a1, plan['reset1'][idx]), (a2, plan['reset2'][idx])):
+            rating[:, accounts[resets]] = initial_rating
+
+        r1, r2 = rating[:, a1], rating[:, a2]
+        rating[:, a1] = r1 + calculate_rating_change_from_result(r1, r2, won1, base_changes, multipliers)
+        rating[:, a2] = r2 + calculate_rating_change_from_result(r2, r1, ~won1, base_changes, multipliers)
+
+    return rating
+
+
+class RatingParameterSweep(BaseModel):
+    """レーティングパラメータの what-if 分析
+
+    シーズンの試合履歴を複数の (BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER) 組で
+    まとめて再生し、レートの散らばり・現行設定との順位相関・上位N人を比較する。
+    """
+
+    def __init__(self, initial_rating: float = DEFAULT_RATING):
+        super().__init__()
+        self.initial_rating = initial_rating
+
+    def _effective_ratings(self, plan: Dict[str, Any], ratings: np.ndarray) -> np.ndarray:
+        """ユーザーごとの有効レート（試合のあるアカウントのうち高い方）"""
+        account_count = len(plan['user_ids']) * 2
+        played = np.bincount(
+            np.concatenate([plan['account1'], plan['account2']]), minlength=account_count
+        ) > 0
+        masked = np.where(played, ratings, -np.inf).reshape(len(ratings), -1, 2)
+        return masked.max(axis=2)
+
+    @staticmethod
+    def _ranks(values: np.ndarray) -> np.ndarray:
+        """行ごとの順位（0始まり、降順）"""
+        return np.argsort(np.argsort(-values, axis=1, kind='stable'), axis=1)
+
+    def run(self, base_changes: List[float], multipliers: List[float], season_name: Optional[str] = None,
+            top_n: int = 10, processes: int = 1) -> Dict[str, Any]:
+        """パラメータの全組み合わせでシーズンを再生し、比較レポートを返す
+
+        現行設定（BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER）は常に比較基準として含める。
+        processes が2以上の場合はパラメータ組を分割してプロセスプールで並列に再生する。
+        """
+        from models.season import SeasonModel
+        season_name = season_name or SeasonModel().get_current_season_name()
+        if not season_name:
+            raise ValueError("対象のシーズンが見つかりません")
+
+        started = time.perf_counter()
+
+        def _load(session: Session):
+            matches = RatingReplayEngine(initial_rating=self.initial_rating).load_matches(session, season_name)
+            users = session.query(User.id, User.user_name).all()
+            return matches, {user_id: user_name for user_id, user_name in users}
+
+        matches, user_names = self.execute_with_session(_load)
+        plan = plan_replay(matches)
+
+        combos = [(BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER)] + [
+            (base, multiplier) for base in base_changes for multiplier in multipliers
+            if (base, multiplier) != (BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER)
+        ]
+        base_array = np.array([combo[0] for combo in combos], dtype=np.float64)
+        multiplier_array = np.array([combo[1] for combo in combos], dtype=np.float64)
+
+        if processes > 1 and len(combos) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            chunks = np.array_split(np.arange(len(combos)), min(processes, len(combos)))
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [
+                    executor.submit(sweep_final_ratings, plan, base_array[chunk], multiplier_array[chunk],
+                                    self.initial_rating)
+                    for chunk in chunks
+                ]
+                ratings = np.vstack([future.result() for future in futures])
+        else:
+            ratings = sweep_final_ratings(plan, base_array, multiplier_array, self.initial_rating)
+
+        effective = self._effective_ratings(plan, ratings)
+        ranks = self._ranks(effective)
+
+        # 現行設定との順位相関（スピアマン）と上位N人の一致数
+        baseline_ranks = ranks[0]
+        centered = ranks - ranks.mean(axis=1, keepdims=True)
+        baseline_centered = centered[0]
+        denominator = np.sqrt((centered ** 2).sum(axis=1) * (baseline_centered ** 2).sum())
+        correlations = np.divide(
+            centered @ baseline_centered, denominator,
+            out=np.ones(len(combos)), where=denominator > 0
+        )
+        top_n = min(top_n, effective.shape[1])
+        top_indices = np.argsort(-effective, axis=1, kind='stable')[:, :top_n]
+        baseline_top = set(top_indices[0].tolist())
+
+        results = []
+        for i, (base, multiplier) in enumerate(combos):
+            values = effective[i]
+            results.append({
+                'base_change': float(base),
+                'multiplier': float(multiplier),
+                'is_baseline': i == 0,
+                'rating_std': float(values.std()) if len(values) else 0.0,
+                'rating_min': float(values.min()) if len(values) else 0.0,
+                'rating_max': float(values.max()) if len(values) else 0.0,
+                'rating_p10_p90': float(np.percentile(values, 90) - np.percentile(values, 10)) if len(values) else 0.0,
+                'rank_correlation': float(correlations[i]),
+                'top_n_overlap': len(baseline_top & set(top_indices[i].tolist())),
+                'top_n': [
+                    {
+                        'user_name': user_names.get(int(plan['user_ids'][j]), str(plan['user_ids'][j])),
+                        'rating': float(values[j])
+                    }
+                    for j in top_indices[i]
+                ]
+            })
+
+        return {
+            'season_name': season_name,
+            'matches': len(matches['id']),
+            'users': len(plan['user_ids']),
+            'combinations': len(combos),
+            'top_n': top_n,
+            'elapsed': time.perf_counter() - started,
+            'results': results
+        }
@@ -0,0 +1,118 @@
+from typing import NamedTuple, Optional, List, Any
+from sqlalchemy import literal, func
+from config.database import User, MatchHistory, MatchHistoryAll
+
+
+def _get_item(self, key):
+    """row['列名'] でも参照できるようにする（整数・スライスは通常のタプルとして扱う）"""
+    if isinstance(key, str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    return tuple.__getitem__(self, key)
+
+
+def _get(self, key, default=None):
+    """dict.get と同じ形式で参照"""
+    return getattr(self, key, default) if key in self._fields else default
+
+
+def _keys(self):
+    """列名の一覧（dict(row) で辞書に変換できる）"""
+    return self._fields
+
+
+class UserRow(NamedTuple):
+    """一覧表示用のユーザー読み取りモデル（_user_to_dict と同じキーを持つ）"""
+    id: int
+    discord_id: Optional[str]
+    user_name: Optional[str]
+    shadowverse_id: Optional[str]
+    rating: Optional[float]
+    trust_points: Optional[int]
+    win_count: Optional[int]
+    loss_count: Optional[int]
+    total_matches: Optional[int]
+    win_streak: Optional[int]
+    max_win_streak: Optional[int]
+    stayed_rating: Optional[float]
+    stayed_win_count: Optional[int]
+    stayed_loss_count: Optional[int]
+    stayed_total_matches: Optional[int]
+    stay_flag: Optional[bool]
+    latest_season_matched: Optional[bool]
+    class1: Optional[str]
+    class2: Optional[str]
+    name_change_available: Optional[bool]
+    premium_days_remaining: int
+
+    __getitem__ = _get_item
+    get = _get
+    keys = _keys
+
+
+class MatchRow(NamedTuple):
+    """試合履歴の読み取りモデル（_match_to_dict と同じキーを持つ）"""
+    id: int
+    user1_id: Optional[int]
+    user2_id: Optional[int]
+    match_date: Optional[str]
+    season_name: Optional[str]
+    user1_class_a: Optional[str]
+    user1_class_b: Optional[str]
+    user2_class_a: Optional[str]
+    user2_class_b: Optional[str]
+    user1_rating_change: Optional[float]
+    user2_rating_change: Optional[float]
+    winner_user_id: Optional[int]
+    loser_user_id: Optional[int]
+    before_user1_rating: Optional[float]
+    before_user2_rating: Optional[float]
+    after_user1_rating: Optional[float]
+    after_user2_rating: Optional[float]
+    user1_stay_flag: Optional[int]
+    user2_stay_flag: Optional[int]
+    user1_selected_class: Optional[str]
+    user2_selected_class: Optional[str]
+
+    __getitem__ = _get_item
+    get = _get
+    keys = _keys
+
+
+# 古いデータベースにない可能性のある列と、その場合の既定値
+_USER_OPTIONAL_DEFAULTS = {
+    'name_change_available': True,
+    'premium_days_remaining': 0,
+}
+_MATCH_OPTIONAL_DEFAULTS = {
+    'user1_selected_class': None,
+    'user2_selected_class': None,
+}
+
+
+def _project(entity, fields, optional_defaults, table_columns) -> List[Any]:
+    """読み取りモデルの列順に select() する列を作成（存在しない任意列は既定値のリテラル）"""
+    columns = []
+    for field in fields:
+        if field in table_columns:
+            column = getattr(entity, field)
+            if field == 'premium_days_remaining':
+                column = func.coalesce(column, 0)
+            columns.append(column.label(field))
+        elif field in optional_defaults:
+            columns.append(literal(optional_defaults[field]).label(field))
+        else:
+            raise AttributeError(f"{entity} has no column {field}")
+    return columns
+
+
+# 任意列の有無は起動時（automap反映後）に一度だけ判定する
+_USER_TABLE_COLUMNS = set(User.__table__.columns.keys())
+USER_HAS_NAME_CHANGE_AVAILABLE = 'name_change_available' in _USER_TABLE_COLUMNS
+USER_HAS_PREMIUM_DAYS = 'premium_days_remaining' in _USER_TABLE_COLUMNS
+USER_ROW_COLUMNS = _project(User, UserRow._fields, _USER_OPTIONAL_DEFAULTS, _USER_TABLE_COLUMNS)
+_MATCH_TABLE_COLUMNS = set(MatchHistory.__table__.columns.keys())
+MATCH_ROW_COLUMNS = _project(MatchHistory, MatchRow._fields, _MATCH_OPTIONAL_DEFAULTS, _MATCH_TABLE_COLUMNS)
+MATCH_ALL_ROW_COLUMNS = _project(MatchHistoryAll, MatchRow._fields, _MATCH_OPTIONAL_DEFAULTS, _MATCH_TABLE_COLUMNS)
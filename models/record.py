@@ -6,6 +6,7 @@ from sqlalchemy import desc
 from models.user import UserModel
 from models.season import SeasonModel
 from models.match import MatchModel
+from models.deck_class import deck_class_registry
 import logging
 
 class CurrentSeasonRecordView(View):
@@ -141,13 +142,8 @@ class ClassSelect(Select):
         self.season_id = season_id
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # データベースからクラス名を取得
-        user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
-        
-        options = [
-            discord.SelectOption(label="全クラス", value="all_classes")
-        ] + [discord.SelectOption(label=cls, value=cls) for cls in valid_classes]
+        # 作成済みの選択肢を使う（全クラスを先頭に含む）
+        options = deck_class_registry.select_options(include_all=True)
         
         super().__init__(
             placeholder="クラスを選択してください...", 
@@ -242,6 +238,11 @@ class Last50RecordButton(Button):
             current_embed = None
             matches_per_embed = 10
             
+            # 対戦相手をまとめて取得
+            opponents = user_model.get_users_by_ids(
+                match['user2_id'] if match['user1_id'] == user_id else match['user1_id'] for match in matches
+            )
+            
             for i, match in enumerate(matches):
                 # 10試合ごとに新しいEmbedを作成
                 if i % matches_per_embed == 0:
@@ -253,13 +254,13 @@ class Last50RecordButton(Button):
                 
                 # 対戦相手名を取得
                 if match['user1_id'] == user_id:
-                    opponent_data = user_model.get_user_by_id(match['user2_id'])
+                    opponent_data = opponents.get(match['user2_id'])
                     user_rating_change = match['user1_rating_change']
                     after_rating = match['after_user1_rating']
                     before_rating = match['before_user1_rating']
                     user_won = match['winner_user_id'] == user_id
                 else:
-                    opponent_data = user_model.get_user_by_id(match['user1_id'])
+                    opponent_data = opponents.get(match['user1_id'])
                     user_rating_change = match['user2_rating_change']
                     after_rating = match['after_user2_rating']
                     before_rating = match['before_user2_rating']
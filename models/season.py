@@ -1,10 +1,178 @@
-from typing import Optional, List, Dict, Any
+import os
+import copy
+import json
+import logging
+import time
+import threading
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_
 from models.base import BaseModel
 from config.database import Season, UserSeasonRecord, User
-from config.settings import JST
+from config.settings import JST, CLOSED_SEASON_CACHE_PATH, CURRENT_SEASON_CACHE_TTL
+
+class ClosedSeasonCache:
+    """終了シーズンのデータ（シーズン一覧・シーズン情報・ランキング）の永続キャッシュ
+    
+    終了したシーズンは変化しないため期限なしで保持し、path を指定した場合はJSONファイルにも保存して
+    再起動後も再利用する。破棄するのはシーズンの終了・確定と試合結果の反転時、
+    およびランキングに表示するユーザー名の変更時のみ。
+    キーは 'past_seasons'、'season:{id}'、'ranking:{id}:{種類}' の文字列で、値はJSONに変換できる形式に限る。
+    読み込み関数はエラー時に空の結果を返すことがあるため、空の値（None・空リストなど）は保存しない。
+    """
+    
+    def __init__(self, path: Optional[str] = CLOSED_SEASON_CACHE_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._entries = None
+        self.hits = 0
+        self.misses = 0
+    
+    def _load(self) -> Dict[str, Any]:
+        """初回アクセス時にファイルから読み込む（読み込めない場合は空から開始）"""
+        if self._entries is None:
+            self._entries = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        # 以前のバージョンが保存した空の値は読み込まない
+                        self._entries = {key: value for key, value in json.load(f).items() if value}
+                    self.logger.info(f"Loaded {len(self._entries)} closed season cache entries from {self.path}")
+                except (OSError, ValueError) as e:
+                    self.logger.error(f"Failed to load closed season cache: {e}")
+        return self._entries
+    
+    def _save(self):
+        """ファイルへ書き出す（一時ファイルに書いてから置き換える）"""
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.error(f"Failed to save closed season cache: {e}")
+    
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュ済みの値のコピーを返す（なければ None）"""
+        with self.lock:
+            entries = self._load()
+            if key in entries:
+                self.hits += 1
+                return copy.deepcopy(entries[key])
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, value: Any):
+        """値を保存（空の値は保存しない）"""
+        if not value:
+            return
+        with self.lock:
+            self._load()[key] = copy.deepcopy(value)
+            self._save()
+    
+    def get_or_load(self, key: str, load: Callable[[], Any]) -> Any:
+        """キャッシュ済みの値を返し、なければ load() の結果を保存して返す（None・空の結果は保存しない）"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = load()
+        self.put(key, value)
+        return value
+    
+    def invalidate(self, season_id: Optional[int] = None):
+        """キャッシュを破棄（season_id を指定した場合はそのシーズンの情報・ランキングとシーズン一覧のみ）"""
+        with self.lock:
+            entries = self._load()
+            if season_id is None:
+                entries.clear()
+            else:
+                for key in [key for key in entries
+                            if key == 'past_seasons' or key == f"season:{season_id}"
+                            or key.startswith(f"ranking:{season_id}:")]:
+                    del entries[key]
+            self._save()
+        self.logger.info(f"Closed season cache invalidated (season_id={season_id})")
+    
+    def invalidate_rankings(self):
+        """全シーズンのランキングを破棄（ランキングに含まれるユーザー名が変わった場合）"""
+        with self.lock:
+            entries = self._load()
+            for key in [key for key in entries if key.startswith('ranking:')]:
+                del entries[key]
+            self._save()
+
+# プロセス内で共有する終了シーズンキャッシュ
+closed_season_cache = ClosedSeasonCache()
+
+class CurrentSeasonCache:
+    """現在のシーズン（end_date が NULL の最新シーズン）のプロセス内キャッシュ
+    
+    キュー参加・試合作成・ランキング表示のたびに行われるシーズン確認をDBへ問い合わせずに済ませる。
+    create_season / end_season が成功時に set() で即時更新し、ttl 秒経過後は念のため再読み込みする。
+    シーズンがない状態（None）もキャッシュする。
+    """
+    
+    def __init__(self, ttl: float = CURRENT_SEASON_CACHE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._season = None
+        self._loaded_at = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_load(self, load: Callable[[], Any]) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのシーズン情報のコピーを返し、未読み込み・期限切れであれば load() で読み込む
+        
+        load() が例外を送出した場合は何も保存せずにそのまま送出する。
+        """
+        with self.lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return dict(self._season) if self._season else None
+            self.misses += 1
+            generation = self.generation
+        
+        season = load()
+        with self.lock:
+            # 読み込み中に set()・invalidate() された場合はそちらを優先する
+            if generation == self.generation:
+                self._season = dict(season) if season else None
+                self._loaded_at = time.monotonic()
+        return dict(season) if season else None
+    
+    def set(self, season: Optional[Dict[str, Any]]):
+        """現在のシーズンを更新（シーズン開始・終了時のフック）"""
+        with self.lock:
+            self.generation += 1
+            self._season = dict(season) if season else None
+            self._loaded_at = time.monotonic()
+    
+    def invalidate(self):
+        """次回の参照時にDBから読み込み直す"""
+        with self.lock:
+            self.generation += 1
+            self._loaded_at = None
+
+# プロセス内で共有する現在のシーズンキャッシュ
+current_season_cache = CurrentSeasonCache()
+
+class SeasonInfo:
+    """get_current_season が返すシーズン情報（セッション外で属性参照できる形式）"""
+    
+    def __init__(self, data: Dict[str, Any]):
+        self.id = data['id']
+        self.season_name = data['season_name']
+        self.start_date = data['start_date']
+        self.end_date = data['end_date']
+        self.created_at = data.get('created_at')
 
 class SeasonModel(BaseModel):
     """シーズン関連のデータベース操作"""
@@ -15,8 +183,8 @@ class SeasonModel(BaseModel):
         self.UserSeasonRecord = UserSeasonRecord
         self.User = User
     
-    def get_current_season(self) -> Optional[Season]:
-        """現在のシーズンを取得（データをコピーして返す）"""
+    def _get_current_season_data(self) -> Optional[Dict[str, Any]]:
+        """現在のシーズンを辞書で取得（current_season_cache 経由）"""
         def _get_current(session: Session):
             season = session.query(self.Season).filter(
                 self.Season.end_date.is_(None)
@@ -33,54 +201,41 @@ class SeasonModel(BaseModel):
                 }
             return None
         
-        season_data = self.safe_execute(_get_current)
-        if season_data:
-            # 辞書データから簡単なオブジェクトを作成
-            class SeasonInfo:
-                def __init__(self, data):
-                    self.id = data['id']
-                    self.season_name = data['season_name']
-                    self.start_date = data['start_date']
-                    self.end_date = data['end_date']
-                    self.created_at = data.get('created_at')
-            
-            return SeasonInfo(season_data)
-        return None
+        try:
+            return current_season_cache.get_or_load(lambda: self.execute_with_session(_get_current))
+        except Exception as e:
+            # 読み込みに失敗した場合は「シーズンなし」をキャッシュせずに返す
+            self.logger.error(f"Error loading current season: {e}")
+            return None
+    
+    def refresh_current_season(self) -> Optional[Dict[str, Any]]:
+        """現在のシーズンをDBから読み込み直す"""
+        current_season_cache.invalidate()
+        return self._get_current_season_data()
+    
+    def get_current_season(self) -> Optional[SeasonInfo]:
+        """現在のシーズンを取得（データをコピーして返す）"""
+        season_data = self._get_current_season_data()
+        return SeasonInfo(season_data) if season_data else None
     
     def get_current_season_name(self) -> Optional[str]:
         """現在のシーズン名を取得"""
-        def _get_current_name(session: Session):
-            season = session.query(self.Season).filter(
-                self.Season.end_date == None
-            ).order_by(desc(self.Season.id)).first()
-            return season.season_name if season else None
-        
-        return self.safe_execute(_get_current_name)
+        season_data = self._get_current_season_data()
+        return season_data['season_name'] if season_data else None
     
     def get_current_season_id(self) -> Optional[int]:
         """現在のシーズンIDを取得"""
-        def _get_current_id(session: Session):
-            season = session.query(self.Season).filter(
-                self.Season.end_date.is_(None)
-            ).order_by(desc(self.Season.id)).first()
-            return season.id if season else None
-        
-        return self.safe_execute(_get_current_id)
+        season_data = self._get_current_season_data()
+        return season_data['id'] if season_data else None
     
     def is_season_active(self) -> bool:
         """シーズンがアクティブかチェック"""
-        def _is_active(session: Session):
-            season = session.query(self.Season).filter(
-                self.Season.end_date == None
-            ).order_by(desc(self.Season.id)).first()
-            
-            if not season:
-                return False
-            
-            return (season.start_date is not None and 
-                    season.end_date is None)
+        season_data = self._get_current_season_data()
+        if not season_data:
+            return False
         
-        return self.safe_execute(_is_active) or False
+        return (season_data['start_date'] is not None and 
+                season_data['end_date'] is None)
     
     def create_season(self, season_name: str) -> Optional[Dict[str, Any]]:
         """新しいシーズンを作成"""
@@ -121,7 +276,10 @@ class SeasonModel(BaseModel):
                 'created_at': getattr(new_season, 'created_at', None)
             }
         
-        return self.execute_with_session(_create_season)
+        new_season = self.execute_with_session(_create_season)
+        if new_season:
+            current_season_cache.set(new_season)
+        return new_season
     
     def end_season(self) -> Optional[Dict[str, Any]]:
         """現在のシーズンを終了"""
@@ -145,7 +303,12 @@ class SeasonModel(BaseModel):
                 'created_at': getattr(current_season, 'created_at', None)
             }
         
-        return self.execute_with_session(_end_season)
+        ended_season = self.execute_with_session(_end_season)
+        if ended_season:
+            current_season_cache.set(None)
+            # 終了シーズンの一覧が変わるため破棄
+            closed_season_cache.invalidate(ended_season['id'])
+        return ended_season
     
     def get_past_seasons(self) -> List[Dict[str, Any]]:
         """過去のシーズン一覧を取得"""
@@ -165,10 +328,18 @@ class SeasonModel(BaseModel):
                 for season in seasons
             ]
         
-        return self.safe_execute(_get_past_seasons) or []
+        # 終了シーズンの一覧は次のシーズン終了まで変わらない
+        return closed_season_cache.get_or_load(
+            'past_seasons', lambda: self.safe_execute(_get_past_seasons)
+        ) or []
     
     def get_season_by_id(self, season_id: int) -> Optional[Dict[str, Any]]:
-        """IDでシーズンを取得"""
+        """IDでシーズンを取得（終了済みシーズンはキャッシュから返す）"""
+        cache_key = f"season:{season_id}"
+        cached = closed_season_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         def _get_season(session: Session):
             season = session.query(self.Season).filter_by(id=season_id).first()
             if season:
@@ -181,7 +352,10 @@ class SeasonModel(BaseModel):
                 }
             return None
         
-        return self.safe_execute(_get_season)
+        season_data = self.safe_execute(_get_season)
+        if season_data and season_data['end_date'] is not None:
+            closed_season_cache.put(cache_key, season_data)
+        return season_data
     
     def get_all_seasons(self) -> List[Dict[str, Any]]:
         """全シーズンを取得"""
@@ -344,7 +518,10 @@ class SeasonModel(BaseModel):
                 'records_created': records_created
             }
         
-        return self.execute_with_session(_finalize_season)
+        result = self.execute_with_session(_finalize_season)
+        # シーズン記録が書き換わるため、このシーズンのランキングを破棄
+        closed_season_cache.invalidate(season_id)
+        return result
     
     def get_season_statistics(self, season_id: int) -> Dict[str, Any]:
         """シーズンの統計情報を取得"""
@@ -0,0 +1,513 @@
+import os
+import json
+import math
+import threading
+import logging
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config.settings import JST, VALID_CLASSES, MATCH_SNAPSHOT_DIR, MATCH_SNAPSHOT_FLUSH_INTERVAL
+
+# スナップショットの列定義（列名 → dtype）
+SNAPSHOT_COLUMNS = {
+    'id': np.int32,
+    'user1_id': np.int32,
+    'user2_id': np.int32,
+    'winner_user_id': np.int32,
+    'season': np.uint16,
+    'match_epoch': np.int64,
+    'user1_class_a': np.uint8,
+    'user1_class_b': np.uint8,
+    'user2_class_a': np.uint8,
+    'user2_class_b': np.uint8,
+    'user1_selected_class': np.uint8,
+    'user2_selected_class': np.uint8,
+    'user1_rating_change': np.int16,
+    'user2_rating_change': np.int16,
+}
+
+SNAPSHOT_VERSION = 3  # 2: id の昇順を保証, 3: レート変動の丸めを SQLite の ROUND に合わせる
+INITIAL_CAPACITY = 4096
+META_FILE = 'meta.json'
+
+# 内容の指紋（行ごとのハッシュの合計）の法。行数が増えても合計が64ビットに収まる大きさにする
+FINGERPRINT_MODULUS = 2147483647
+
+# SQLite の全試合履歴から、スナップショットの行と同じ値で内容の指紋を計算する式
+_ROUNDED_CHANGE_SQL = "(CAST(ROUND(COALESCE({column}, 0)) AS INTEGER) + 32768)"
+_FINGERPRINT_SQL = (
+    f"((((id % {FINGERPRINT_MODULUS}) * 31 + winner_user_id) % {FINGERPRINT_MODULUS} * 31 "
+    f"+ {_ROUNDED_CHANGE_SQL.format(column='user1_rating_change')}) % {FINGERPRINT_MODULUS} * 31 "
+    f"+ {_ROUNDED_CHANGE_SQL.format(column='user2_rating_change')}) % {FINGERPRINT_MODULUS}"
+)
+
+
+def round_rating_change(value: Optional[float]) -> int:
+    """レート変動を整数に丸める（SQLite の ROUND と同じく 0.5 は0から遠い方へ）"""
+    value = value or 0
+    return int(math.floor(abs(value) + 0.5)) * (1 if value >= 0 else -1)
+
+
+def match_date_to_epoch(match_date: Optional[str]) -> int:
+    """match_date 文字列（JST, '%Y-%m-%d %H:%M:%S'）をUNIX秒に変換"""
+    if not match_date:
+        return 0
+    try:
+        return int(datetime.strptime(match_date[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=JST).timestamp())
+    except ValueError:
+        return int(datetime.strptime(match_date[:10], '%Y-%m-%d').replace(tzinfo=JST).timestamp())
+
+
+class MatchSnapshot:
+    """試合履歴の列指向スナップショット（メモリマップされたNumPy配列）
+
+    完了した試合のみを保持し、クラス名・シーズン名は整数コードで格納する
+    （0 は未設定）。行は id の昇順に並べる。試合を確定・更新したトランザクションの
+    コミット後に追記され（stage_snapshot_matches）、SQLiteからいつでも再構築できる。
+    """
+
+    def __init__(self, directory: str = MATCH_SNAPSHOT_DIR,
+                 flush_interval: int = MATCH_SNAPSHOT_FLUSH_INTERVAL):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.count = 0
+        self.capacity = 0
+        self.max_id = 0
+        self._unflushed = 0
+        self.classes: List[str] = list(VALID_CLASSES)
+        self.seasons: List[str] = []
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._loaded = False
+
+    # ---- 永続化 ----
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npy")
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, META_FILE)
+
+    def _save_meta(self):
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'count': self.count,
+            'capacity': self.capacity,
+            'classes': self.classes,
+            'seasons': self.seasons,
+        }
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path())
+
+    def _flush(self):
+        """列ファイルとメタ情報をディスクに反映"""
+        for array in self._arrays.values():
+            array.flush()
+        self._save_meta()
+        self._unflushed = 0
+
+    def _open(self) -> bool:
+        """ディスク上のスナップショットを開く（存在しない・不整合の場合は False）
+
+        試合数・最大ID・内容の指紋（id・勝者・レート変動）をSQLiteの全試合履歴と照合し、
+        一致しなければ開かない。ディスクに反映する前に終了した追記や、スナップショット外での
+        変更（試合数が変わらない勝者・レート変動の修正を含む）を検出する。
+        指紋はメタ情報に保存せず列ファイルの内容から計算し、途中まで書き込まれた列も検出する。
+        """
+        try:
+            with open(self._meta_path(), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != SNAPSHOT_VERSION:
+                return False
+
+            arrays = {}
+            for name, dtype in SNAPSHOT_COLUMNS.items():
+                array = np.lib.format.open_memmap(self._column_path(name), mode='r+')
+                if array.dtype != dtype or len(array) != meta['capacity']:
+                    return False
+                arrays[name] = array
+
+            count = meta['count']
+            max_id = int(arrays['id'][count - 1]) if count else 0
+            fingerprint = self._fingerprint(arrays, count)
+            db_count, db_max_id, db_fingerprint = self._database_extent()
+            if (count, max_id, fingerprint) != (db_count, db_max_id, db_fingerprint):
+                self.logger.info(
+                    f"Match snapshot is out of date ({count} matches up to id {max_id}, "
+                    f"database has {db_count} up to id {db_max_id}, "
+                    f"fingerprint {'matches' if fingerprint == db_fingerprint else 'differs'})"
+                )
+                return False
+
+            self._arrays = arrays
+            self.count = count
+            self.capacity = meta['capacity']
+            self.max_id = max_id
+            self.classes = meta['classes']
+            self.seasons = meta['seasons']
+            self._unflushed = 0
+            return True
+        except Exception as e:
+            self.logger.debug(f"Match snapshot could not be opened: {e}")
+            return False
+
+    @staticmethod
+    def _fingerprint(arrays: Dict[str, np.ndarray], count: int) -> int:
+        """先頭 count 行の内容の指紋（_FINGERPRINT_SQL と同じ計算）"""
+        m = FINGERPRINT_MODULUS
+        ids = arrays['id'][:count].astype(np.int64)
+        winners = arrays['winner_user_id'][:count].astype(np.int64)
+        change1 = arrays['user1_rating_change'][:count].astype(np.int64) + 32768
+        change2 = arrays['user2_rating_change'][:count].astype(np.int64) + 32768
+        hashes = ((((ids % m) * 31 + winners) % m * 31 + change1) % m * 31 + change2) % m
+        return int(hashes.sum())
+
+    def _database_extent(self):
+        """SQLiteの全試合履歴（アーカイブ含む）の完了した試合の件数・最大ID・内容の指紋を取得"""
+        from sqlalchemy import text
+        from config.database import engine, MATCH_HISTORY_ALL_VIEW
+
+        with engine.connect() as conn:
+            count, max_id, fingerprint = conn.execute(text(
+                f"SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM({_FINGERPRINT_SQL}), 0) "
+                f"FROM {MATCH_HISTORY_ALL_VIEW} WHERE winner_user_id IS NOT NULL"
+            )).one()
+        return int(count), int(max_id), int(fingerprint)
+
+    def _allocate(self, capacity: int, existing: Optional[Dict[str, np.ndarray]] = None):
+        """指定容量の列ファイルを作成（既存データがあればコピー）"""
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {}
+        for name, dtype in SNAPSHOT_COLUMNS.items():
+            tmp_path = self._column_path(name) + '.tmp'
+            array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(capacity,))
+            if existing is not None:
+                array[:self.count] = existing[name][:self.count]
+            array.flush()
+            del array
+            os.replace(tmp_path, self._column_path(name))
+            arrays[name] = np.lib.format.open_memmap(self._column_path(name), mode='r+')
+        self._arrays = arrays
+        self.capacity = capacity
+
+    def ensure_loaded(self) -> bool:
+        """スナップショットを読み込み、なければSQLiteから再構築"""
+        if self._loaded:
+            return True
+        with self.lock:
+            if not self._loaded and self._open():
+                self._loaded = True
+        if not self._loaded:
+            self._loaded = self.rebuild() is not None
+        return self._loaded
+
+    # ---- コード変換 ----
+
+    def _class_code(self, class_name: Optional[str]) -> int:
+        if not class_name:
+            return 0
+        if class_name not in self.classes:
+            self.classes.append(class_name)
+        return self.classes.index(class_name) + 1
+
+    def _season_code(self, season_name: Optional[str]) -> int:
+        if not season_name:
+            return 0
+        if season_name not in self.seasons:
+            self.seasons.append(season_name)
+        return self.seasons.index(season_name) + 1
+
+    def _encode_row(self, match: Dict[str, Any]) -> Dict[str, int]:
+        return {
+            'id': match['id'],
+            'user1_id': match['user1_id'],
+            'user2_id': match['user2_id'],
+            'winner_user_id': match['winner_user_id'],
+            'season': self._season_code(match.get('season_name')),
+            'match_epoch': match_date_to_epoch(match.get('match_date')),
+            'user1_class_a': self._class_code(match.get('user1_class_a')),
+            'user1_class_b': self._class_code(match.get('user1_class_b')),
+            'user2_class_a': self._class_code(match.get('user2_class_a')),
+            'user2_class_b': self._class_code(match.get('user2_class_b')),
+            'user1_selected_class': self._class_code(match.get('user1_selected_class')),
+            'user2_selected_class': self._class_code(match.get('user2_selected_class')),
+            'user1_rating_change': round_rating_change(match.get('user1_rating_change')),
+            'user2_rating_change': round_rating_change(match.get('user2_rating_change')),
+        }
+
+    # ---- 書き込み ----
+
+    def rebuild(self) -> Optional[int]:
+        """SQLiteの全試合履歴（アーカイブ含む）から全件再構築し、行数を返す"""
+        try:
+            from sqlalchemy import text
+            from config.database import engine, MATCH_HISTORY_ALL_VIEW
+
+            with engine.connect() as conn:
+                rows = conn.execute(text(
+                    "SELECT id, user1_id, user2_id, winner_user_id, season_name, match_date, "
+                    "user1_class_a, user1_class_b, user2_class_a, user2_class_b, "
+                    "user1_selected_class, user2_selected_class, "
+                    "user1_rating_change, user2_rating_change "
+                    f"FROM {MATCH_HISTORY_ALL_VIEW} WHERE winner_user_id IS NOT NULL ORDER BY id"
+                )).mappings().all()
+
+            # クラスのコードはデッキクラス参照データのコード（1始まり）に揃える
+            from models.deck_class import deck_class_registry
+            classes = deck_class_registry.class_names
+            classes.extend(cls for cls in VALID_CLASSES if cls not in classes)
+
+            with self.lock:
+                self.classes = classes
+                self.seasons = []
+                self.count = 0
+                self._allocate(max(INITIAL_CAPACITY, len(rows) * 2))
+
+                encoded = [self._encode_row(row) for row in rows]
+                for name, dtype in SNAPSHOT_COLUMNS.items():
+                    self._arrays[name][:len(encoded)] = np.fromiter(
+                        (row[name] for row in encoded), dtype=dtype, count=len(encoded)
+                    )
+                    self._arrays[name].flush()
+
+                self.count = len(encoded)
+                self.max_id = int(encoded[-1]['id']) if encoded else 0
+                self._save_meta()
+                self._unflushed = 0
+                self._loaded = True
+
+            self.logger.info(f"Match snapshot rebuilt with {self.count} matches")
+            return self.count
+        except Exception as e:
+            self.logger.error(f"Error rebuilding match snapshot: {e}")
+            return None
+
+    def _reserve_row(self, position: int) -> int:
+        """position に空き行を確保（後ろの行は1行ずつずらす）"""
+        if self.count >= self.capacity:
+            self._allocate(self.capacity * 2, existing=self._arrays)
+        if position < self.count:
+            for array in self._arrays.values():
+                array[position + 1:self.count + 1] = array[position:self.count]
+        self.count += 1
+        return position
+
+    def _row_index(self, row_id: int) -> int:
+        """IDの行位置を取得（ない場合は id の昇順を保つ位置に行を確保）
+
+        新しい試合は最大IDより大きいため末尾に追加する。既存の試合の更新と、
+        結果の確定がプレースホルダーの作成順と前後した試合は二分探索で位置を求める。
+        """
+        if row_id > self.max_id:
+            self.max_id = row_id
+            return self._reserve_row(self.count)
+
+        ids = self._arrays['id']
+        position = int(np.searchsorted(ids[:self.count], row_id))
+        if position < self.count and ids[position] == row_id:
+            return position
+        return self._reserve_row(position)
+
+    def append_many(self, matches: List[Dict[str, Any]]) -> bool:
+        """確定・更新した試合を追記（同じIDがあれば上書き）
+
+        ディスクへの反映は flush_interval 件ごとにまとめて行う。反映前に終了した場合は
+        次回の読み込み時に試合数・最大IDの照合で検出して再構築する。
+        """
+        matches = [match for match in matches if match and match.get('winner_user_id') is not None]
+        if not matches:
+            return False
+        if not self._loaded:
+            # 未読み込みの場合はディスク上のスナップショットを無効化し、次回読み込み時に再構築
+            self.invalidate()
+            return False
+
+        try:
+            with self.lock:
+                for match in matches:
+                    row = self._encode_row(match)
+                    index = self._row_index(row['id'])
+                    for name, value in row.items():
+                        self._arrays[name][index] = value
+                self._unflushed += len(matches)
+                if self._unflushed >= self.flush_interval:
+                    self._flush()
+            return True
+        except Exception as e:
+            self.logger.error(f"Error appending {len(matches)} matches to snapshot: {e}")
+            # 不整合を避けるため次回アクセス時に再構築
+            self.invalidate()
+            return False
+
+    def append(self, match: Dict[str, Any]) -> bool:
+        """確定した試合を1件追記（同じIDがあれば上書き）"""
+        return self.append_many([match])
+
+    def flush(self):
+        """未反映の追記をディスクに反映（終了時に呼び出す）"""
+        with self.lock:
+            if self._loaded and self._unflushed:
+                self._flush()
+
+    def invalidate(self):
+        """スナップショットを無効化（次回アクセス時にSQLiteから再構築）"""
+        with self.lock:
+            self._loaded = False
+            try:
+                os.remove(self._meta_path())
+            except FileNotFoundError:
+                pass
+
+    # ---- 読み込み ----
+
+    def columns(self) -> Optional[Dict[str, np.ndarray]]:
+        """有効範囲の列ビューを取得（読み込みに失敗した場合は None）"""
+        if not self.ensure_loaded():
+            return None
+        with self.lock:
+            return {name: array[:self.count] for name, array in self._arrays.items()}
+
+    def _period_mask(self, cols: Dict[str, np.ndarray], season_name: Optional[str] = None,
+                     start_epoch: Optional[int] = None, end_epoch: Optional[int] = None) -> np.ndarray:
+        mask = np.ones(len(cols['id']), dtype=bool)
+        if season_name:
+            if season_name not in self.seasons:
+                return np.zeros(len(cols['id']), dtype=bool)
+            mask &= cols['season'] == self.seasons.index(season_name) + 1
+        if start_epoch is not None:
+            mask &= cols['match_epoch'] >= start_epoch
+        if end_epoch is not None:
+            mask &= cols['match_epoch'] <= end_epoch
+        return mask
+
+    def user_period_summary(self, user_id: int, start_epoch: Optional[int] = None,
+                            end_epoch: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """ユーザーの期間内の勝敗数と最初・最後の試合日時を集計"""
+        cols = self.columns()
+        if cols is None:
+            return None
+
+        mask = self._period_mask(cols, start_epoch=start_epoch, end_epoch=end_epoch)
+        mask &= (cols['user1_id'] == user_id) | (cols['user2_id'] == user_id)
+
+        total = int(np.count_nonzero(mask))
+        wins = int(np.count_nonzero(mask & (cols['winner_user_id'] == user_id)))
+        epochs = cols['match_epoch'][mask]
+
+        return {
+            'total_matches': total,
+            'win_count': wins,
+            'loss_count': total - wins,
+            'first_epoch': int(epochs.min()) if total else None,
+            'last_epoch': int(epochs.max()) if total else None,
+        }
+
+    def opponent_class_stats(self, user_id: int, selected_class: str, season_name: Optional[str] = None,
+                             start_epoch: Optional[int] = None,
+                             end_epoch: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """指定クラス使用時の対戦相手の選択クラス別戦績を集計"""
+        cols = self.columns()
+        if cols is None:
+            return None
+        if selected_class not in self.classes:
+            return []
+
+        code = self.classes.index(selected_class) + 1
+        is_user1 = (cols['user1_id'] == user_id) & (cols['user1_selected_class'] == code)
+        is_user2 = (cols['user2_id'] == user_id) & (cols['user2_selected_class'] == code)
+        mask = (is_user1 | is_user2) & self._period_mask(cols, season_name, start_epoch, end_epoch)
+
+        opponent_codes = np.where(is_user1, cols['user2_selected_class'], cols['user1_selected_class'])[mask]
+        won = (cols['winner_user_id'] == user_id)[mask]
+
+        minlength = len(self.classes) + 1
+        totals = np.bincount(opponent_codes, minlength=minlength)
+        wins = np.bincount(opponent_codes, weights=won, minlength=minlength).astype(np.int64)
+
+        result = []
+        for cls in VALID_CLASSES:
+            index = self.classes.index(cls) + 1
+            total_matches = int(totals[index])
+            if total_matches > 0:
+                my_wins = int(wins[index])
+                result.append({
+                    'opponent_class': cls,
+                    'total_matches': total_matches,
+                    'opponent_wins': total_matches - my_wins,
+                    'my_wins': my_wins,
+                    'win_rate': (my_wins / total_matches) * 100
+                })
+        return result
+
+
+_match_snapshot: Optional[MatchSnapshot] = None
+
+
+def get_match_snapshot() -> MatchSnapshot:
+    """プロセス共通の試合履歴スナップショットを取得"""
+    global _match_snapshot
+    if _match_snapshot is None:
+        _match_snapshot = MatchSnapshot()
+    return _match_snapshot
+
+
+def stage_snapshot_matches(session: Session, matches: List[Dict[str, Any]]):
+    """確定・更新した試合を、セッションのコミット後にスナップショットへ追記するよう登録
+
+    登録時の（SAVEPOINT を含む）トランザクションがロールバックされた場合は破棄する。
+    """
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault('snapshot_matches', []).extend((transaction, match) for match in matches)
+
+
+def stage_snapshot_invalidation(session: Session):
+    """セッションのコミット後にスナップショットを無効化するよう登録（一括更新した場合など）
+
+    コミット前に無効化すると、他の接続がコミット前のデータで再構築してしまうため。
+    """
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault('snapshot_invalidations', []).append(transaction)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_matches(session, previous_transaction):
+    """ロールバックされたトランザクション（とその内側）で登録した試合・無効化を破棄"""
+    staged = session.info.get('snapshot_matches')
+    invalidations = session.info.get('snapshot_invalidations')
+    if not staged and not invalidations:
+        return
+
+    def rolled_back(transaction) -> bool:
+        while transaction is not None:
+            if transaction is previous_transaction:
+                return True
+            transaction = transaction.parent
+        return False
+
+    if staged:
+        session.info['snapshot_matches'] = [
+            (transaction, match) for transaction, match in staged if not rolled_back(transaction)
+        ]
+    if invalidations:
+        session.info['snapshot_invalidations'] = [
+            transaction for transaction in invalidations if not rolled_back(transaction)
+        ]
+
+
+@event.listens_for(Session, "after_commit")
+def _append_committed_matches(session):
+    """最も外側のトランザクションのコミット後に、登録した試合の追記・無効化を実行"""
+    if session.get_nested_transaction() is not None:
+        # SAVEPOINT の解放（外側のトランザクションはまだコミットされていない）
+        return
+    staged = session.info.pop('snapshot_matches', None)
+    if session.info.pop('snapshot_invalidations', None):
+        # 次回アクセス時に再構築されるため、追記は不要
+        get_match_snapshot().invalidate()
+    elif staged:
+        get_match_snapshot().append_many([match for _, match in staged])
@@ -0,0 +1,66 @@
+from sqlalchemy import select, bindparam, case, and_, desc, func
+from config.database import User, MatchHistory
+
+# 頻繁に実行する検索の組み立て済みステートメント
+#
+# session.query(...) で毎回組み立てる代わりにモジュール読み込み時に一度だけ作成し、
+# 値は bindparam で渡す。同じオブジェクトを使い続けるため、キャッシュキーの生成と
+# コンパイル済みSQLのキャッシュ（エンジンの query_cache_size）の参照だけで実行できる。
+#
+#   user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
+
+# Discord ID でユーザーを1件取得
+USER_BY_DISCORD_ID = select(User).where(User.discord_id == bindparam('discord_id')).limit(1)
+
+# ユーザーIDでユーザーを1件取得
+USER_BY_ID = select(User).where(User.id == bindparam('user_id')).limit(1)
+
+# 効果的レート（stay中で stayed_rating の方が高ければ stayed_rating）
+EFFECTIVE_RATING = case(
+    (and_(User.stay_flag == 1, User.stayed_rating > User.rating), User.stayed_rating),
+    else_=User.rating
+)
+
+# 今シーズン参加ユーザーのレーティングランキング（上位 :limit 件）
+RATING_RANKING = (
+    select(
+        User.user_name,
+        EFFECTIVE_RATING.label('effective_rating'),
+        User.rating,
+        User.stayed_rating,
+        User.stay_flag
+    )
+    .where(User.latest_season_matched == True)
+    .order_by(desc('effective_rating'))
+    .limit(bindparam('limit'))
+)
+
+# 効果的レートが :effective_rating より高い今シーズン参加ユーザーの数（順位の計算用）
+HIGHER_RATED_USER_COUNT = (
+    select(func.count())
+    .select_from(User)
+    .where(User.latest_season_matched == True, EFFECTIVE_RATING > bindparam('effective_rating'))
+)
+
+# 結果確定前の試合（create_match_placeholder で作成したもの）の最新の1件
+MATCH_PLACEHOLDER = (
+    select(MatchHistory)
+    .where(
+        MatchHistory.user1_id == bindparam('user1_id'),
+        MatchHistory.user2_id == bindparam('user2_id'),
+        MatchHistory.before_user1_rating == bindparam('before_user1_rating'),
+        MatchHistory.before_user2_rating == bindparam('before_user2_rating'),
+        MatchHistory.after_user1_rating.is_(None)
+    )
+    .order_by(desc(MatchHistory.id))
+    .limit(1)
+)
+
+# 名前 → ステートメント（ベンチマーク・キャッシュサイズの見積もり用）
+STATEMENTS = {
+    'user_by_discord_id': USER_BY_DISCORD_ID,
+    'user_by_id': USER_BY_ID,
+    'rating_ranking': RATING_RANKING,
+    'higher_rated_user_count': HIGHER_RATED_USER_COUNT,
+    'match_placeholder': MATCH_PLACEHOLDER,
+}
@@ -1,15 +1,178 @@
-from typing import Optional, List, Dict, Any
+import threading
+from collections import OrderedDict
+from itertools import chain
+from typing import Optional, List, Dict, Any, Iterable, Callable
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, case, and_
-from models.base import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, text, select, event
+from models.base import BaseModel, writer_context, current_unit_of_work
 from config.database import User, DeckClass
-from config.settings import DEFAULT_RATING, DEFAULT_TRUST_POINTS, JST
+from models.read_models import (
+    UserRow, USER_ROW_COLUMNS, USER_HAS_NAME_CHANGE_AVAILABLE, USER_HAS_PREMIUM_DAYS
+)
+from models.user_search import DEFAULT_SEARCH_LIMIT
+from models.statements import USER_BY_DISCORD_ID, USER_BY_ID, HIGHER_RATED_USER_COUNT
+from config.settings import DEFAULT_RATING, DEFAULT_TRUST_POINTS, JST, USER_CACHE_SIZE
 import logging
 
+# get_users_by_ids で1回のクエリに含めるIDの最大数
+USER_ID_BATCH_SIZE = 500
+
+# 一意制約を付けるユーザー列と、重複時に表示するメッセージ
+USER_UNIQUE_COLUMNS = {
+    'discord_id': "このDiscordアカウントは既に登録されています",
+    'user_name': "このユーザー名は既に使用されています",
+    'shadowverse_id': "このShadowverse IDは既に使用されています",
+}
+
+class UserCache:
+    """ユーザー情報（_user_to_dict の結果）の上限付きLRUキャッシュ（discord_id とユーザーIDの両方で引ける）
+    
+    ユーザー行を変更したセッションがコミット・ロールバックした時点で該当ユーザーを破棄する
+    （下のセッションイベントで自動的に行うため、書き込み側で個別に破棄する必要はない）。
+    読み込み中に破棄が起きた場合は、古い値を保存しないよう世代番号で判定する。
+    書き込みタスクのバッチ・unit_of_work の中でコミット前のユーザー変更がある間は、
+    そのセッションの内容を返すようキャッシュを使わない（has_uncommitted_user_changes）。
+    """
+    
+    def __init__(self, maxsize: int = USER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._by_id = OrderedDict()
+        self._id_by_discord_id = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, user_id: Optional[int] = None, discord_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのユーザー情報のコピーを返す（なければ None）"""
+        with self.lock:
+            if user_id is None:
+                user_id = self._id_by_discord_id.get(str(discord_id))
+            user = self._by_id.get(user_id) if user_id is not None else None
+            if user is None:
+                self.misses += 1
+                return None
+            self._by_id.move_to_end(user_id)
+            self.hits += 1
+            return dict(user)
+    
+    def put(self, user: Dict[str, Any], generation: int):
+        """読み込み開始時の世代番号が変わっていなければ保存"""
+        with self.lock:
+            if generation != self.generation:
+                return
+            self._by_id[user['id']] = dict(user)
+            self._by_id.move_to_end(user['id'])
+            self._id_by_discord_id[str(user['discord_id'])] = user['id']
+            while len(self._by_id) > self.maxsize:
+                _, evicted = self._by_id.popitem(last=False)
+                self._id_by_discord_id.pop(str(evicted['discord_id']), None)
+    
+    def get_or_load(self, load: Callable[[], Optional[Dict[str, Any]]], user_id: Optional[int] = None,
+                    discord_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みであれば返し、なければ load() で読み込んで保存（存在しないユーザーは保存しない）"""
+        if has_uncommitted_user_changes():
+            return load()
+        user = self.get(user_id=user_id, discord_id=discord_id)
+        if user is not None:
+            return user
+        generation = self.generation
+        user = load()
+        if user:
+            self.put(user, generation)
+        return user
+    
+    def invalidate(self, user_ids: Iterable[Optional[int]] = (), discord_ids: Iterable[Optional[str]] = ()):
+        """指定したユーザーを破棄"""
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            for discord_id in discord_ids:
+                user_id = self._id_by_discord_id.pop(str(discord_id), None)
+                if user_id is not None:
+                    self._by_id.pop(user_id, None)
+            for user_id in user_ids:
+                user = self._by_id.pop(user_id, None)
+                if user is not None:
+                    self._id_by_discord_id.pop(str(user['discord_id']), None)
+    
+    def clear(self):
+        """キャッシュを全て破棄"""
+        with self.lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._by_id.clear()
+            self._id_by_discord_id.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._by_id),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations
+            }
+
+# プロセス内で共有するユーザーキャッシュ
+user_cache = UserCache()
+
+def has_uncommitted_user_changes() -> bool:
+    """実行中の書き込みタスクのバッチ・unit_of_work のセッションにコミット前のユーザー変更があるか"""
+    session = getattr(writer_context, 'session', None)
+    if session is None:
+        uow = current_unit_of_work.get()
+        if uow is None or uow.thread_id != threading.get_ident():
+            return False
+        session = uow.session
+    if session.info.get('changed_users') or session.info.get('user_cache_clear'):
+        return True
+    return any(isinstance(obj, User) for obj in chain(session.new, session.dirty, session.deleted))
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """フラッシュされたユーザー行を記録（コミット・ロールバック時に破棄する）"""
+    changed = session.info.setdefault('changed_users', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, User):
+            changed.add((obj.id, obj.discord_id))
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_writes(orm_execute_state):
+    """update(User) などの一括更新はどの行が変わったか追えないため全件破棄の対象にする"""
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info['user_cache_clear'] = True
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_changed_users(session):
+    """変更したユーザーをキャッシュから破棄（最も外側のトランザクションの終了時のみ）"""
+    if session.get_nested_transaction() is not None:
+        # SAVEPOINT の解放・ロールバックでは外側のトランザクションがまだ終わっていない
+        return
+    changed = session.info.pop('changed_users', None)
+    if session.info.pop('user_cache_clear', False):
+        user_cache.clear()
+    elif changed:
+        user_cache.invalidate(
+            user_ids=[user_id for user_id, _ in changed],
+            discord_ids=[discord_id for _, discord_id in changed]
+        )
+
 class UserModel(BaseModel):
     """ユーザー関連のデータベース操作"""
     
+    # 一意インデックスを作成済みの列（ensure_unique_constraints で設定、それ以外の列は登録前に重複を確認する）
+    _unique_columns = frozenset()
+    
     def __init__(self):
         super().__init__()
         self.User = User
@@ -17,19 +180,15 @@ class UserModel(BaseModel):
     
     def create_user(self, discord_id: str, user_name: str, shadowverse_id: str) -> Optional[Dict[str, Any]]:
         """新しいユーザーを作成"""
+        values = {'discord_id': discord_id, 'user_name': user_name, 'shadowverse_id': shadowverse_id}
+        
         def _create_user(session: Session):
-            # 重複チェック
-            existing_user = session.query(self.User).filter_by(discord_id=discord_id).first()
-            if existing_user:
-                raise ValueError("このDiscordアカウントは既に登録されています")
-            
-            existing_name = session.query(self.User).filter_by(user_name=user_name).first()
-            if existing_name:
-                raise ValueError("このユーザー名は既に使用されています")
-            
-            existing_sv_id = session.query(self.User).filter_by(shadowverse_id=shadowverse_id).first()
-            if existing_sv_id:
-                raise ValueError("このShadowverse IDは既に使用されています")
+            # 一意インデックスのない列のみ事前に重複チェック（通常は一意制約に任せて1回のINSERTで済ませる）
+            for column, message in USER_UNIQUE_COLUMNS.items():
+                if column in UserModel._unique_columns:
+                    continue
+                if session.query(self.User.id).filter(getattr(self.User, column) == values[column]).first():
+                    raise ValueError(message)
             
             # 新しいユーザーを作成
             new_user = self.User(
@@ -58,7 +217,19 @@ class UserModel(BaseModel):
                 new_user.name_change_available = True
             
             session.add(new_user)
-            session.flush()  # IDを取得するためにflush
+            try:
+                session.flush()  # IDを取得するためにflush
+            except IntegrityError as e:
+                # 一意制約違反を既存のメッセージに変換（同時登録の競合もここで検出される）
+                error = str(e.orig)
+                for column, message in USER_UNIQUE_COLUMNS.items():
+                    if f"beyond_user.{column}" in error:
+                        raise ValueError(message) from e
+                raise
+            
+            # ユーザー名検索の索引に追加
+            from models.user_search import UserSearchModel
+            UserSearchModel().index_user(session, new_user.id, new_user.user_name)
             
             # セッション外で使用するためにデータをコピー
             return self._user_to_dict(new_user)
@@ -66,20 +237,90 @@ class UserModel(BaseModel):
         return self.execute_with_session(_create_user)
     
     def get_user_by_discord_id(self, discord_id: str) -> Optional[Dict[str, Any]]:
-        """Discord IDでユーザーを取得（セッション外でアクセス可能な形式）"""
+        """Discord IDでユーザーを取得（セッション外でアクセス可能な形式、user_cache 経由）"""
         def _get_user(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             return self._user_to_dict(user) if user else None
         
-        return self.safe_execute(_get_user)
+        return user_cache.get_or_load(lambda: self.safe_execute(_get_user), discord_id=discord_id)
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """IDでユーザーを取得（セッション外でアクセス可能な形式）"""
+        """IDでユーザーを取得（セッション外でアクセス可能な形式、user_cache 経由）"""
         def _get_user(session: Session):
-            user = session.query(self.User).filter_by(id=user_id).first()
+            user = session.scalars(USER_BY_ID, {'user_id': user_id}).first()
             return self._user_to_dict(user) if user else None
         
-        return self.safe_execute(_get_user)
+        return user_cache.get_or_load(lambda: self.safe_execute(_get_user), user_id=user_id)
+    
+    def ensure_ranking_indexes(self) -> bool:
+        """今シーズン参加ユーザーを対象とするランキング用のインデックスを作成"""
+        def _ensure(session: Session):
+            session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_beyond_user_latest_season_matched "
+                "ON beyond_user (latest_season_matched)"
+            ))
+            return True
+        
+        return bool(self.safe_execute(_ensure))
+    
+    def ensure_unique_constraints(self) -> bool:
+        """discord_id・user_name・shadowverse_id に一意インデックスを作成
+        
+        既存データに重複がある列は作成せずに警告し、その列は登録時の事前チェックで重複を防ぐ。
+        """
+        unique_columns = set()
+        for column in USER_UNIQUE_COLUMNS:
+            def _ensure(session: Session):
+                session.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS ux_beyond_user_{column} ON beyond_user ({column})"
+                ))
+                return True
+            
+            try:
+                self.execute_with_session(_ensure)
+                unique_columns.add(column)
+            except IntegrityError:
+                self.logger.warning(f"Duplicate values in beyond_user.{column}; unique index was not created")
+            except Exception as e:
+                self.logger.error(f"Error creating unique index on beyond_user.{column}: {e}")
+        
+        UserModel._unique_columns = frozenset(unique_columns)
+        return len(unique_columns) == len(USER_UNIQUE_COLUMNS)
+    
+    def get_users_by_ids(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """複数のIDのユーザーを1回のセッションでまとめて取得（ID → ユーザー辞書、存在しないIDは含まない）
+        
+        ループ内で get_user_by_id を呼ぶ代わりに使う。
+        """
+        unique_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id is not None))
+        
+        # キャッシュ済みのユーザーはDBから読まない（コミット前のユーザー変更がある場合はすべて読む）
+        use_cache = not has_uncommitted_user_changes()
+        users = {}
+        for user_id in unique_ids if use_cache else ():
+            user = user_cache.get(user_id=user_id)
+            if user is not None:
+                users[user_id] = user
+        missing_ids = [user_id for user_id in unique_ids if user_id not in users]
+        if not missing_ids:
+            return users
+        
+        def _get_users(session: Session):
+            loaded = {}
+            # SQLiteのバインド変数上限を超えないよう分割して取得
+            for start in range(0, len(missing_ids), USER_ID_BATCH_SIZE):
+                batch = missing_ids[start:start + USER_ID_BATCH_SIZE]
+                for user in session.query(self.User).filter(self.User.id.in_(batch)).all():
+                    loaded[user.id] = self._user_to_dict(user)
+            return loaded
+        
+        generation = user_cache.generation
+        loaded = self.safe_execute(_get_users) or {}
+        if use_cache:
+            for user in loaded.values():
+                user_cache.put(user, generation)
+        users.update(loaded)
+        return users
     
     def _user_to_dict(self, user) -> Dict[str, Any]:
         """SQLAlchemyオブジェクトを辞書に変換"""
@@ -119,7 +360,7 @@ class UserModel(BaseModel):
     def change_user_name(self, discord_id: str, new_name: str) -> Dict[str, Any]:
         """ユーザー名を変更（名前変更権を消費）"""
         def _change_name(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if not user:
                 return {'success': False, 'message': 'ユーザーが見つかりません。'}
             
@@ -142,6 +383,10 @@ class UserModel(BaseModel):
             old_name = user.user_name
             user.user_name = new_name
             
+            # ユーザー名検索の索引を更新
+            from models.user_search import UserSearchModel
+            UserSearchModel().index_user(session, user.id, new_name)
+            
             # 名前変更権を無効化
             if hasattr(user, 'name_change_available'):
                 user.name_change_available = False
@@ -153,7 +398,14 @@ class UserModel(BaseModel):
                 'new_name': new_name
             }
         
-        return self.execute_with_session(_change_name)
+        result = self.execute_with_session(_change_name)
+        if result and result.get('success'):
+            # 過去シーズンのランキング・描画済みの戦績ページは変更前の名前を保持しているため破棄
+            from models.season import closed_season_cache
+            from utils.helpers import rendered_page_cache
+            closed_season_cache.invalidate_rankings()
+            rendered_page_cache.clear()
+        return result
     
     def reset_name_change_permissions(self) -> int:
         """全ユーザーの名前変更権をリセット（月次実行用）"""
@@ -180,7 +432,7 @@ class UserModel(BaseModel):
     def update_user_classes(self, discord_id: str, class1: str, class2: str) -> bool:
         """ユーザーのクラスを更新"""
         def _update_classes(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if user:
                 user.class1 = class1
                 user.class2 = class2
@@ -192,7 +444,7 @@ class UserModel(BaseModel):
     def update_trust_points(self, discord_id: str, change: int) -> Optional[int]:
         """信用ポイントを更新"""
         def _update_trust(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if user:
                 user.trust_points += change
                 return user.trust_points
@@ -207,22 +459,12 @@ class UserModel(BaseModel):
             if not user_data or not user_data['latest_season_matched']:
                 return None
             
-            # 効果的レートを計算
-            effective_rating = case(
-                (and_(self.User.stay_flag == 1, self.User.stayed_rating > self.User.rating), 
-                 self.User.stayed_rating),
-                else_=self.User.rating
-            ).label('effective_rating')
-            
-            # 自分より高いレートのユーザー数を数える
+            # 自分より高い効果的レートのユーザー数を数える
             user_effective_rating = max(user_data['rating'], user_data['stayed_rating'] or 0)
             
-            higher_users = session.query(self.User).filter(
-                and_(
-                    self.User.latest_season_matched == True,
-                    effective_rating > user_effective_rating
-                )
-            ).count()
+            higher_users = session.execute(
+                HIGHER_RATED_USER_COUNT, {'effective_rating': user_effective_rating}
+            ).scalar()
             
             return higher_users + 1
         
@@ -231,7 +473,7 @@ class UserModel(BaseModel):
     def toggle_stay_flag(self, discord_id: str) -> Dict[str, Any]:
         """Stay機能の切り替え"""
         def _toggle_stay(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if not user:
                 raise ValueError("ユーザーが見つかりません")
             
@@ -315,12 +557,9 @@ class UserModel(BaseModel):
         return self.execute_with_session(_reset_users)
     
     def get_valid_classes(self) -> List[str]:
-        """有効なクラス一覧を取得"""
-        def _get_classes(session: Session):
-            classes = session.query(self.DeckClass).all()
-            return [cls.class_name for cls in classes]
-        
-        return self.safe_execute(_get_classes) or []
+        """有効なクラス一覧を取得（deck_class_registry から、DBへは初回のみ問い合わせる）"""
+        from models.deck_class import deck_class_registry
+        return deck_class_registry.class_names
     
     def get_all_users(self) -> List[Dict[str, Any]]:
         """全ユーザーを取得"""
@@ -330,20 +569,18 @@ class UserModel(BaseModel):
         
         return self.safe_execute(_get_all) or []
     
-    def get_active_users(self) -> List[Dict[str, Any]]:
-        """アクティブなユーザーを取得"""
+    def get_active_users(self) -> List[UserRow]:
+        """アクティブなユーザーを取得（辞書と同じキーで参照できる UserRow で返す）"""
         def _get_active(session: Session):
-            users = session.query(self.User).filter(
-                self.User.latest_season_matched == True
-            ).all()
-            return [self._user_to_dict(user) for user in users]
+            statement = select(*USER_ROW_COLUMNS).where(self.User.latest_season_matched == True)
+            return [UserRow._make(row) for row in session.execute(statement)]
         
         return self.safe_execute(_get_active) or []
     
     def update_user_rating(self, user_id: int, new_rating: float) -> bool:
         """ユーザーのレーティングを更新"""
         def _update_rating(session: Session):
-            user = session.query(self.User).filter_by(id=user_id).first()
+            user = session.scalars(USER_BY_ID, {'user_id': user_id}).first()
             if user:
                 user.rating = new_rating
                 return True
@@ -354,7 +591,7 @@ class UserModel(BaseModel):
     def increment_match_stats(self, user_id: int, won: bool) -> bool:
         """試合統計を更新"""
         def _increment_stats(session: Session):
-            user = session.query(self.User).filter_by(id=user_id).first()
+            user = session.scalars(USER_BY_ID, {'user_id': user_id}).first()
             if user:
                 user.total_matches += 1
                 if won:
@@ -369,20 +606,24 @@ class UserModel(BaseModel):
         
         return self.execute_with_session(_increment_stats)
     
-    def search_users(self, query: str) -> List[Dict[str, Any]]:
-        """ユーザーを検索"""
+    def search_users(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[UserRow]:
+        """ユーザー名の部分一致でユーザーを検索（関連度順に最大 limit 件、辞書と同じキーで参照できる UserRow で返す）"""
+        from models.user_search import UserSearchModel
+        
         def _search(session: Session):
-            users = session.query(self.User).filter(
-                self.User.user_name.like(f'%{query}%')
-            ).all()
-            return [self._user_to_dict(user) for user in users]
+            user_ids = UserSearchModel().search_ids(session, query, limit)
+            if not user_ids:
+                return []
+            statement = select(*USER_ROW_COLUMNS).where(self.User.id.in_(user_ids))
+            rows = {row.id: UserRow._make(row) for row in session.execute(statement)}
+            return [rows[user_id] for user_id in user_ids if user_id in rows]
         
         return self.safe_execute(_search) or []
     
     def get_premium_days(self, discord_id: str) -> int:
         """ユーザーのPremium残日数を取得"""
         def _get_premium_days(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if user:
                 # premium_days_remainingフィールドが存在するかチェック
                 if hasattr(user, 'premium_days_remaining'):
@@ -398,7 +639,7 @@ class UserModel(BaseModel):
     def add_premium_days(self, discord_id: str, days: int) -> bool:
         """ユーザーのPremium日数を追加"""
         def _add_premium_days(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if user:
                 # premium_days_remainingフィールドが存在するかチェック
                 if hasattr(user, 'premium_days_remaining'):
@@ -416,7 +657,7 @@ class UserModel(BaseModel):
     def set_premium_days(self, discord_id: str, days: int) -> bool:
         """ユーザーのPremium日数を設定（管理者用）"""
         def _set_premium_days(session: Session):
-            user = session.query(self.User).filter_by(discord_id=discord_id).first()
+            user = session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
             if user:
                 if hasattr(user, 'premium_days_remaining'):
                     user.premium_days_remaining = days
@@ -518,14 +759,14 @@ class UserModel(BaseModel):
             'class2': user.class2
         }
         
-        # 名前変更権フィールドが存在する場合のみ追加
-        if hasattr(user, 'name_change_available'):
+        # 名前変更権フィールドが存在する場合のみ追加（列の有無は起動時に判定済み）
+        if USER_HAS_NAME_CHANGE_AVAILABLE:
             result['name_change_available'] = user.name_change_available
         else:
             result['name_change_available'] = True  # デフォルト値
         
         # Premium残日数フィールドが存在する場合のみ追加
-        if hasattr(user, 'premium_days_remaining'):
+        if USER_HAS_PREMIUM_DAYS:
             result['premium_days_remaining'] = user.premium_days_remaining or 0
         else:
             result['premium_days_remaining'] = 0  # デフォルト値
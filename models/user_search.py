@@ -0,0 +1,134 @@
+from typing import Optional, List
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models.base import BaseModel
+
+# ユーザー名検索用の全文検索テーブル（rowid = ユーザーID）
+USER_SEARCH_TABLE = 'beyond_user_search'
+
+# 検索結果の既定の最大件数（Discordのオートコンプリート・選択肢の上限に合わせる）
+DEFAULT_SEARCH_LIMIT = 25
+
+# trigram は3文字単位で索引するため、これより短い検索語は索引を使えない
+MIN_INDEXED_QUERY_LENGTH = 3
+
+_CREATE_TABLE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {USER_SEARCH_TABLE}
+USING fts5(user_name, tokenize = 'trigram')
+"""
+
+_REBUILD_SQL = f"""
+INSERT INTO {USER_SEARCH_TABLE} (rowid, user_name)
+SELECT id, user_name FROM beyond_user WHERE user_name IS NOT NULL
+"""
+
+# 完全一致 → 前方一致 → bm25 → 名前の短い順 で並べる
+_SEARCH_SQL = f"""
+SELECT rowid FROM {USER_SEARCH_TABLE}
+WHERE {USER_SEARCH_TABLE} MATCH :phrase
+ORDER BY user_name = :query COLLATE NOCASE DESC,
+         user_name LIKE :prefix ESCAPE '\\' DESC,
+         rank, length(user_name), rowid
+LIMIT :limit
+"""
+
+# 索引を使えない短い検索語用（件数を制限した部分一致）
+_SHORT_SEARCH_SQL = """
+SELECT id FROM beyond_user
+WHERE user_name LIKE :pattern ESCAPE '\\'
+ORDER BY user_name = :query COLLATE NOCASE DESC,
+         user_name LIKE :prefix ESCAPE '\\' DESC,
+         length(user_name), id
+LIMIT :limit
+"""
+
+
+def _escape_like(value: str) -> str:
+    """LIKE のワイルドカードをエスケープ"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class UserSearchModel(BaseModel):
+    """ユーザー名検索（SQLite FTS5 trigram索引）のデータベース操作
+
+    ユーザー名を trigram で索引し、部分一致検索をテーブル全体の走査なしで行う。
+    索引は create_user・change_user_name から index_user() で同じトランザクション内に更新する。
+    FTS5 が使えない環境では LIKE による部分一致（件数制限付き）で検索する。
+    """
+
+    # プロセス内でテーブル作成済みかどうか（None は未確認）
+    _table_ready = None
+
+    def _ensure_table(self, session: Session) -> bool:
+        """検索テーブルを作成（未作成の場合のみ）し、利用できるかどうかを返す"""
+        if UserSearchModel._table_ready is None:
+            try:
+                session.execute(text(_CREATE_TABLE_SQL))
+                UserSearchModel._table_ready = True
+            except OperationalError as e:
+                self.logger.warning(f"FTS5 trigram index is not available: {e}")
+                UserSearchModel._table_ready = False
+        return UserSearchModel._table_ready
+
+    def ensure_ready(self) -> bool:
+        """検索テーブルを準備し、ユーザー数と索引の件数が一致しなければ再構築"""
+        def _ensure(session: Session):
+            if not self._ensure_table(session):
+                return None
+            indexed = session.execute(text(f"SELECT COUNT(*) FROM {USER_SEARCH_TABLE}")).scalar()
+            users = session.execute(text(
+                "SELECT COUNT(*) FROM beyond_user WHERE user_name IS NOT NULL"
+            )).scalar()
+            return indexed != users
+
+        try:
+            needs_rebuild = self.execute_with_session(_ensure)
+        except Exception as e:
+            self.logger.error(f"Error preparing user search table: {e}")
+            return False
+
+        if needs_rebuild is None:
+            return False
+        if needs_rebuild:
+            return self.rebuild() is not None
+        return True
+
+    def rebuild(self) -> Optional[int]:
+        """ユーザーテーブルから検索テーブルを全件再構築し、索引した件数を返す"""
+        def _rebuild(session: Session):
+            if not self._ensure_table(session):
+                return None
+            session.execute(text(f"DELETE FROM {USER_SEARCH_TABLE}"))
+            session.execute(text(_REBUILD_SQL))
+            count = session.execute(text(f"SELECT COUNT(*) FROM {USER_SEARCH_TABLE}")).scalar()
+            self.logger.info(f"User search table rebuilt with {count} rows")
+            return count
+
+        return self.safe_execute(_rebuild)
+
+    def index_user(self, session: Session, user_id: int, user_name: Optional[str]):
+        """ユーザー名の登録・変更を索引に反映（呼び出し元のセッション内で実行）"""
+        if user_id is None or not self._ensure_table(session):
+            return
+
+        session.execute(text(f"DELETE FROM {USER_SEARCH_TABLE} WHERE rowid = :user_id"), {'user_id': user_id})
+        if user_name:
+            session.execute(text(
+                f"INSERT INTO {USER_SEARCH_TABLE} (rowid, user_name) VALUES (:user_id, :user_name)"
+            ), {'user_id': user_id, 'user_name': user_name})
+
+    def search_ids(self, session: Session, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[int]:
+        """ユーザー名に query を含むユーザーのIDを関連度順に最大 limit 件取得（呼び出し元のセッション内で実行）"""
+        query = (query or '').strip()
+        if not query or limit <= 0:
+            return []
+
+        params = {'query': query, 'prefix': f"{_escape_like(query)}%", 'limit': limit}
+        if len(query) >= MIN_INDEXED_QUERY_LENGTH and self._ensure_table(session):
+            # フレーズとして渡し、記号を含む名前でも FTS5 の構文として解釈されないようにする
+            params['phrase'] = '"' + query.replace('"', '""') + '"'
+            return list(session.execute(text(_SEARCH_SQL), params).scalars())
+
+        params['pattern'] = f"%{_escape_like(query)}%"
+        return list(session.execute(text(_SHORT_SEARCH_SQL), params).scalars())
@@ -0,0 +1,204 @@
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from sqlalchemy.orm import Session
+from models.base import writer_context
+from config.settings import DB_WRITER_MAX_BATCH
+
+# 書き込み待ち時間（投入からコミット完了まで、ミリ秒）のヒストグラムの区切り
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# 1回のコミットにまとめたコマンド数のヒストグラムの区切り
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """上限値で区切った件数のヒストグラム（最後の区間は上限なし）"""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, int]:
+        """区間ごとの件数（'<=上限' → 件数、最後は '>最大の上限'）"""
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return dict(zip(labels, self.counts))
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+
+class DatabaseWriter:
+    """データベースへの書き込みをまとめて実行する単一の書き込みタスク
+
+    書き込みコマンド（セッションを使うモデルのメソッドなど）を asyncio のキューで受け取り、
+    専用スレッドが1本の接続で順に実行する。キューに溜まったコマンドは最大 max_batch 件を
+    1トランザクション（BEGIN IMMEDIATE）にまとめ、コマンドごとに SAVEPOINT を使って
+    1件の失敗が他のコマンドに影響しないようにする。呼び出し元は submit() の結果を await する。
+
+    コマンド内の BaseModel.execute_with_session はバッチのセッションを使うため、
+    既存のモデルのメソッドをそのまま submit() に渡せる。
+    """
+
+    def __init__(self, max_batch: int = DB_WRITER_MAX_BATCH):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._connection = None
+        self._reset_requested = False
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.commands = 0
+        self.failed_commands = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    def _ensure_started(self):
+        """初回の書き込み時に実行中のイベントループで書き込みタスクを開始"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self.logger.info("Database writer started")
+
+    async def submit(self, func: Callable, *args, **kwargs) -> Any:
+        """書き込みコマンドをキューに入れ、コミット後にその戻り値を返す（例外はそのまま送出）"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, kwargs, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        """キューからコマンドを取り出し、まとめて実行する"""
+        loop = asyncio.get_running_loop()
+        while True:
+            command = await self._queue.get()
+            if command is None:
+                break
+
+            # 前のバッチの実行中に溜まったコマンドを待たずにまとめる
+            batch = [command]
+            stop = False
+            while len(batch) < self.max_batch and not self._queue.empty():
+                command = self._queue.get_nowait()
+                if command is None:
+                    stop = True
+                    break
+                batch.append(command)
+
+            try:
+                outcomes = await loop.run_in_executor(self._executor, self._execute_batch, batch)
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+
+            finished = time.perf_counter()
+            self.batch_size.observe(len(batch))
+            for (_, _, _, future, submitted), (ok, value) in zip(batch, outcomes):
+                self.latency_ms.observe((finished - submitted) * 1000)
+                if future.cancelled():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+            if stop:
+                break
+
+        await loop.run_in_executor(self._executor, self._close_connection)
+
+    def _execute_batch(self, batch: List[tuple]) -> List[Tuple[bool, Any]]:
+        """書き込みスレッドでバッチを1トランザクションとして実行"""
+        from config.database import engine
+
+        if self._reset_requested:
+            self._reset_requested = False
+            self._close_connection()
+        if self._connection is None or self._connection.closed or self._connection.invalidated:
+            self._connection = engine.connect()
+
+        outcomes = []
+        session = Session(bind=self._connection)
+        writer_context.session = session
+        try:
+            # 書き込みロックを最初に取得し、途中での昇格待ちを避ける
+            session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            for func, args, kwargs, _, _ in batch:
+                try:
+                    with session.begin_nested():
+                        outcomes.append((True, func(*args, **kwargs)))
+                except Exception as e:
+                    outcomes.append((False, e))
+            session.commit()
+            self.batches += 1
+            self.commands += len(batch)
+            self.failed_commands += sum(1 for ok, _ in outcomes if not ok)
+            return outcomes
+        except Exception as e:
+            session.rollback()
+            self.failed_batches += 1
+            self.failed_commands += len(batch)
+            self.logger.error(f"Database writer batch of {len(batch)} failed: {e}")
+            return [(False, e)] * len(batch)
+        finally:
+            writer_context.session = None
+            session.close()
+
+    def reset_connection(self):
+        """次のバッチから新しい接続を使う（アーカイブのATTACHなど接続ごとの設定が変わった場合）
+
+        実行中のバッチの接続は閉じず、書き込みスレッドが次のバッチの開始時に接続し直す。
+        """
+        self._reset_requested = True
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self):
+        """キューに残ったコマンドを実行してから書き込みタスクを終了"""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+        self._executor.shutdown(wait=True)
+        self.logger.info("Database writer stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        """書き込み件数・待ち時間・バッチサイズの統計"""
+        return {
+            'commands': self.commands,
+            'failed_commands': self.failed_commands,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'mean_latency_ms': self.latency_ms.mean,
+            'mean_batch_size': self.batch_size.mean,
+            'latency_ms': self.latency_ms.snapshot(),
+            'batch_size': self.batch_size.snapshot()
+        }
+
+
+_database_writer: Optional[DatabaseWriter] = None
+
+
+def get_database_writer() -> DatabaseWriter:
+    """プロセス共通の書き込みタスクを取得"""
+    global _database_writer
+    if _database_writer is None:
+        _database_writer = DatabaseWriter()
+    return _database_writer
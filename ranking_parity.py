@@ -0,0 +1,201 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+import tempfile
+from typing import List, Dict
+
+# 比較する (min_matches, limit) の組み合わせ（先頭は get_win_rate_ranking の既定値）
+CASES = [(50, 16), (0, 16), (1, 100), (10, 1000), (200, 16), (100, 50000)]
+
+
+def generate_database(users: int, matched_rate: float, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db に勝率ランキング用のユーザーを生成
+
+    stay_flag と rating / stayed_rating の大小（stayed 側が高い・低い・同じ）、
+    NULL の成績、最小試合数の境界、同じ勝率のユーザーを混ぜる。
+    stay_flag が立っているユーザーの stayed_rating は NULL にしない（従来のループは比較で例外になるため）。
+    """
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    rng = random.Random(seed)
+
+    def record():
+        """(total, win, loss)（NULL・最小試合数の境界・勝率の同率を含む）"""
+        kind = rng.random()
+        if kind < 0.05:
+            return None, None, None
+        if kind < 0.15:
+            # 勝率 50% の同率（試合数は境界の前後）
+            total = rng.choice([48, 49, 50, 51, 100, 200])
+            win = total // 2
+            return total, win, total - win
+        if kind < 0.20:
+            return rng.choice([0, 1, 9, 10, 11, 199, 200, 201]), None, None
+        total = rng.randrange(0, 400)
+        win = rng.randrange(0, total + 1)
+        return total, win, total - win
+
+    rows = []
+    for i in range(1, users + 1):
+        total, win, loss = record()
+        stayed_total, stayed_win, stayed_loss = record()
+        rating = round(rng.uniform(1200, 1800), 3)
+        stay_flag = 1 if rng.random() < 0.4 else 0
+        relation = rng.random()
+        if relation < 0.4:
+            stayed_rating = rating + round(rng.uniform(0.001, 200), 3)
+        elif relation < 0.8:
+            stayed_rating = rating - round(rng.uniform(0.001, 200), 3)
+        elif relation < 0.9 or stay_flag:
+            stayed_rating = rating
+        else:
+            stayed_rating = None
+        matched = 1 if rng.random() < matched_rate else 0
+        rows.append((
+            i, str(100000 + i), f"user{i}", str(i), rating, stayed_rating, stay_flag,
+            total, win, loss, stayed_total, stayed_win, stayed_loss, matched
+        ))
+
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, stayed_total_matches, stayed_win_count, stayed_loss_count, "
+        "latest_season_matched, win_streak, max_win_streak, trust_points) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, 100)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_win_rate_ranking(min_matches: int = 50, limit: int = 16) -> List[Dict]:
+    """従来の勝率ランキング（全参加ユーザーを読み込んで Python のループで選択・並び替え）"""
+    from config.database import get_session, User
+
+    session = get_session()
+    users = session.query(User).filter(User.latest_season_matched == True).all()
+    session.close()
+
+    ranking_with_win_rate = []
+    for user in users:
+        # current値
+        current_total = user.total_matches or 0
+        current_win = user.win_count or 0
+        current_loss = user.loss_count or 0
+        current_win_rate = (current_win / current_total) * 100 if current_total > 0 else 0.0
+
+        # stayed値
+        stayed_total = user.stayed_total_matches or 0
+        stayed_win = user.stayed_win_count or 0
+        stayed_loss = user.stayed_loss_count or 0
+        stayed_win_rate = (stayed_win / stayed_total) * 100 if stayed_total > 0 else 0.0
+
+        used_stayed = False
+        effective_total = current_total
+        effective_win = current_win
+        effective_loss = current_loss
+        effective_win_rate = current_win_rate
+
+        # stay_flag == 1 の場合の処理
+        if user.stay_flag == 1:
+            if user.rating < user.stayed_rating:
+                # stayed側がcurrentより大きい場合 → stayedを優先
+                effective_total = stayed_total
+                effective_win = stayed_win
+                effective_loss = stayed_loss
+                effective_win_rate = stayed_win_rate
+                used_stayed = True
+
+        # 最小試合数以上のもののみランキング対象
+        if effective_total >= min_matches:
+            ranking_with_win_rate.append({
+                'user': user,
+                'win_rate': effective_win_rate,
+                'win_count': effective_win,
+                'loss_count': effective_loss,
+                'total_matches': effective_total,
+                'used_stayed': used_stayed
+            })
+
+    # 勝率の降順で並べて上位を取得
+    ranking_with_win_rate.sort(key=lambda x: x['win_rate'], reverse=True)
+
+    result = []
+    for i, data in enumerate(ranking_with_win_rate[:limit], 1):
+        result.append({
+            'rank': i,
+            'user_name': data['user'].user_name,
+            'win_rate': data['win_rate'],
+            'win_count': data['win_count'],
+            'loss_count': data['loss_count'],
+            'total_matches': data['total_matches'],
+            'used_stayed': data['used_stayed']
+        })
+    return result
+
+
+def timed(call):
+    """呼び出しの結果と実行時間（ミリ秒）を返す"""
+    started = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    """勝率ランキングの従来の Python ループと現在の1回のSQLの結果と時間を比較"""
+    parser = argparse.ArgumentParser(description="勝率ランキングの従来の集計とSQLの集計の結果・実行時間を比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=20000, help="生成するユーザー数")
+    parser.add_argument('--matched-rate', type=float, default=0.5, help="今シーズン参加ユーザーの割合")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ranking_parity_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.users, args.matched_rate, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（{args.users}ユーザー, 参加 {args.matched_rate:.0%}）")
+
+    from viewmodels.ranking_vm import RankingViewModel
+
+    ranking_vm = RankingViewModel()
+    mismatches = 0
+    print(f"{'min_matches':>11} {'limit':>6} {'件数':>6} {'従来(ms)':>10} {'現在(ms)':>10} {'一致':>4}")
+    for min_matches, limit in CASES:
+        legacy, legacy_ms = timed(lambda: legacy_win_rate_ranking(min_matches, limit))
+        current, current_ms = timed(lambda: ranking_vm.get_win_rate_ranking(min_matches, limit))
+        matched = legacy == current
+        print(f"{min_matches:>11} {limit:>6} {len(current):>6} {legacy_ms:>10.1f} {current_ms:>10.1f} "
+              f"{'OK' if matched else 'NG':>4}")
+        if matched:
+            continue
+        mismatches += 1
+        if len(legacy) != len(current):
+            print(f"  件数: 従来 {len(legacy)}件, 現在 {len(current)}件")
+        for legacy_row, current_row in zip(legacy, current):
+            if legacy_row != current_row:
+                print(f"  従来: {legacy_row}")
+                print(f"  現在: {current_row}")
+                break
+
+    print()
+    print(f"不一致: {mismatches}件")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from typing import List, Dict
+
+# 比較するシーズン
+SEASON_NAME = 'S1'
+
+
+def generate_database(users: int, deleted: int, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db に終了済みシーズン1件とシーズン成績を生成
+
+    成績のうち deleted 件は存在しないユーザーのもの（削除済みユーザーの行は表示しない）。
+    並び順が一意になるよう、レート・最大連勝数・勝率は重複させない。
+    """
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points) "
+        "VALUES (?, ?, ?, ?, 1500, 1500, 0, 0, 0, 0, 0, 0, 0, 100)",
+        [(i, str(100000 + i), f"user{i}", str(i)) for i in range(1, users + 1)]
+    )
+    conn.execute(
+        "INSERT INTO beyond_season (id, season_name, start_date, end_date) VALUES (1, ?, ?, ?)",
+        (SEASON_NAME, '2025-01-01 00:00:00', '2025-01-31 23:59:59')
+    )
+
+    count = users + deleted
+    ratings = rng.sample(range(1000, 1000 + count * 10), count)
+    streaks = rng.sample(range(count * 2), count)
+    win_rates = set()
+    rows = []
+    for i, user_id in enumerate(list(range(1, users + 1)) + list(range(users + 1, users + deleted + 1))):
+        while True:
+            total = rng.randrange(0, 300)
+            win = rng.randrange(0, total + 1)
+            if total == 0 or win / total not in win_rates:
+                break
+        if total:
+            win_rates.add(win / total)
+        rows.append((user_id, ratings[i], win, total - win, total, streaks[i]))
+    conn.executemany(
+        "INSERT INTO beyond_user_season_record (user_id, season_id, rating, win_count, loss_count, "
+        "total_matches, max_win_streak) VALUES (?, 1, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_rating_ranking(user_model, season_id: int, limit: int = 100) -> List[Dict]:
+    """従来の過去シーズンのレーティングランキング（成績1件ごとに get_user_by_id）"""
+    from sqlalchemy import desc
+    from config.database import get_session, UserSeasonRecord
+
+    session = get_session()
+    records = session.query(UserSeasonRecord).filter(
+        UserSeasonRecord.season_id == season_id
+    ).order_by(desc(UserSeasonRecord.rating)).limit(limit).all()
+    session.close()
+
+    result = []
+    for i, record in enumerate(records, 1):
+        user = user_model.get_user_by_id(record.user_id)
+        if user:
+            result.append({
+                'rank': i,
+                'user_name': user['user_name'],
+                'rating': int(record.rating),
+                'win_count': record.win_count,
+                'loss_count': record.loss_count,
+                'total_matches': record.total_matches
+            })
+    return result
+
+
+def legacy_win_rate_ranking(user_model, season_id: int, min_matches: int = 50, limit: int = 16) -> List[Dict]:
+    """従来の過去シーズンの勝率ランキング（成績1件ごとに get_user_by_id）"""
+    from sqlalchemy import and_
+    from config.database import get_session, UserSeasonRecord
+
+    session = get_session()
+    records = session.query(UserSeasonRecord).filter(
+        and_(
+            UserSeasonRecord.season_id == season_id,
+            UserSeasonRecord.total_matches >= min_matches
+        )
+    ).all()
+    session.close()
+
+    ranking = sorted(
+        records,
+        key=lambda r: (r.win_count / r.total_matches) * 100 if r.total_matches > 0 else 0,
+        reverse=True
+    )[:limit]
+
+    result = []
+    for i, record in enumerate(ranking, 1):
+        user = user_model.get_user_by_id(record.user_id)
+        if user:
+            win_rate = (record.win_count / record.total_matches) * 100 if record.total_matches > 0 else 0
+            result.append({
+                'rank': i,
+                'user_name': user['user_name'],
+                'win_rate': win_rate,
+                'win_count': record.win_count,
+                'loss_count': record.loss_count,
+                'total_matches': record.total_matches
+            })
+    return result
+
+
+def legacy_win_streak_ranking(user_model, season_id: int, limit: int = 100) -> List[Dict]:
+    """従来の過去シーズンの連勝数ランキング（成績1件ごとに get_user_by_id）"""
+    from sqlalchemy import desc
+    from config.database import get_session, UserSeasonRecord
+
+    session = get_session()
+    records = session.query(UserSeasonRecord).filter(
+        UserSeasonRecord.season_id == season_id
+    ).order_by(desc(UserSeasonRecord.max_win_streak)).limit(limit).all()
+    session.close()
+
+    result = []
+    for i, record in enumerate(records, 1):
+        user = user_model.get_user_by_id(record.user_id)
+        if user:
+            result.append({
+                'rank': i,
+                'user_name': user['user_name'],
+                'max_win_streak': record.max_win_streak
+            })
+    return result
+
+
+def count_round_trips(call):
+    """呼び出しの結果と、その間に実行したSQLの数（データベースとの往復回数）を返す"""
+    from models.query_stats import query_stats
+
+    query_stats.reset()
+    result = call()
+    return result, sum(row['count'] for row in query_stats.top_statements(limit=len(query_stats.statements)))
+
+
+def main():
+    """過去シーズンのランキング1回の表示あたりのデータベースとの往復回数を従来の実装と比較"""
+    parser = argparse.ArgumentParser(description="過去シーズンのランキング表示あたりのSQLの実行回数を比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=200, help="シーズン成績のあるユーザー数")
+    parser.add_argument('--deleted', type=int, default=5, help="削除済みユーザーの成績の数")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ranking_roundtrips_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.users, args.deleted, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（成績 {args.users + args.deleted}件, "
+          f"うち削除済みユーザー {args.deleted}件）")
+
+    from models.query_stats import install_query_stats
+    from models.season import closed_season_cache
+    from models.user import UserModel, user_cache
+    from viewmodels.ranking_vm import RankingViewModel
+
+    install_query_stats()
+    user_model = UserModel()
+    ranking_vm = RankingViewModel()
+    season_id = 1
+    cases = [
+        ("レーティング",
+         lambda: legacy_rating_ranking(user_model, season_id),
+         lambda: ranking_vm.get_past_season_rating_ranking(season_id)),
+        ("勝率",
+         lambda: legacy_win_rate_ranking(user_model, season_id),
+         lambda: ranking_vm.get_past_season_win_rate_ranking(season_id)),
+        ("連勝数",
+         lambda: legacy_win_streak_ranking(user_model, season_id),
+         lambda: ranking_vm.get_past_season_win_streak_ranking(season_id)),
+    ]
+
+    mismatches = 0
+    print(f"{'ランキング':<10} {'件数':>5} {'従来':>6} {'現在(初回)':>10} {'現在(キャッシュ済み)':>20} {'一致':>4}")
+    for label, legacy_call, current_call in cases:
+        # どちらもキャッシュのない状態から表示する
+        user_cache.clear()
+        closed_season_cache.invalidate(season_id)
+        legacy, legacy_trips = count_round_trips(legacy_call)
+        current, cold_trips = count_round_trips(current_call)
+        _, warm_trips = count_round_trips(current_call)
+        matched = legacy == current
+        mismatches += 0 if matched else 1
+        print(f"{label:<10} {len(current):>5} {legacy_trips:>6} {cold_trips:>10} {warm_trips:>20} "
+              f"{'OK' if matched else 'NG':>4}")
+
+    print()
+    print("現在(初回)の往復回数はシーズンの取得（終了済みかどうかの判定）を含む")
+    print(f"不一致: {mismatches}件")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
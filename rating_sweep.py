@@ -0,0 +1,46 @@
+import argparse
+from models.rating import RatingParameterSweep
+
+
+def parse_values(text: str):
+    """カンマ区切りの数値リストを解析"""
+    return [float(value) for value in text.split(',') if value.strip()]
+
+
+def main():
+    """レーティングパラメータの what-if 分析を実行して結果を表示"""
+    parser = argparse.ArgumentParser(description="過去の試合履歴でレーティングパラメータを比較します")
+    parser.add_argument('--season', default=None, help="対象シーズン名（省略時は現在のシーズン）")
+    parser.add_argument('--base', default='16,20,24,28', help="BASE_RATING_CHANGE の候補（カンマ区切り）")
+    parser.add_argument('--multiplier', default='0.02,0.025,0.03,0.04', help="RATING_DIFF_MULTIPLIER の候補（カンマ区切り）")
+    parser.add_argument('--top', type=int, default=10, help="表示する上位人数")
+    parser.add_argument('--processes', type=int, default=1, help="並列実行するプロセス数")
+    args = parser.parse_args()
+
+    report = RatingParameterSweep().run(
+        parse_values(args.base), parse_values(args.multiplier),
+        season_name=args.season, top_n=args.top, processes=args.processes
+    )
+
+    print(f"シーズン: {report['season_name']} / 試合数: {report['matches']} / "
+          f"ユーザー数: {report['users']} / 組み合わせ: {report['combinations']} "
+          f"({report['elapsed']:.2f}秒)")
+    print()
+    print(f"{'BASE':>6} {'MULT':>7} {'標準偏差':>8} {'最小':>8} {'最大':>8} {'P90-P10':>8} "
+          f"{'順位相関':>8} {'TOP' + str(report['top_n']) + '一致':>8}")
+
+    for result in sorted(report['results'], key=lambda r: (-r['is_baseline'], r['base_change'], r['multiplier'])):
+        marker = " (現行)" if result['is_baseline'] else ""
+        print(f"{result['base_change']:>6.1f} {result['multiplier']:>7.3f} {result['rating_std']:>8.1f} "
+              f"{result['rating_min']:>8.1f} {result['rating_max']:>8.1f} {result['rating_p10_p90']:>8.1f} "
+              f"{result['rank_correlation']:>8.3f} {result['top_n_overlap']:>8}{marker}")
+
+    for result in report['results']:
+        print()
+        print(f"[BASE={result['base_change']}, MULT={result['multiplier']}] 上位{report['top_n']}人")
+        for rank, entry in enumerate(result['top_n'], 1):
+            print(f"  {rank:>2}. {entry['user_name']}: {entry['rating']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import gc
+import os
+import random
+import sqlite3
+import sys
+import time
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+# 全試合に参加させるユーザー（試合履歴の計測対象）
+HISTORY_USER_ID = 1
+
+
+def generate_database(users: int, matches: int, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db に今シーズン参加ユーザーと試合履歴を生成
+
+    試合はすべて HISTORY_USER_ID のユーザーが user1 または user2 として参加する。
+    並び順が一意になるよう、試合日時は重複させない。
+    """
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    from config.settings import VALID_CLASSES
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points, "
+        "class1, class2) VALUES (?, ?, ?, ?, ?, 1500, 0, 0, 0, 0, 0, 0, 1, 100, ?, ?)",
+        [
+            (i, str(100000 + i), f"user{i}", str(i), round(rng.uniform(1200, 1800), 3), *rng.sample(VALID_CLASSES, 2))
+            for i in range(1, users + 1)
+        ]
+    )
+
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(matches):
+        opponent = rng.randrange(2, users + 1)
+        user1_id, user2_id = (HISTORY_USER_ID, opponent) if i % 2 else (opponent, HISTORY_USER_ID)
+        winner_id, loser_id = rng.choice([(user1_id, user2_id), (user2_id, user1_id)])
+        user1_classes = rng.sample(VALID_CLASSES, 2)
+        user2_classes = rng.sample(VALID_CLASSES, 2)
+        change = round(rng.uniform(1, 30), 3)
+        rows.append((
+            user1_id, user2_id, (start + timedelta(seconds=i * 60)).strftime('%Y-%m-%d %H:%M:%S'), 'S1',
+            *user1_classes, *user2_classes,
+            change if winner_id == user1_id else -change, change if winner_id == user2_id else -change,
+            winner_id, loser_id, rng.choice(user1_classes), rng.choice(user2_classes)
+        ))
+    conn.executemany(
+        "INSERT INTO beyond_match_history (user1_id, user2_id, match_date, season_name, "
+        "user1_class_a, user1_class_b, user2_class_a, user2_class_b, user1_rating_change, user2_rating_change, "
+        "winner_user_id, loser_user_id, before_user1_rating, before_user2_rating, after_user1_rating, "
+        "after_user2_rating, user1_selected_class, user2_selected_class, user1_stay_flag, user2_stay_flag) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1500, 1500, 1500, 1500, ?, ?, 0, 0)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_active_users(user_model):
+    """従来のアクティブユーザー取得（ORMオブジェクトを読み込んで辞書に変換）"""
+    def _get_active(session):
+        users = session.query(user_model.User).filter(
+            user_model.User.latest_season_matched == True
+        ).all()
+        return [user_model._user_to_dict(user) for user in users]
+
+    return user_model.safe_execute(_get_active) or []
+
+
+def legacy_match_history(match_model, user_id: int, limit=None):
+    """従来のユーザーの試合履歴取得（ORMオブジェクトを読み込んで辞書に変換）"""
+    from sqlalchemy import or_, desc
+
+    def _get_history(session):
+        query = session.query(match_model.MatchHistory).filter(
+            or_(
+                match_model.MatchHistory.user1_id == user_id,
+                match_model.MatchHistory.user2_id == user_id
+            )
+        ).order_by(desc(match_model.MatchHistory.match_date))
+        if limit is not None:
+            query = query.limit(limit)
+        return [match_model._match_to_dict(match) for match in query.all()]
+
+    return match_model.safe_execute(_get_history) or []
+
+
+def best_time_ms(call, repeat: int) -> float:
+    """repeat 回実行した中で最短の実行時間（ミリ秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        call()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def memory_mib(call):
+    """呼び出しの結果と、結果が保持するメモリ・実行中の最大メモリ（MiB、tracemalloc で計測）"""
+    gc.collect()
+    tracemalloc.start()
+    result = call()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained / 2 ** 20, peak / 2 ** 20
+
+
+def main():
+    """ユーザー一覧・試合履歴の取得を従来のORMオブジェクト＋辞書と現在の読み取りモデルで比較"""
+    parser = argparse.ArgumentParser(description="読み取りモデル（UserRow・MatchRow）の実行時間とメモリを従来の辞書と比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=100000, help="生成する今シーズン参加ユーザー数")
+    parser.add_argument('--matches', type=int, default=100000, help="計測対象ユーザーの試合数")
+    parser.add_argument('--repeat', type=int, default=3, help="実行時間の計測回数（最短を表示）")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='read_model_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.users, args.matches, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（{args.users}ユーザー, {args.matches}試合）")
+
+    from models.match import MatchModel
+    from models.user import UserModel
+
+    user_model = UserModel()
+    match_model = MatchModel()
+    cases = [
+        ("アクティブユーザー（get_active_users）",
+         lambda: legacy_active_users(user_model),
+         user_model.get_active_users,
+         lambda rows: sorted(rows, key=lambda row: row['id'])),
+        ("試合履歴（get_user_match_history）",
+         lambda: legacy_match_history(match_model, HISTORY_USER_ID),
+         lambda: match_model.get_user_match_history(HISTORY_USER_ID, limit=None),
+         lambda rows: rows),
+    ]
+
+    mismatches = 0
+    print(f"{'取得':<36} {'件数':>7} {'':>6} {'時間(ms)':>10} {'保持(MiB)':>10} {'最大(MiB)':>10}")
+    for label, legacy_call, current_call, order in cases:
+        legacy, legacy_retained, legacy_peak = memory_mib(legacy_call)
+        current, current_retained, current_peak = memory_mib(current_call)
+        if order(legacy) != order([dict(row) for row in current]):
+            mismatches += 1
+            print(f"不一致: {label}")
+        count = len(current)
+        del legacy, current
+
+        legacy_ms = best_time_ms(legacy_call, args.repeat)
+        current_ms = best_time_ms(current_call, args.repeat)
+        print(f"{label:<36} {count:>7} {'従来':>6} {legacy_ms:>10.0f} {legacy_retained:>10.1f} {legacy_peak:>10.1f}")
+        print(f"{'':<36} {'':>7} {'現在':>6} {current_ms:>10.0f} {current_retained:>10.1f} {current_peak:>10.1f}")
+
+    print()
+    print(f"不一致: {mismatches}件（現在の結果は dict(row) で従来の辞書と比較）")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
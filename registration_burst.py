@@ -0,0 +1,165 @@
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import tempfile
+from collections import Counter
+
+# 生成する既存ユーザーの discord_id・shadowverse_id の開始値
+EXISTING_ID_BASE = 100000
+
+
+def generate_database(users: int):
+    """カレントディレクトリの db/beyond_ratings.db に既存ユーザーを生成"""
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points) "
+        "VALUES (?, ?, ?, 1500, 1500, 0, 0, 0, 0, 0, 0, 0, 100)",
+        [(str(EXISTING_ID_BASE + i), f"existing{i}", f"sv{EXISTING_ID_BASE + i}") for i in range(users)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def drop_unique_indexes():
+    """一意インデックスを削除し、create_user を事前チェックのみの従来の登録にする"""
+    from models.user import USER_UNIQUE_COLUMNS
+
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    for column in USER_UNIQUE_COLUMNS:
+        conn.execute(f"DROP INDEX IF EXISTS ux_beyond_user_{column}")
+    conn.commit()
+    conn.close()
+
+
+def burst_registrations(thread_index: int, registrations: int, shared_every: int):
+    """1スレッド分の登録内容 (discord_id, user_name, shadowverse_id, 重複の種類) の一覧
+
+    shared_every 件ごとにユーザー名を全スレッドで同じにする（同時登録の競合）。
+    最後の2件は既存ユーザーの discord_id・shadowverse_id と重複させる。
+    """
+    items = []
+    for i in range(registrations):
+        discord_id = f"{thread_index}-{i}"
+        if i % shared_every == 0:
+            items.append((discord_id, f"shared{i}", f"sv-{discord_id}", 'user_name'))
+        else:
+            items.append((discord_id, f"user{thread_index}-{i}", f"sv-{discord_id}", None))
+    existing = EXISTING_ID_BASE + thread_index
+    items.append((str(existing), f"dup-discord{thread_index}", f"sv-dup-{thread_index}", 'discord_id'))
+    items.append((f"dup-sv-{thread_index}", f"dup-sv{thread_index}", f"sv{existing}", 'shadowverse_id'))
+    return items
+
+
+def main():
+    """同時に集中したユーザー登録の処理件数/秒と、重複登録の検出を計測"""
+    parser = argparse.ArgumentParser(description="ユーザー登録の集中時の処理件数と重複の検出を計測します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=50000, help="既存ユーザー数")
+    parser.add_argument('--threads', type=int, default=8, help="同時に登録するスレッド数")
+    parser.add_argument('--registrations', type=int, default=150, help="スレッドごとの登録数")
+    parser.add_argument('--shared-every', type=int, default=10, help="何件ごとにユーザー名をスレッド間で重複させるか")
+    parser.add_argument('--without-unique-indexes', action='store_true',
+                        help="一意インデックスなし（事前チェックのみの従来の登録）で計測")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='registration_burst_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.users)
+    if args.without_unique_indexes:
+        drop_unique_indexes()
+
+    from models.user import UserModel, USER_UNIQUE_COLUMNS
+
+    user_model = UserModel()
+    # 重複として拒否される登録ごとのエラーログを出さない
+    logging.getLogger(UserModel.__name__).setLevel(logging.CRITICAL)
+    if not args.without_unique_indexes:
+        user_model.ensure_unique_constraints()
+    mode = "事前チェックのみ（一意インデックスなし）" if args.without_unique_indexes else "一意インデックス＋1回のINSERT"
+    print(f"データベース: {workdir}/db/beyond_ratings.db（既存 {args.users}ユーザー）")
+    print(f"登録方式: {mode}, 一意インデックスのある列: {sorted(UserModel._unique_columns) or 'なし'}")
+
+    plans = [burst_registrations(index, args.registrations, args.shared_every) for index in range(args.threads)]
+    lock = threading.Lock()
+    created = Counter()
+    rejected = Counter()
+    errors = Counter()
+    start = threading.Barrier(args.threads)
+
+    def register(items):
+        start.wait()
+        for discord_id, user_name, shadowverse_id, duplicate in items:
+            try:
+                user = user_model.create_user(discord_id, user_name, shadowverse_id)
+                outcome, key = (created, duplicate) if user else (errors, 'None')
+            except ValueError as e:
+                outcome, key = rejected, str(e)
+            except Exception as e:
+                outcome, key = errors, type(e).__name__
+            with lock:
+                outcome[key] += 1
+
+    threads = [threading.Thread(target=register, args=(items,)) for items in plans]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    attempts = sum(len(items) for items in plans)
+    shared_names = len({user_name for items in plans for _, user_name, _, duplicate in items if duplicate == 'user_name'})
+    expected = {
+        USER_UNIQUE_COLUMNS['user_name']: shared_names * (args.threads - 1),
+        USER_UNIQUE_COLUMNS['discord_id']: args.threads,
+        USER_UNIQUE_COLUMNS['shadowverse_id']: args.threads,
+    }
+
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    duplicates = {
+        column: conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT {column} FROM beyond_user GROUP BY {column} HAVING COUNT(*) > 1)"
+        ).fetchone()[0]
+        for column in USER_UNIQUE_COLUMNS
+    }
+    conn.close()
+
+    print()
+    print(f"登録: {attempts}件（{args.threads}スレッド × {attempts // args.threads}件）, {elapsed:.2f}秒, "
+          f"{attempts / elapsed:.0f}件/秒")
+    print(f"作成: {sum(created.values())}件")
+    print(f"{'重複として拒否（ValueError）':<40} {'件数':>6} {'想定':>6}")
+    for message, count in expected.items():
+        print(f"  {message:<38} {rejected.get(message, 0):>6} {count:>6}")
+    for message, count in rejected.items():
+        if message not in expected:
+            print(f"  {message:<38} {count:>6} {'-':>6}")
+    if errors:
+        print(f"その他のエラー: {dict(errors)}")
+    print(f"登録後に重複している値: {duplicates}")
+
+    failed = errors or any(duplicates.values()) or any(rejected.get(m, 0) != c for m, c in expected.items())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
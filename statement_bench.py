@@ -0,0 +1,103 @@
+import argparse
+import time
+from sqlalchemy import desc, case, and_, func
+from config.database import get_session, User, MatchHistory
+from models.statements import (
+    STATEMENTS, USER_BY_DISCORD_ID, RATING_RANKING, HIGHER_RATED_USER_COUNT, MATCH_PLACEHOLDER
+)
+
+
+def build_cases(session):
+    """ベンチマーク対象の検索ごとに、従来の組み立て方と組み立て済みステートメントの関数を作成"""
+    user = session.query(User).filter(User.discord_id.isnot(None)).first()
+    match = session.query(MatchHistory).order_by(desc(MatchHistory.id)).first()
+    if user is None or match is None:
+        raise SystemExit("ユーザーと試合履歴が1件以上あるデータベースで実行してください")
+
+    discord_id = user.discord_id
+    rating = user.rating
+    placeholder = {
+        'user1_id': match.user1_id,
+        'user2_id': match.user2_id,
+        'before_user1_rating': match.before_user1_rating,
+        'before_user2_rating': match.before_user2_rating
+    }
+
+    def effective_rating():
+        return case(
+            (and_(User.stay_flag == 1, User.stayed_rating > User.rating), User.stayed_rating),
+            else_=User.rating
+        ).label('effective_rating')
+
+    return [
+        (
+            "discord_id でユーザー取得",
+            lambda: session.query(User).filter_by(discord_id=discord_id).first(),
+            lambda: session.scalars(USER_BY_DISCORD_ID, {'discord_id': discord_id}).first()
+        ),
+        (
+            "順位（上位ユーザー数）",
+            lambda: session.query(func.count()).select_from(User).filter(
+                User.latest_season_matched == True, effective_rating() > rating
+            ).scalar(),
+            lambda: session.execute(HIGHER_RATED_USER_COUNT, {'effective_rating': rating}).scalar()
+        ),
+        (
+            "レーティングランキング",
+            lambda: session.query(
+                User.user_name, effective_rating(), User.rating, User.stayed_rating, User.stay_flag
+            ).filter(User.latest_season_matched == True).order_by(desc('effective_rating')).limit(100).all(),
+            lambda: session.execute(RATING_RANKING, {'limit': 100}).all()
+        ),
+        (
+            "試合プレースホルダー検索",
+            lambda: session.query(MatchHistory).filter(
+                MatchHistory.user1_id == placeholder['user1_id'],
+                MatchHistory.user2_id == placeholder['user2_id'],
+                MatchHistory.before_user1_rating == placeholder['before_user1_rating'],
+                MatchHistory.before_user2_rating == placeholder['before_user2_rating'],
+                MatchHistory.after_user1_rating.is_(None)
+            ).order_by(desc(MatchHistory.id)).first(),
+            lambda: session.scalars(MATCH_PLACEHOLDER, placeholder).first()
+        ),
+    ]
+
+
+def measure(session, call, iterations: int) -> float:
+    """1回あたりの実行時間（マイクロ秒）を計測（コンパイル済みSQLのキャッシュに載せてから計測）"""
+    for _ in range(min(iterations, 100)):
+        call()
+        session.expunge_all()
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+        session.expunge_all()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    """組み立て済みステートメントと毎回組み立てるクエリの1回あたりの実行時間を比較"""
+    parser = argparse.ArgumentParser(description="頻出する検索の組み立て済みステートメントの効果を計測します")
+    parser.add_argument('--iterations', type=int, default=5000, help="検索ごとの実行回数")
+    parser.add_argument('--repeat', type=int, default=3, help="計測の繰り返し回数（最小値を表示）")
+    args = parser.parse_args()
+
+    session = get_session()
+    try:
+        print(f"{'検索':<24} {'従来(us)':>10} {'組み立て済み(us)':>16} {'差(us)':>8} {'削減率':>7}")
+        for label, legacy, prebuilt in build_cases(session):
+            legacy_us = min(measure(session, legacy, args.iterations) for _ in range(args.repeat))
+            prebuilt_us = min(measure(session, prebuilt, args.iterations) for _ in range(args.repeat))
+            saved = legacy_us - prebuilt_us
+            print(f"{label:<24} {legacy_us:>10.1f} {prebuilt_us:>16.1f} {saved:>8.1f} {saved / legacy_us:>7.1%}")
+        print()
+        compiled_cache = session.get_bind()._compiled_cache
+        print(f"組み立て済みステートメント: {len(STATEMENTS)}件, "
+              f"コンパイル済みSQLのキャッシュ: {len(compiled_cache)}件 / 上限 {compiled_cache.capacity}件")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
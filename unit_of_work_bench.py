@@ -0,0 +1,146 @@
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+import tempfile
+from types import SimpleNamespace
+
+# 計測に使うユーザー
+DISCORD_ID = '100001'
+
+
+def generate_database(users: int, seasons: int, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db にユーザーと終了済みシーズン・シーズン成績を生成"""
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points) "
+        "VALUES (?, ?, ?, ?, ?, 1500, 0, 0, 0, 0, 0, 0, 1, 100)",
+        [(i, str(100000 + i), f"user{i}", str(i), round(rng.uniform(1200, 1900), 3)) for i in range(1, users + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO beyond_season (id, season_name, start_date, end_date) VALUES (?, ?, ?, ?)",
+        [(i, f"S{i}", f"2024-{i:02d}-01 00:00:00", f"2024-{i:02d}-28 23:59:59") for i in range(1, seasons + 1)]
+    )
+    rows = []
+    for season_id in range(1, seasons + 1):
+        for rank, user_id in enumerate(rng.sample(range(1, users + 1), users), 1):
+            total = rng.randrange(0, 200)
+            rows.append((user_id, season_id, round(rng.uniform(1300, 2000)), rank, rng.randrange(0, total + 1), total))
+    conn.executemany(
+        "INSERT INTO beyond_user_season_record (user_id, season_id, rating, rank, win_count, total_matches) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def profile_reads(user_model, discord_id: str):
+    """プロフィールボタン（ProfileButton.callback）が応答前に行う読み取り"""
+    user_instance = user_model.get_user_by_discord_id(discord_id)
+    rank = user_model.get_user_rank(discord_id) if user_instance else None
+    premium_days = user_model.get_premium_days(discord_id) if user_instance else 0
+    return user_instance, rank, premium_days
+
+
+def main():
+    """1回のインタラクションあたりの接続の取得回数を unit_of_work の有無で比較"""
+    parser = argparse.ArgumentParser(description="インタラクションあたりの接続プールからの取得回数を unit_of_work の有無で比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=1000, help="生成するユーザー数")
+    parser.add_argument('--seasons', type=int, default=8, help="終了済みシーズン数")
+    parser.add_argument('--iterations', type=int, default=200, help="インタラクションごとの実行回数")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='unit_of_work_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    generate_database(args.users, args.seasons, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（{args.users}ユーザー, 終了済みシーズン {args.seasons}件）")
+
+    from sqlalchemy import event
+    from config.database import engine, read_engine
+    from models.base import unit_of_work
+    from models.season import closed_season_cache
+    from models.user import UserModel, user_cache
+    from views.user_view import AchievementButton
+
+    checkouts = 0
+
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        nonlocal checkouts
+        checkouts += 1
+
+    for target in (engine, read_engine):
+        event.listen(target, 'checkout', count_checkout)
+
+    user_model = UserModel()
+    # 生成したデータベースには premium_days_remaining 列がないため、呼び出しごとの警告を出さない
+    logging.getLogger(UserModel.__name__).setLevel(logging.ERROR)
+    discord_user = SimpleNamespace(id=int(DISCORD_ID), display_name='user1')
+    button = AchievementButton()
+
+    def profile_in_unit_of_work():
+        with unit_of_work(read_only=True):
+            return profile_reads(user_model, DISCORD_ID)
+
+    # (表示名, 従来の呼び出し, unit_of_work を使う現在の呼び出し)
+    interactions = [
+        ("プロフィール", lambda: profile_reads(user_model, DISCORD_ID), profile_in_unit_of_work),
+        ("実績", lambda: button._get_user_achievements(discord_user),
+         lambda: button.get_user_achievements(discord_user)),
+    ]
+
+    def measure(call, cold: bool):
+        """1回あたりの接続の取得回数と実行時間（ミリ秒）"""
+        nonlocal checkouts
+        checkouts = 0
+        elapsed = 0.0
+        for _ in range(args.iterations):
+            if cold:
+                user_cache.clear()
+                closed_season_cache.invalidate()
+            started = time.perf_counter()
+            call()
+            elapsed += time.perf_counter() - started
+        return checkouts / args.iterations, elapsed / args.iterations * 1000
+
+    mismatches = 0
+    print(f"{'インタラクション':<12} {'キャッシュ':<8} {'取得(従来)':>10} {'取得(UoW)':>10} {'ms(従来)':>9} {'ms(UoW)':>9}")
+    for label, legacy_call, uow_call in interactions:
+        if legacy_call() != uow_call():
+            mismatches += 1
+            print(f"不一致: {label}")
+        for cold in (True, False):
+            legacy_checkouts, legacy_ms = measure(legacy_call, cold)
+            uow_checkouts, uow_ms = measure(uow_call, cold)
+            print(f"{label:<12} {'なし' if cold else 'あり':<8} {legacy_checkouts:>10.2f} {uow_checkouts:>10.2f} "
+                  f"{legacy_ms:>9.2f} {uow_ms:>9.2f}")
+
+    print()
+    print("取得: 書き込み用・読み取り専用の両方の接続プールからの取得回数（1回のインタラクションあたり）")
+    print(f"不一致: {mismatches}件")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
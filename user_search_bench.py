@@ -0,0 +1,125 @@
+import argparse
+import os
+import random
+import sqlite3
+import string
+import sys
+import time
+import tempfile
+
+# ユーザー名に使う文字（LIKE・trigram とも大文字小文字を区別しないため小文字のみ）
+NAME_CHARACTERS = string.ascii_lowercase + string.digits
+
+
+def generate_database(users: int, seed: int):
+    """カレントディレクトリの db/beyond_ratings.db にランダムな名前のユーザーを生成"""
+    from sqlalchemy import create_engine
+    import makeDatabase
+
+    # config は読み込み時にデータベースへ接続するため、テーブルを作成してから読み込む
+    os.makedirs('db', exist_ok=True)
+    makeDatabase.Base.metadata.create_all(bind=create_engine('sqlite:///db/beyond_ratings.db'))
+
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < users:
+        names.add(''.join(rng.choices(NAME_CHARACTERS, k=rng.randrange(6, 13))))
+
+    conn = sqlite3.connect('db/beyond_ratings.db')
+    conn.executemany(
+        "INSERT INTO beyond_user (id, discord_id, user_name, shadowverse_id, rating, stayed_rating, stay_flag, "
+        "total_matches, win_count, loss_count, win_streak, max_win_streak, latest_season_matched, trust_points) "
+        "VALUES (?, ?, ?, ?, 1500, 1500, 0, 0, 0, 0, 0, 0, 0, 100)",
+        [(i, str(100000 + i), name, str(i)) for i, name in enumerate(sorted(names), 1)]
+    )
+    conn.commit()
+    conn.close()
+    return sorted(names)
+
+
+def legacy_search_users(user_model, query: str):
+    """従来のユーザー検索（LIKE '%query%' でテーブル全体を走査し、全件を辞書で返す）"""
+    def _search(session):
+        users = session.query(user_model.User).filter(
+            user_model.User.user_name.like(f'%{query}%')
+        ).all()
+        return [user_model._user_to_dict(user) for user in users]
+
+    return user_model.safe_execute(_search) or []
+
+
+def per_query_ms(call, queries) -> float:
+    """検索語ごとの平均実行時間（ミリ秒）"""
+    started = time.perf_counter()
+    for query in queries:
+        call(query)
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    """ユーザー名検索を従来の LIKE の走査と現在の FTS5 trigram 索引で比較"""
+    parser = argparse.ArgumentParser(description="ユーザー名検索（FTS5 trigram 索引）の実行時間を従来の LIKE と比較します")
+    parser.add_argument('--workdir', default=None, help="データベースを生成するディレクトリ（省略時は一時ディレクトリ）")
+    parser.add_argument('--users', type=int, default=200000, help="生成するユーザー数")
+    parser.add_argument('--queries', type=int, default=200, help="検索語の数")
+    parser.add_argument('--query-length', type=int, default=4, help="検索語の文字数（既存の名前の一部）")
+    parser.add_argument('--seed', type=int, default=1, help="乱数シード")
+    args = parser.parse_args()
+
+    # config.database はカレントディレクトリの db/beyond_ratings.db を開くため、先に移動してから読み込む
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, package_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='user_search_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists('db/beyond_ratings.db'):
+        raise SystemExit(f"{workdir}/db/beyond_ratings.db が既にあります。空のディレクトリを指定してください")
+
+    names = generate_database(args.users, args.seed)
+    print(f"データベース: {workdir}/db/beyond_ratings.db（{args.users}ユーザー）")
+
+    from models.user import UserModel
+    from models.user_search import UserSearchModel, DEFAULT_SEARCH_LIMIT
+
+    started = time.perf_counter()
+    indexed = UserSearchModel().rebuild()
+    if indexed is None:
+        raise SystemExit("FTS5 trigram 索引を作成できませんでした（SQLite の FTS5 が必要です）")
+    print(f"索引の作成: {indexed}件, {time.perf_counter() - started:.2f}秒")
+
+    rng = random.Random(args.seed)
+    queries = []
+    for name in rng.sample(names, args.queries):
+        start = rng.randrange(0, len(name) - args.query_length + 1)
+        queries.append(name[start:start + args.query_length])
+    short_queries = [query[:2] for query in queries]
+
+    user_model = UserModel()
+    mismatches = 0
+    hits = 0
+    for query in queries:
+        legacy_ids = {user['id'] for user in legacy_search_users(user_model, query)}
+        current_ids = {row.id for row in user_model.search_users(query, limit=args.users)}
+        hits += len(legacy_ids)
+        if legacy_ids != current_ids:
+            mismatches += 1
+            print(f"不一致: '{query}' 従来 {len(legacy_ids)}件, 現在 {len(current_ids)}件")
+
+    print(f"検索語: {len(queries)}件（{args.query_length}文字, 平均 {hits / len(queries):.1f}件一致）")
+    print()
+    print(f"{'検索':<40} {'ms/件':>8}")
+    print(f"{'従来 LIKE（全件）':<40} {per_query_ms(lambda q: legacy_search_users(user_model, q), queries):>8.1f}")
+    print(f"{'FTS5（件数制限なし）':<40} "
+          f"{per_query_ms(lambda q: user_model.search_users(q, limit=args.users), queries):>8.1f}")
+    print(f"{f'FTS5（既定の {DEFAULT_SEARCH_LIMIT}件）':<40} {per_query_ms(user_model.search_users, queries):>8.1f}")
+    print(f"{'従来 LIKE（2文字）':<40} "
+          f"{per_query_ms(lambda q: legacy_search_users(user_model, q), short_queries):>8.1f}")
+    print(f"{f'現在（2文字、LIKE・既定の {DEFAULT_SEARCH_LIMIT}件）':<40} "
+          f"{per_query_ms(user_model.search_users, short_queries):>8.1f}")
+    print()
+    print(f"不一致: {mismatches}件（件数制限なしの検索結果のID集合を従来と比較）")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
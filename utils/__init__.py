@@ -3,7 +3,7 @@ from .helpers import (
     assign_role, remove_role, safe_edit_message, safe_delete_message,
     safe_purge_channel, count_characters, format_rating_change,
     format_win_rate, get_class_abbreviation, create_embed_pages,
-    MessageCollector, message_collector
+    MessageCollector, message_collector, RenderedPageCache, rendered_page_cache
 )
 
 __all__ = [
@@ -11,5 +11,5 @@ __all__ = [
     'assign_role', 'remove_role', 'safe_edit_message', 'safe_delete_message',
     'safe_purge_channel', 'count_characters', 'format_rating_change',
     'format_win_rate', 'get_class_abbreviation', 'create_embed_pages',
-    'MessageCollector', 'message_collector'
+    'MessageCollector', 'message_collector', 'RenderedPageCache', 'rendered_page_cache'
 ]
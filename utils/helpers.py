@@ -1,8 +1,9 @@
 import discord
 import asyncio
 import logging
-from typing import Optional
-from config.settings import API_CALL_SEMAPHORE_LIMIT
+from collections import OrderedDict
+from typing import Optional, Callable, Hashable
+from config.settings import API_CALL_SEMAPHORE_LIMIT, RENDERED_PAGE_CACHE_SIZE
 
 # API制限用のセマフォ
 api_call_semaphore = asyncio.Semaphore(API_CALL_SEMAPHORE_LIMIT)
@@ -286,6 +287,39 @@ async def create_embed_pages(items: list, items_per_page: int = 10,
     
     return embeds
 
+class RenderedPageCache:
+    """描画済みEmbedページのLRUキャッシュ（全ページネーションViewで共有）
+    
+    Viewはページ位置だけを保持し、Embedは表示時にこのキャッシュ経由で取得・描画する。
+    キーには表示内容を決める値（試合IDや勝者など）を含め、内容が変われば別キーになるようにする。
+    ユーザー名はキーに含めないため、名前の変更時（UserModel.change_user_name）に全て破棄する。
+    """
+    
+    def __init__(self, maxsize: int = RENDERED_PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_render(self, key: Hashable, render: Callable[[], discord.Embed]) -> discord.Embed:
+        """キャッシュ済みのページを返し、なければ描画して保存"""
+        embed = self._pages.get(key)
+        if embed is not None:
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return embed.copy()
+        
+        self.misses += 1
+        embed = render()
+        self._pages[key] = embed
+        while len(self._pages) > self.maxsize:
+            self._pages.popitem(last=False)
+        return embed.copy()
+    
+    def clear(self):
+        """キャッシュを全て破棄"""
+        self._pages.clear()
+
 class MessageCollector:
     """メッセージ収集とログ保存のヘルパークラス"""
     
@@ -336,4 +370,7 @@ class MessageCollector:
             self.logger.error(f"Failed to save messages to log: {e}")
 
 # グローバルなメッセージコレクターインスタンス
-message_collector = MessageCollector()
\ No newline at end of file
+message_collector = MessageCollector()
+
+# グローバルな描画済みページキャッシュ
+rendered_page_cache = RenderedPageCache()
\ No newline at end of file
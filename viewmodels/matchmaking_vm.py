@@ -4,50 +4,14 @@ import random
 from typing import List, Tuple, Dict, Optional
 from datetime import datetime, timedelta
 from config.database import get_session, User
+from models.base import writer_context
 from models.user import UserModel
 from models.season import SeasonModel
 from models.match import MatchModel
-from config.settings import MAX_RATING_DIFF_FOR_MATCH, MATCHMAKING_TIMEOUT, BASE_RATING_CHANGE, RATING_DIFF_MULTIPLIER
+from models.rating import calculate_rating_change, calculate_rating_change_from_result
+from config.settings import MAX_RATING_DIFF_FOR_MATCH, MATCHMAKING_TIMEOUT
 import logging
 
-def calculate_rating_change(player_rating: float, opponent_rating: float, 
-                           player_wins: int, opponent_wins: int) -> float:
-    """レーティング変動を計算"""
-    rating_diff = player_rating - opponent_rating
-    increment_per_win = RATING_DIFF_MULTIPLIER * abs(rating_diff)
-    
-    if player_rating > opponent_rating:
-        if player_wins > opponent_wins:
-            rating_change = BASE_RATING_CHANGE - increment_per_win
-        else:
-            rating_change = -(BASE_RATING_CHANGE + increment_per_win)
-    else:
-        if player_wins > opponent_wins:
-            rating_change = BASE_RATING_CHANGE + increment_per_win
-        else:
-            rating_change = -(BASE_RATING_CHANGE - increment_per_win)
-    
-    return rating_change
-
-def calculate_rating_change_from_result(player_rating: float, opponent_rating: float, 
-                                       player_won: bool) -> float:
-    """勝敗結果からレーティング変動を計算"""
-    rating_diff = player_rating - opponent_rating
-    increment_per_win = RATING_DIFF_MULTIPLIER * abs(rating_diff)
-    
-    if player_rating > opponent_rating:
-        if player_won:
-            rating_change = BASE_RATING_CHANGE - increment_per_win
-        else:
-            rating_change = -(BASE_RATING_CHANGE + increment_per_win)
-    else:
-        if player_won:
-            rating_change = BASE_RATING_CHANGE + increment_per_win
-        else:
-            rating_change = -(BASE_RATING_CHANGE - increment_per_win)
-    
-    return rating_change
-
 class MatchmakingViewModel:
     """マッチング関連のビジネスロジック"""
     
@@ -446,7 +410,9 @@ class MatchmakingViewModel:
         current_season_name = self.season_model.get_current_season_name()
         
         # マッチングプレースホルダーを作成
-        match_record = self.match_model.create_match_placeholder(
+        from models.writer import get_database_writer
+        match_record = await get_database_writer().submit(
+            self.match_model.create_match_placeholder,
             get_attr(user1_data, 'id'), 
             get_attr(user2_data, 'id'), 
             current_season_name,
@@ -603,15 +569,11 @@ class ResultViewModel:
                                      user1_won: bool, user2_won: bool,
                                      user1_rating_change: float, user2_rating_change: float) -> bool:
         """勝敗結果からユーザーの統計を更新"""
-        try:
-            from config.database import get_session
-            session = get_session()
-            
+        def _update_stats(session):
             user1 = session.query(User).filter_by(id=user1_id).first()
             user2 = session.query(User).filter_by(id=user2_id).first()
             
             if not user1 or not user2:
-                session.close()
                 return False
             
             # レーティング更新
@@ -641,16 +603,16 @@ class ResultViewModel:
             # 最新シーズンマッチフラグ
             user1.latest_season_matched = True
             user2.latest_season_matched = True
-            
-            session.commit()
-            session.close()
             return True
-            
+        
+        # 書き込みタスクのバッチ内で呼ばれた場合はそのトランザクションに含める
+        try:
+            return self.user_model.execute_with_session(_update_stats)
         except Exception as e:
             self.logger.error(f"Error updating user stats from result: {e}")
-            if 'session' in locals():
-                session.rollback()
-                session.close()
+            # バッチ内では例外を送出し、呼び出し元のコマンドの SAVEPOINT ごと取り消す
+            if getattr(writer_context, 'session', None) is not None:
+                raise
             return False
     
     def finalize_match(self, user1_id: int, user2_id: int, user1_wins: int, user2_wins: int,
@@ -700,7 +662,14 @@ class ResultViewModel:
                                    user1_won: bool, user2_won: bool,
                                    before_user1_rating: float, before_user2_rating: float,
                                    user1_selected_class: str, user2_selected_class: str) -> Dict[str, any]:
-        """新しい形式の試合を確定（クラス情報付き）"""
+        """新しい形式の試合を確定（クラス情報付き）
+        
+        試合記録の確定とユーザー統計の更新を1トランザクションにまとめるため、
+        書き込みタスク（get_database_writer().submit）からのみ呼び出す。
+        """
+        if getattr(writer_context, 'session', None) is None:
+            raise RuntimeError("finalize_match_with_classes must be submitted through the database writer")
+        
         try:
             # 結果の妥当性チェック
             is_valid, message = self.validate_match_result(user1_won, user2_won)
@@ -723,11 +692,13 @@ class ResultViewModel:
                 user1_selected_class, user2_selected_class
             )
             
-            # ユーザー統計を更新
+            # ユーザー統計を更新（更新できなければ試合記録の確定も取り消す）
             success = self.update_user_stats_from_result(
                 user1_id, user2_id, user1_won, user2_won,
                 user1_change, user2_change
             )
+            if not success:
+                raise RuntimeError(f"User stats could not be updated for users {user1_id} and {user2_id}")
             
             return {
                 'success': True,
@@ -740,7 +711,8 @@ class ResultViewModel:
             
         except Exception as e:
             self.logger.error(f"Error finalizing match with classes: {e}")
-            return {'success': False, 'message': 'エラーが発生しました。'}
+            # 例外を送出し、このコマンドの SAVEPOINT ごと試合記録の確定を取り消す
+            raise
 
 class CancelViewModel:
     """試合中止処理のビジネスロジック"""
@@ -766,15 +738,14 @@ class CancelViewModel:
             self.logger.error(f"Error processing cancel request: {e}")
             return {'success': False, 'message': 'エラーが発生しました。'}
     
-    def apply_timeout_penalty(self, user_id: int) -> bool:
-        """タイムアウトペナルティを適用"""
+    async def apply_timeout_penalty(self, discord_id: int) -> bool:
+        """タイムアウトペナルティを適用（信用ポイントを1減点、書き込みタスクで実行）"""
         try:
-            user = self.user_model.get_user_by_id(user_id)
-            if user:
-                # 信用ポイントを1減点
-                self.user_model.update_trust_points(user.discord_id, -1)
-                return True
-            return False
+            from models.writer import get_database_writer
+            new_points = await get_database_writer().submit(
+                self.user_model.update_trust_points, str(discord_id), -1
+            )
+            return new_points is not None
             
         except Exception as e:
             self.logger.error(f"Error applying timeout penalty: {e}")
@@ -1,6 +1,6 @@
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, timedelta
-from sqlalchemy import desc, case, and_
+from sqlalchemy import desc, case, and_, func, cast, Float
 import asyncio
 import logging
 
@@ -63,24 +63,12 @@ class RankingViewModel:
     def get_rating_ranking(self, limit: int = 100) -> List[Dict[str, Any]]:
         """レーティングランキングを取得"""
         try:
-            from config.database import get_session, User
-            session = get_session()
+            from config.database import get_read_session
+            from models.statements import RATING_RANKING
+            session = get_read_session()
             
-            # 効果的レートを計算
-            effective_rating = case(
-                (and_(User.stay_flag == 1, User.stayed_rating > User.rating), User.stayed_rating),
-                else_=User.rating
-            ).label('effective_rating')
-            
-            ranking = session.query(
-                User.user_name,
-                effective_rating,
-                User.rating,
-                User.stayed_rating,
-                User.stay_flag
-            ).filter(User.latest_season_matched == True)\
-             .order_by(desc('effective_rating'))\
-             .limit(limit).all()
+            # 効果的レートの降順（組み立て済みのステートメント）
+            ranking = session.execute(RATING_RANKING, {'limit': limit}).all()
             
             session.close()
             
@@ -114,22 +102,27 @@ class RankingViewModel:
     def get_win_streak_ranking(self, limit: int = 100) -> List[Dict[str, Any]]:
         """連勝数ランキングを取得"""
         try:
-            from config.database import get_session, User
-            session = get_session()
+            from config.database import get_read_session, User
+            session = get_read_session()
             
-            ranking = session.query(User).filter(
+            # 表示に使う列だけを取得
+            ranking = session.query(
+                User.user_name,
+                User.max_win_streak,
+                User.win_streak
+            ).filter(
                 User.latest_season_matched == True
             ).order_by(desc(User.max_win_streak)).limit(limit).all()
             
             session.close()
             
             result = []
-            for i, user in enumerate(ranking, 1):
+            for i, (user_name, max_win_streak, win_streak) in enumerate(ranking, 1):
                 result.append({
                     'rank': i,
-                    'user_name': user.user_name,
-                    'max_win_streak': user.max_win_streak,
-                    'current_win_streak': user.win_streak
+                    'user_name': user_name,
+                    'max_win_streak': max_win_streak,
+                    'current_win_streak': win_streak
                 })
             
             self.logger.info(f"Win streak ranking returned {len(result)} records")
@@ -142,73 +135,57 @@ class RankingViewModel:
             return []
     
     def get_win_rate_ranking(self, min_matches: int = 50, limit: int = 16) -> List[Dict[str, Any]]:
-        """勝率ランキングを取得"""
+        """勝率ランキングを取得
+        
+        stay_flag が立っていて stayed 側のレートが高いユーザーは stayed 側の成績を使う。
+        成績の選択・勝率計算・並び替え・上位の切り出しは1回のSQLで行う。
+        """
         try:
-            from config.database import get_session, User
-            session = get_session()
-            
-            users = session.query(User).filter(User.latest_season_matched == True).all()
-            session.close()
+            from config.database import get_read_session, User
+            session = get_read_session()
             
-            self.logger.info(f"Found {len(users)} users with latest_season_matched=True")
+            # stayed側の成績を使うかどうか
+            use_stayed = and_(User.stay_flag == 1, User.rating < User.stayed_rating)
             
-            ranking_with_win_rate = []
+            def effective(current_column, stayed_column):
+                return case(
+                    (use_stayed, func.coalesce(stayed_column, 0)),
+                    else_=func.coalesce(current_column, 0)
+                )
             
-            for user in users:
-                # current値
-                current_total = user.total_matches or 0
-                current_win = user.win_count or 0
-                current_loss = user.loss_count or 0
-                current_win_rate = (current_win / current_total) * 100 if current_total > 0 else 0.0
-                
-                # stayed値
-                stayed_total = user.stayed_total_matches or 0
-                stayed_win = user.stayed_win_count or 0
-                stayed_loss = user.stayed_loss_count or 0
-                stayed_win_rate = (stayed_win / stayed_total) * 100 if stayed_total > 0 else 0.0
-                
-                used_stayed = False
-                effective_total = current_total
-                effective_win = current_win
-                effective_loss = current_loss
-                effective_win_rate = current_win_rate
-                
-                # stay_flag == 1 の場合の処理
-                if user.stay_flag == 1:
-                    if user.rating < user.stayed_rating:
-                        # stayed側がcurrentより大きい場合 → stayedを優先
-                        effective_total = stayed_total
-                        effective_win = stayed_win
-                        effective_loss = stayed_loss
-                        effective_win_rate = stayed_win_rate
-                        used_stayed = True
-                
-                # 最小試合数以上のもののみランキング対象
-                if effective_total >= min_matches:
-                    ranking_with_win_rate.append({
-                        'user': user,
-                        'win_rate': effective_win_rate,
-                        'win_count': effective_win,
-                        'loss_count': effective_loss,
-                        'total_matches': effective_total,
-                        'used_stayed': used_stayed
-                    })
+            effective_total = effective(User.total_matches, User.stayed_total_matches)
+            effective_win = effective(User.win_count, User.stayed_win_count)
+            effective_loss = effective(User.loss_count, User.stayed_loss_count)
+            win_rate = case(
+                (effective_total > 0, cast(effective_win, Float) / effective_total * 100),
+                else_=0.0
+            ).label('win_rate')
             
-            self.logger.info(f"Found {len(ranking_with_win_rate)} users with >= {min_matches} matches")
+            # 同率の場合はユーザーID順（従来の安定ソートと同じ順序）
+            ranking = session.query(
+                User.user_name,
+                win_rate,
+                effective_win.label('win_count'),
+                effective_loss.label('loss_count'),
+                effective_total.label('total_matches'),
+                case((use_stayed, 1), else_=0).label('used_stayed')
+            ).filter(
+                User.latest_season_matched == True,
+                effective_total >= min_matches
+            ).order_by(desc('win_rate'), User.id).limit(limit).all()
             
-            # 勝率の降順で並べて上位を取得
-            ranking_with_win_rate.sort(key=lambda x: x['win_rate'], reverse=True)
+            session.close()
             
             result = []
-            for i, data in enumerate(ranking_with_win_rate[:limit], 1):
+            for i, row in enumerate(ranking, 1):
                 result.append({
                     'rank': i,
-                    'user_name': data['user'].user_name,
-                    'win_rate': data['win_rate'],
-                    'win_count': data['win_count'],
-                    'loss_count': data['loss_count'],
-                    'total_matches': data['total_matches'],
-                    'used_stayed': data['used_stayed']
+                    'user_name': row.user_name,
+                    'win_rate': row.win_rate,
+                    'win_count': row.win_count,
+                    'loss_count': row.loss_count,
+                    'total_matches': row.total_matches,
+                    'used_stayed': bool(row.used_stayed)
                 })
             
             self.logger.info(f"Win rate ranking returned {len(result)} records")
@@ -220,14 +197,38 @@ class RankingViewModel:
             self.logger.error(traceback.format_exc())
             return []
     
+    def _get_closed_season_ranking(self, season_id: int, ranking_key: str, load) -> List[Dict[str, Any]]:
+        """終了済みシーズンのランキングは永続キャッシュから取得（未終了のシーズンは毎回取得）"""
+        from models.season import closed_season_cache
+        season = self.season_model.get_season_by_id(season_id)
+        if not season or season['end_date'] is None:
+            return load()
+        return closed_season_cache.get_or_load(f"ranking:{season_id}:{ranking_key}", load)
+    
+    def warm_past_season_cache(self) -> int:
+        """全ての終了済みシーズンのランキング（既定の条件）を事前にキャッシュし、シーズン数を返す"""
+        seasons = self.season_model.get_past_seasons()
+        for season in seasons:
+            self.get_past_season_rating_ranking(season['id'])
+            self.get_past_season_win_rate_ranking(season['id'])
+            self.get_past_season_win_streak_ranking(season['id'])
+        self.logger.info(f"Closed season cache warmed for {len(seasons)} seasons")
+        return len(seasons)
+    
     def get_past_season_rating_ranking(self, season_id: int, limit: int = 100) -> List[Dict[str, Any]]:
         """過去シーズンのレーティングランキングを取得"""
-        try:
-            from config.database import get_session, UserSeasonRecord
-            session = get_session()
-            
-            # UserSeasonRecordから直接取得
-            records = session.query(UserSeasonRecord).filter(
+        def _load():
+            from config.database import get_read_session, UserSeasonRecord, User
+            session = get_read_session()
+            
+            # UserSeasonRecordにユーザー名を結合して1回で取得
+            records = session.query(
+                UserSeasonRecord.rating,
+                UserSeasonRecord.win_count,
+                UserSeasonRecord.loss_count,
+                UserSeasonRecord.total_matches,
+                User.user_name
+            ).outerjoin(User, User.id == UserSeasonRecord.user_id).filter(
                 UserSeasonRecord.season_id == season_id
             ).order_by(desc(UserSeasonRecord.rating)).limit(limit).all()
             
@@ -235,13 +236,13 @@ class RankingViewModel:
             
             self.logger.info(f"Found {len(records)} season records for season {season_id}")
             
+            # 削除済みユーザーの行は表示しない（順位は詰めない）
             result = []
             for i, record in enumerate(records, 1):
-                user = self.user_model.get_user_by_id(record.user_id)
-                if user:
+                if record.user_name is not None:
                     result.append({
                         'rank': i,
-                        'user_name': user['user_name'],
+                        'user_name': record.user_name,
                         'rating': int(record.rating),
                         'win_count': record.win_count,
                         'loss_count': record.loss_count,
@@ -250,7 +251,9 @@ class RankingViewModel:
             
             self.logger.info(f"Past season rating ranking returned {len(result)} records")
             return result
-            
+        
+        try:
+            return self._get_closed_season_ranking(season_id, f"rating:{limit}", _load)
         except Exception as e:
             self.logger.error(f"Error getting past season rating ranking: {e}")
             import traceback
@@ -259,12 +262,17 @@ class RankingViewModel:
     
     def get_past_season_win_rate_ranking(self, season_id: int, min_matches: int = 50, limit: int = 16) -> List[Dict[str, Any]]:
         """過去シーズンの勝率ランキングを取得"""
-        try:
-            from config.database import get_session, UserSeasonRecord
-            session = get_session()
-            
-            # UserSeasonRecordから直接取得
-            records = session.query(UserSeasonRecord).filter(
+        def _load():
+            from config.database import get_read_session, UserSeasonRecord, User
+            session = get_read_session()
+            
+            # UserSeasonRecordにユーザー名を結合して1回で取得
+            records = session.query(
+                UserSeasonRecord.win_count,
+                UserSeasonRecord.loss_count,
+                UserSeasonRecord.total_matches,
+                User.user_name
+            ).outerjoin(User, User.id == UserSeasonRecord.user_id).filter(
                 and_(
                     UserSeasonRecord.season_id == season_id,
                     UserSeasonRecord.total_matches >= min_matches
@@ -284,12 +292,11 @@ class RankingViewModel:
             
             result = []
             for i, record in enumerate(ranking, 1):
-                user = self.user_model.get_user_by_id(record.user_id)
-                if user:
+                if record.user_name is not None:
                     win_rate = (record.win_count / record.total_matches) * 100 if record.total_matches > 0 else 0
                     result.append({
                         'rank': i,
-                        'user_name': user['user_name'],
+                        'user_name': record.user_name,
                         'win_rate': win_rate,
                         'win_count': record.win_count,
                         'loss_count': record.loss_count,
@@ -298,7 +305,9 @@ class RankingViewModel:
             
             self.logger.info(f"Past season win rate ranking returned {len(result)} records")
             return result
-            
+        
+        try:
+            return self._get_closed_season_ranking(season_id, f"win_rate:{min_matches}:{limit}", _load)
         except Exception as e:
             self.logger.error(f"Error getting past season win rate ranking: {e}")
             import traceback
@@ -307,12 +316,15 @@ class RankingViewModel:
     
     def get_past_season_win_streak_ranking(self, season_id: int, limit: int = 100) -> List[Dict[str, Any]]:
         """過去シーズンの連勝数ランキングを取得"""
-        try:
-            from config.database import get_session, UserSeasonRecord
-            session = get_session()
-            
-            # UserSeasonRecordから直接取得
-            records = session.query(UserSeasonRecord).filter(
+        def _load():
+            from config.database import get_read_session, UserSeasonRecord, User
+            session = get_read_session()
+            
+            # UserSeasonRecordにユーザー名を結合して1回で取得
+            records = session.query(
+                UserSeasonRecord.max_win_streak,
+                User.user_name
+            ).outerjoin(User, User.id == UserSeasonRecord.user_id).filter(
                 UserSeasonRecord.season_id == season_id
             ).order_by(desc(UserSeasonRecord.max_win_streak)).limit(limit).all()
             
@@ -322,17 +334,18 @@ class RankingViewModel:
             
             result = []
             for i, record in enumerate(records, 1):
-                user = self.user_model.get_user_by_id(record.user_id)
-                if user:
+                if record.user_name is not None:
                     result.append({
                         'rank': i,
-                        'user_name': user['user_name'],
+                        'user_name': record.user_name,
                         'max_win_streak': record.max_win_streak
                     })
             
             self.logger.info(f"Past season win streak ranking returned {len(result)} records")
             return result
-            
+        
+        try:
+            return self._get_closed_season_ranking(season_id, f"win_streak:{limit}", _load)
         except Exception as e:
             self.logger.error(f"Error getting past season win streak ranking: {e}")
             import traceback
@@ -65,7 +65,7 @@ class RecordViewModel:
                 for record in records
             ]
         
-        records_data = self.season_model.safe_execute(_get_all_season_records)
+        records_data = self.season_model.safe_read(_get_all_season_records)
         if not records_data:
             records_data = []
         
@@ -91,12 +91,10 @@ class RecordViewModel:
         
         start_date, end_date = date_range
         
-        # 日付範囲での試合を取得
-        matches = self._get_matches_by_date_range(user['id'], start_date, end_date)
-        
-        # 勝敗数の計算
-        win_count = sum(1 for match in matches if match['winner_user_id'] == user['id'])
-        total_count = len(matches)
+        # 日付範囲での勝敗を集計
+        summary = self._get_period_summary(user['id'], start_date, end_date)
+        win_count = summary['win_count']
+        total_count = summary['total_matches']
         loss_count = total_count - win_count
         win_rate = (win_count / total_count) * 100 if total_count > 0 else 0
         
@@ -108,8 +106,8 @@ class RecordViewModel:
         # より詳細な統計情報
         if total_count > 0:
             # 最初と最後の試合日
-            first_match_date = matches[-1]['match_date'][:10] if matches else "不明"
-            last_match_date = matches[0]['match_date'][:10] if matches else "不明"
+            first_match_date = summary['first_match_date'] or "不明"
+            last_match_date = summary['last_match_date'] or "不明"
             
             stats_message = (
                 f"**{user['user_name']} の期間戦績**\n"
@@ -177,7 +175,7 @@ class RecordViewModel:
                     }
                 return None
             
-            past_record = self.season_model.safe_execute(_get_past_record)
+            past_record = self.season_model.safe_read(_get_past_record)
             if not past_record:
                 await interaction.followup.send("過去シーズンのレコードが見つかりません。", ephemeral=True)
                 return
@@ -464,7 +462,7 @@ class RecordViewModel:
                                        date_range: Optional[tuple]) -> Dict[str, Dict[str, int]]:
         """ユーザー個人の詳細分析データを取得（投げられたクラス分析と同じロジック）"""
         def _get_analysis_data(session):
-            from config.database import MatchHistory
+            from config.database import MatchHistoryAll as MatchHistory
             from sqlalchemy import or_, and_
             from config.settings import VALID_CLASSES
             
@@ -478,12 +476,7 @@ class RecordViewModel:
                 query = query.filter(MatchHistory.season_name == season_name)
             elif date_range:
                 start_date, end_date = date_range
-                query = query.filter(
-                    and_(
-                        MatchHistory.match_date >= start_date,
-                        MatchHistory.match_date <= end_date
-                    )
-                )
+                query = query.filter(self.match_model.date_range_condition(start_date, end_date))
             
             # 指定クラスを選択した試合のみ
             class_name = selected_classes[0]
@@ -526,12 +519,43 @@ class RecordViewModel:
             # 戦績があるクラスのみ返す
             return {cls: stats for cls, stats in opponent_stats.items() if stats['total'] > 0}
         
-        return self.match_model.safe_execute(_get_analysis_data) or {}
+        return self.match_model.safe_read(_get_analysis_data) or {}
+    
+    def _get_period_summary(self, user_id: int, start_date: Optional[str], end_date: str) -> Dict[str, Any]:
+        """日付範囲の勝敗数と最初・最後の試合日を集計（スナップショット優先）"""
+        from models.snapshot import get_match_snapshot, match_date_to_epoch
+        from config.settings import JST
+        
+        summary = get_match_snapshot().user_period_summary(
+            user_id,
+            match_date_to_epoch(start_date) if start_date else None,
+            match_date_to_epoch(end_date)
+        )
+        
+        if summary is not None:
+            def _epoch_to_date(epoch):
+                return datetime.fromtimestamp(epoch, JST).strftime('%Y-%m-%d') if epoch is not None else None
+            
+            return {
+                'total_matches': summary['total_matches'],
+                'win_count': summary['win_count'],
+                'first_match_date': _epoch_to_date(summary['first_epoch']),
+                'last_match_date': _epoch_to_date(summary['last_epoch'])
+            }
+        
+        # スナップショットが利用できない場合はDBから取得
+        matches = self._get_matches_by_date_range(user_id, start_date, end_date)
+        return {
+            'total_matches': len(matches),
+            'win_count': sum(1 for match in matches if match['winner_user_id'] == user_id),
+            'first_match_date': matches[-1]['match_date'][:10] if matches else None,
+            'last_match_date': matches[0]['match_date'][:10] if matches else None
+        }
     
     def _get_matches_by_date_range(self, user_id: int, start_date: Optional[str], end_date: str) -> List[Dict[str, Any]]:
         """日付範囲で試合を取得"""
         def _get_matches(session):
-            from config.database import MatchHistory
+            from config.database import MatchHistoryAll as MatchHistory
             from sqlalchemy import or_, and_
             
             # ベースクエリ
@@ -542,16 +566,14 @@ class RecordViewModel:
                 )
             )
             
-            # 日付範囲フィルター
-            if start_date:
-                query = query.filter(MatchHistory.match_date >= start_date)
-            query = query.filter(MatchHistory.match_date <= end_date)
+            # 日付範囲フィルター（整数エポック列のインデックスを使用）
+            query = query.filter(self.match_model.date_range_condition(start_date, end_date))
             
             # 完了した試合のみ取得
             query = query.filter(MatchHistory.winner_user_id.isnot(None))
             
             # 日付の降順でソート
-            query = query.order_by(MatchHistory.match_date.desc())
+            query = query.order_by(*self.match_model.newest_first_order())
             
             matches = query.all()
             
@@ -571,13 +593,13 @@ class RecordViewModel:
                 for match in matches
             ]
         
-        return self.match_model.safe_execute(_get_matches) or []
+        return self.match_model.safe_read(_get_matches) or []
     
     def _get_detailed_class_matches_by_date(self, user_id: int, selected_classes: List[str], 
                                         start_date: Optional[str], end_date: str) -> List[Dict[str, Any]]:
         """日付範囲で詳細なクラス戦績を取得（修正版）"""
         def _get_matches(session):
-            from config.database import MatchHistory
+            from config.database import MatchHistoryAll as MatchHistory
             from sqlalchemy import or_, and_
             
             # ベースクエリ
@@ -588,10 +610,8 @@ class RecordViewModel:
                 )
             )
             
-            # 日付範囲フィルター
-            if start_date:
-                query = query.filter(MatchHistory.match_date >= start_date)
-            query = query.filter(MatchHistory.match_date <= end_date)
+            # 日付範囲フィルター（整数エポック列のインデックスを使用）
+            query = query.filter(self.match_model.date_range_condition(start_date, end_date))
             
             # クラスフィルター
             if len(selected_classes) == 1:
@@ -647,7 +667,7 @@ class RecordViewModel:
             query = query.filter(MatchHistory.winner_user_id.isnot(None))
             
             # 日付の降順でソート
-            query = query.order_by(MatchHistory.match_date.desc())
+            query = query.order_by(*self.match_model.newest_first_order())
             
             matches = query.all()
             
@@ -679,13 +699,13 @@ class RecordViewModel:
                 for match in matches
             ]
         
-        return self.match_model.safe_execute(_get_matches) or []
+        return self.match_model.safe_read(_get_matches) or []
 
     def _get_detailed_class_matches(self, user_id: int, selected_classes: List[str], 
                                 season_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """詳細なクラス戦績を取得（user_class、selected_classを考慮）"""
         def _get_matches(session):
-            from config.database import MatchHistory
+            from config.database import MatchHistoryAll as MatchHistory
             from sqlalchemy import or_, and_
             
             # ベースクエリ
@@ -787,7 +807,7 @@ class RecordViewModel:
                 for match in matches
             ]
         
-        return self.match_model.safe_execute(_get_matches) or []
+        return self.match_model.safe_read(_get_matches) or []
     
     def totalize_season(self, season_id: int) -> Dict[str, Any]:
         """シーズン終了時に全ユーザーのシーズン統計を保存"""
@@ -980,14 +1000,48 @@ class RecordViewModel:
                                     season_id: Optional[int] = None, 
                                     date_range: Optional[tuple] = None) -> List[Dict]:
         """単一クラスの分析データを取得（対戦相手のクラス別）"""
+        # 分析用スナップショットで集計（利用できない場合はDBで集計）
+        from models.snapshot import get_match_snapshot, match_date_to_epoch
+        
+        season_name = None
+        if season_id:
+            season = self.season_model.get_season_by_id(season_id)
+            season_name = season['season_name'] if season else None
+        
+        start_epoch = end_epoch = None
+        if season_id is None and date_range:
+            start_epoch = match_date_to_epoch(date_range[0]) if date_range[0] else None
+            end_epoch = match_date_to_epoch(date_range[1]) if date_range[1] else None
+        
+        analysis_data = get_match_snapshot().opponent_class_stats(
+            user_id, selected_class, season_name, start_epoch, end_epoch
+        )
+        if analysis_data is not None:
+            return analysis_data
+        
         def _get_analysis_data(session):
-            from config.database import MatchHistory
-            from sqlalchemy import or_, and_
+            from config.database import MatchHistoryAll as MatchHistory
+            from sqlalchemy import or_, and_, case, func
             from config.settings import VALID_CLASSES
             
-            # ベースクエリ
-            query = session.query(MatchHistory).filter(
-                MatchHistory.winner_user_id.isnot(None)
+            # 自分側から見た相手の選択クラスと勝敗
+            opponent_class = case(
+                (MatchHistory.user1_id == user_id, MatchHistory.user2_selected_class),
+                else_=MatchHistory.user1_selected_class
+            ).label('opponent_class')
+            my_win = case((MatchHistory.winner_user_id == user_id, 1), else_=0)
+            
+            # ベースクエリ：完了した試合のうち、自分が指定クラスを使用した試合のみ
+            query = session.query(
+                opponent_class,
+                func.count(MatchHistory.id),
+                func.sum(my_win)
+            ).filter(
+                MatchHistory.winner_user_id.isnot(None),
+                or_(
+                    and_(MatchHistory.user1_id == user_id, MatchHistory.user1_selected_class == selected_class),
+                    and_(MatchHistory.user2_id == user_id, MatchHistory.user2_selected_class == selected_class)
+                )
             )
             
             # 期間フィルター
@@ -997,79 +1051,111 @@ class RecordViewModel:
                     query = query.filter(MatchHistory.season_name == season['season_name'])
             elif date_range:
                 start_date, end_date = date_range
-                query = query.filter(
-                    and_(
-                        MatchHistory.match_date >= start_date,
-                        MatchHistory.match_date <= end_date
-                    )
-                )
+                query = query.filter(self.match_model.date_range_condition(start_date, end_date))
             
-            # 指定クラスを使用した試合のみ
-            query = query.filter(
-                or_(
-                    MatchHistory.user1_selected_class == selected_class,
-                    MatchHistory.user2_selected_class == selected_class
-                )
-            )
-            
-            matches = query.all()
-            
-            # 対戦相手のクラス別に集計
-            opponent_stats = {}
-            for cls in VALID_CLASSES:
-                opponent_stats[cls] = {
-                    'total_matches': 0,
-                    'opponent_wins': 0,
-                    'my_wins': 0
-                }
-            
-            for match in matches:
-                if match.user1_selected_class == selected_class and match.user1_id == user_id:
-                    # user1が自分
-                    opponent_class = match.user2_selected_class
-                    if match.winner_user_id == user_id:
-                        opponent_stats[opponent_class]['my_wins'] += 1
-                    else:
-                        opponent_stats[opponent_class]['opponent_wins'] += 1
-                    opponent_stats[opponent_class]['total_matches'] += 1
-                elif match.user2_selected_class == selected_class and match.user2_id == user_id:
-                    # user2が自分
-                    opponent_class = match.user1_selected_class
-                    if match.winner_user_id == user_id:
-                        opponent_stats[opponent_class]['my_wins'] += 1
-                    else:
-                        opponent_stats[opponent_class]['opponent_wins'] += 1
-                    opponent_stats[opponent_class]['total_matches'] += 1
+            counts = {
+                row_class: (total or 0, wins or 0)
+                for row_class, total, wins in query.group_by(opponent_class).all()
+            }
             
             # 結果を整形
             result = []
-            for opponent_class, stats in opponent_stats.items():
-                if stats['total_matches'] > 0:
-                    win_rate = (stats['my_wins'] / stats['total_matches']) * 100
+            for cls in VALID_CLASSES:
+                total_matches, my_wins = counts.get(cls, (0, 0))
+                if total_matches > 0:
+                    win_rate = (my_wins / total_matches) * 100
                     result.append({
-                        'opponent_class': opponent_class,
-                        'total_matches': stats['total_matches'],
-                        'opponent_wins': stats['opponent_wins'],
-                        'my_wins': stats['my_wins'],
+                        'opponent_class': cls,
+                        'total_matches': total_matches,
+                        'opponent_wins': total_matches - my_wins,
+                        'my_wins': my_wins,
                         'win_rate': win_rate
                     })
             
             return result
         
-        return self.match_model.safe_execute(_get_analysis_data) or []
+        return self.match_model.safe_read(_get_analysis_data) or []
 
 
     def _get_analysis_data(self, selected_classes: List[str], season_name: Optional[str] = None, 
                         date_range: Optional[tuple] = None) -> List[Dict]:
         """投げられたクラスの分析データを取得"""
+        # クラス相性集計テーブルから取得（利用できない場合は試合履歴を走査）
+        analysis_data = self.match_model.matchup_model.get_opponent_class_stats(
+            selected_classes, season_name, date_range
+        )
+        if analysis_data is not None:
+            return analysis_data
+        
+        return self._scan_analysis_data(selected_classes, season_name, date_range)
+    
+    def _scan_analysis_data(self, selected_classes: List[str], season_name: Optional[str] = None, 
+                            date_range: Optional[tuple] = None) -> List[Dict]:
+        """試合履歴を GROUP BY で集計して投げられたクラスの分析データを取得"""
         def _get_analysis_data(session):
-            from config.database import MatchHistory
-            from sqlalchemy import or_, and_
+            from config.database import MatchHistoryAll as MatchHistory
+            from config.settings import VALID_CLASSES
+            from sqlalchemy import or_, and_, case, func
             from itertools import combinations
             
+            if len(selected_classes) == 1:
+                # 単体クラス：指定クラスを選択した側を自分とする（user1優先）
+                class_name = selected_classes[0]
+                user1_is_me = MatchHistory.user1_selected_class == class_name
+                class_filter = or_(
+                    MatchHistory.user1_selected_class == class_name,
+                    MatchHistory.user2_selected_class == class_name
+                )
+            else:
+                # 2つのクラス組み合わせ：指定組み合わせを登録した側を自分とする（user1優先）
+                class1, class2 = selected_classes
+                user1_is_me = or_(
+                    and_(MatchHistory.user1_class_a == class1, MatchHistory.user1_class_b == class2),
+                    and_(MatchHistory.user1_class_a == class2, MatchHistory.user1_class_b == class1)
+                )
+                class_filter = or_(
+                    user1_is_me,
+                    and_(MatchHistory.user2_class_a == class1, MatchHistory.user2_class_b == class2),
+                    and_(MatchHistory.user2_class_a == class2, MatchHistory.user2_class_b == class1)
+                )
+            
+            # 自分側から見た相手のクラス情報と勝敗
+            my_user_id = case(
+                (user1_is_me, MatchHistory.user1_id),
+                else_=MatchHistory.user2_id
+            )
+            my_win = case((MatchHistory.winner_user_id == my_user_id, 1), else_=0)
+            opponent_selected = case(
+                (user1_is_me, MatchHistory.user2_selected_class),
+                else_=MatchHistory.user1_selected_class
+            ).label('opponent_selected')
+            opponent_class_a = case(
+                (user1_is_me, MatchHistory.user2_class_a),
+                else_=MatchHistory.user1_class_a
+            )
+            opponent_class_b = case(
+                (user1_is_me, MatchHistory.user2_class_b),
+                else_=MatchHistory.user1_class_b
+            )
+            
+            if len(selected_classes) == 1:
+                group_columns = [opponent_selected]
+            else:
+                # SQLiteの2引数min/maxで組み合わせを正規化
+                group_columns = [
+                    func.min(opponent_class_a, opponent_class_b).label('opponent_combo_a'),
+                    func.max(opponent_class_a, opponent_class_b).label('opponent_combo_b'),
+                    opponent_selected
+                ]
+            
             # ベースクエリ：完了した試合のみ
-            query = session.query(MatchHistory).filter(
-                MatchHistory.winner_user_id.isnot(None)
+            query = session.query(
+                *group_columns,
+                func.count(MatchHistory.id),
+                func.sum(my_win)
+            ).filter(
+                MatchHistory.winner_user_id.isnot(None),
+                class_filter
             )
             
             # 期間フィルター
@@ -1077,188 +1163,43 @@ class RecordViewModel:
                 query = query.filter(MatchHistory.season_name == season_name)
             elif date_range:
                 start_date, end_date = date_range
-                query = query.filter(
-                    and_(
-                        MatchHistory.match_date >= start_date,
-                        MatchHistory.match_date <= end_date
-                    )
-                )
+                query = query.filter(self.match_model.date_range_condition(start_date, end_date))
             
-            # 指定クラス組み合わせに関する対戦のみ
-            if len(selected_classes) == 1:
-                # 単体クラス
-                class_name = selected_classes[0]
-                query = query.filter(
-                    or_(
-                        # user1が指定クラスを選択
-                        MatchHistory.user1_selected_class == class_name,
-                        # user2が指定クラスを選択
-                        MatchHistory.user2_selected_class == class_name
-                    )
-                )
-            else:
-                # 2つのクラス組み合わせ
-                class1, class2 = selected_classes
-                query = query.filter(
-                    or_(
-                        # user1が指定クラス組み合わせを登録
-                        and_(
-                            or_(
-                                and_(MatchHistory.user1_class_a == class1, MatchHistory.user1_class_b == class2),
-                                and_(MatchHistory.user1_class_a == class2, MatchHistory.user1_class_b == class1)
-                            )
-                        ),
-                        # user2が指定クラス組み合わせを登録
-                        and_(
-                            or_(
-                                and_(MatchHistory.user2_class_a == class1, MatchHistory.user2_class_b == class2),
-                                and_(MatchHistory.user2_class_a == class2, MatchHistory.user2_class_b == class1)
-                            )
-                        )
-                    )
-                )
-            
-            matches = query.all()
+            rows = query.group_by(*group_columns).all()
             
-            opponent_stats = {}
+            result = []
             
             if len(selected_classes) == 1:
-                # 単一クラス選択時：7種類のクラスそれぞれとの戦績を集計
-                from config.settings import VALID_CLASSES
-                class_name = selected_classes[0]
-                
-                # 各クラスに対して統計を初期化
+                # 単一クラス選択時：7種類のクラスそれぞれとの戦績
+                counts = {row[0]: (row[1] or 0, row[2] or 0) for row in rows}
                 for opponent_class in VALID_CLASSES:
-                    opponent_stats[opponent_class] = {
-                        'total_matches': 0,
-                        'opponent_wins': 0,
-                        'my_wins': 0
-                    }
-                
-                # マッチデータを分析
-                for match in matches:
-                    # 指定クラス使用者を特定
-                    my_user_id = None
-                    opponent_user_id = None
-                    opponent_selected_class = None
-                    
-                    if match.user1_selected_class == class_name:
-                        my_user_id = match.user1_id
-                        opponent_user_id = match.user2_id
-                        opponent_selected_class = match.user2_selected_class
-                    elif match.user2_selected_class == class_name:
-                        my_user_id = match.user2_id
-                        opponent_user_id = match.user1_id
-                        opponent_selected_class = match.user1_selected_class
-                    
-                    # 統計を更新
-                    if opponent_selected_class and opponent_selected_class in opponent_stats:
-                        opponent_stats[opponent_selected_class]['total_matches'] += 1
-                        
-                        if match.winner_user_id == my_user_id:
-                            opponent_stats[opponent_selected_class]['my_wins'] += 1
-                        else:
-                            opponent_stats[opponent_selected_class]['opponent_wins'] += 1
-                
-                # 結果を整形
-                result = []
-                for opponent_class, stats in opponent_stats.items():
-                    if stats['total_matches'] > 0:  # 対戦があったクラスのみ
-                        win_rate = (stats['my_wins'] / stats['total_matches']) * 100
+                    total_matches, my_wins = counts.get(opponent_class, (0, 0))
+                    if total_matches > 0:
                         result.append({
                             'opponent_class_combo': opponent_class,  # 単一クラス名
                             'opponent_selected_class': opponent_class,
-                            'total_matches': stats['total_matches'],
-                            'opponent_wins': stats['opponent_wins'],
-                            'my_wins': stats['my_wins'],
-                            'win_rate': win_rate
+                            'total_matches': total_matches,
+                            'opponent_wins': total_matches - my_wins,
+                            'my_wins': my_wins,
+                            'win_rate': (my_wins / total_matches) * 100
                         })
-                
-                return result
-                
             else:
-                # 2つのクラス組み合わせ
-                # 全クラス組み合わせを生成
-                from config.settings import VALID_CLASSES
-                all_combinations = []
-                
-                # 2つのクラスの組み合わせ（C(7,2) = 21通り）
+                # 2つのクラス組み合わせ（C(7,2) = 21通り × 選択クラス）
+                counts = {(row[0], row[1], row[2]): (row[3] or 0, row[4] or 0) for row in rows}
                 for combo in combinations(VALID_CLASSES, 2):
-                    combo_key = tuple(sorted(combo))
-                    all_combinations.append(combo_key)
-                
-                # 各組み合わせに対して、どちらを選択したかで分ける
-                for combo in all_combinations:
+                    combo = tuple(sorted(combo))
                     for selected_class in combo:
-                        key = (combo, selected_class)
-                        opponent_stats[key] = {
-                            'total_matches': 0,
-                            'opponent_wins': 0,
-                            'my_wins': 0
-                        }
-                
-                # マッチデータを分析
-                for match in matches:
-                    # 指定クラス使用者を特定
-                    my_user_id = None
-                    opponent_user_id = None
-                    opponent_class_combo = None
-                    opponent_selected_class = None
-                    
-                    class1, class2 = selected_classes
-                    class_set = {class1, class2}
-                    
-                    if match.user1_class_a and match.user1_class_b:
-                        user1_class_set = {match.user1_class_a, match.user1_class_b}
-                    else:
-                        user1_class_set = set()
-                    
-                    if match.user2_class_a and match.user2_class_b:
-                        user2_class_set = {match.user2_class_a, match.user2_class_b}
-                    else:
-                        user2_class_set = set()
-                    
-                    if user1_class_set == class_set:
-                        my_user_id = match.user1_id
-                        opponent_user_id = match.user2_id
-                        if match.user2_class_a and match.user2_class_b:
-                            opponent_class_combo = tuple(sorted([match.user2_class_a, match.user2_class_b]))
-                            opponent_selected_class = match.user2_selected_class
-                    elif user2_class_set == class_set:
-                        my_user_id = match.user2_id
-                        opponent_user_id = match.user1_id
-                        if match.user1_class_a and match.user1_class_b:
-                            opponent_class_combo = tuple(sorted([match.user1_class_a, match.user1_class_b]))
-                            opponent_selected_class = match.user1_selected_class
-                    
-                    # 統計を更新
-                    if (opponent_class_combo and opponent_selected_class and 
-                        opponent_class_combo in [combo for combo, _ in opponent_stats.keys()]):
-                        
-                        key = (opponent_class_combo, opponent_selected_class)
-                        if key in opponent_stats:
-                            opponent_stats[key]['total_matches'] += 1
-                            
-                            if match.winner_user_id == my_user_id:
-                                opponent_stats[key]['my_wins'] += 1
-                            else:
-                                opponent_stats[key]['opponent_wins'] += 1
-                
-                # 結果を整形
-                result = []
-                for (combo, selected_class), stats in opponent_stats.items():
-                    if stats['total_matches'] > 0:
-                        combo_str = f"{combo[0]} + {combo[1]}"
-                        win_rate = (stats['my_wins'] / stats['total_matches']) * 100
-                        result.append({
-                            'opponent_class_combo': combo,  # タプル形式で保持
-                            'opponent_selected_class': selected_class,
-                            'total_matches': stats['total_matches'],
-                            'opponent_wins': stats['opponent_wins'],
-                            'my_wins': stats['my_wins'],
-                            'win_rate': win_rate
-                        })
-                
-                return result
+                        total_matches, my_wins = counts.get((combo[0], combo[1], selected_class), (0, 0))
+                        if total_matches > 0:
+                            result.append({
+                                'opponent_class_combo': combo,  # タプル形式で保持
+                                'opponent_selected_class': selected_class,
+                                'total_matches': total_matches,
+                                'opponent_wins': total_matches - my_wins,
+                                'my_wins': my_wins,
+                                'win_rate': (my_wins / total_matches) * 100
+                            })
+            
+            return result
         
-        return self.match_model.safe_execute(_get_analysis_data) or []
\ No newline at end of file
+        return self.match_model.safe_read(_get_analysis_data) or []
@@ -112,13 +112,14 @@ class UserViewModel:
                 'message': "Stay機能の実行中にエラーが発生しました。"
             }
     
-    def update_trust_points(self, discord_id: str, change: int) -> Dict[str, Any]:
-        """信用ポイントを更新"""
+    async def update_trust_points(self, discord_id: str, change: int) -> Dict[str, Any]:
+        """信用ポイントを更新（書き込みタスクで実行）"""
         try:
             from models.user import UserModel
+            from models.writer import get_database_writer
             user_model = UserModel()
             
-            new_points = user_model.update_trust_points(discord_id, change)
+            new_points = await get_database_writer().submit(user_model.update_trust_points, discord_id, change)
             if new_points is not None:
                 return {
                     'success': True,
@@ -11,7 +11,8 @@ from .ranking_view import RankingView, RankingUpdateView, PastRankingButtonView
 from .record_view import (
     CurrentSeasonRecordView, PastSeasonRecordView, Last50RecordView, MatchHistoryPaginatorView,
     DetailedSeasonSelectView, DetailedClassSelectView, DetailedRecordView,
-    DetailedMatchHistoryView, DetailedMatchHistoryPaginatorView, DateRangeInputModal,
+    DetailedMatchHistoryView, DetailedMatchHistoryPaginatorView, DetailedMatchHistoryCursorView,
+    DateRangeInputModal,
     OpponentClassAnalysisView, OpponentAnalysisSeasonSelectView, OpponentAnalysisSeasonSelect,
     OpponentAnalysisDateRangeModal, OpponentAnalysisClassSelectView, OpponentAnalysisClassSelect,
     OpponentAnalysisPaginatorView, Last50MatchesView, MatchOpponentButton
@@ -33,7 +34,8 @@ __all__ = [
     # Record関連
     'CurrentSeasonRecordView', 'PastSeasonRecordView', 'Last50RecordView', 'MatchHistoryPaginatorView',
     'DetailedSeasonSelectView', 'DetailedClassSelectView', 'DetailedRecordView',
-    'DetailedMatchHistoryView', 'DetailedMatchHistoryPaginatorView', 'DateRangeInputModal',
+    'DetailedMatchHistoryView', 'DetailedMatchHistoryPaginatorView', 'DetailedMatchHistoryCursorView',
+    'DateRangeInputModal',
     # 対戦相手クラス分析関連
     'OpponentClassAnalysisView', 'OpponentAnalysisSeasonSelectView', 'OpponentAnalysisSeasonSelect',
     'OpponentAnalysisDateRangeModal', 'OpponentAnalysisClassSelectView', 'OpponentAnalysisClassSelect',
@@ -64,13 +64,11 @@ class ClassSelect(Select):
     
     def __init__(self):
         from models.user import UserModel
+        from models.deck_class import deck_class_registry
         user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
         
-        options = [
-            discord.SelectOption(label=cls, value=f"{cls}_{i}") 
-            for i, cls in enumerate(valid_classes)
-        ]
+        # 作成済みの選択肢を使う（値は "クラス名_番号"）
+        options = deck_class_registry.select_options(indexed_values=True)
         
         super().__init__(
             placeholder="Select your classes...", 
@@ -275,10 +273,12 @@ class ResultView(View):
             
             # ViewModelで結果を処理
             from models.user import UserModel
+            from models.base import unit_of_work
             user_model = UserModel()
             
-            user1_data = user_model.get_user_by_discord_id(str(self.player1_id))
-            user2_data = user_model.get_user_by_discord_id(str(self.player2_id))
+            with unit_of_work(read_only=True):
+                user1_data = user_model.get_user_by_discord_id(str(self.player1_id))
+                user2_data = user_model.get_user_by_discord_id(str(self.player2_id))
             
             if not user1_data or not user2_data:
                 await self.thread.send("ユーザー情報が見つかりませんでした。")
@@ -309,18 +309,28 @@ class ResultView(View):
             user1_selected_class = user1_classes[0] if self.player1_result["class"] == "class_a" else user1_classes[1]
             user2_selected_class = user2_classes[0] if self.player2_result["class"] == "class_a" else user2_classes[1]
             
-            result = self.result_vm.finalize_match_with_classes(
-                user1_id, user2_id, 
-                user1_won, user2_won,
-                user1_rating, user2_rating,
-                user1_selected_class, user2_selected_class
-            )
+            # 試合記録とユーザー統計の更新は書き込みタスクで1トランザクションにまとめる
+            # （どちらかが失敗した場合は両方とも取り消され、例外が送出される）
+            from models.writer import get_database_writer
+            try:
+                result = await get_database_writer().submit(
+                    self.result_vm.finalize_match_with_classes,
+                    user1_id, user2_id, 
+                    user1_won, user2_won,
+                    user1_rating, user2_rating,
+                    user1_selected_class, user2_selected_class
+                )
+            except Exception as e:
+                self.logger.error(f"Error finalizing match: {e}")
+                result = {'success': False, 'message': '試合結果の確定に失敗しました。管理者にお問い合わせください。'}
             
             if result['success']:
                 self.results_locked = True
                 
                 # 最新シーズンでマッチングしたフラグをオンにする
-                user_model.execute_with_session(self._update_season_flag, user1_id, user2_id)
+                await get_database_writer().submit(
+                    user_model.execute_with_session, self._update_season_flag, user1_id, user2_id
+                )
                 
                 # 結果メッセージを作成
                 user1_change = result['user1_rating_change']
@@ -390,7 +400,7 @@ class ResultView(View):
                     await remove_role(player1_member, "試合中")
                 
                 # ペナルティ適用
-                self.cancel_vm.apply_timeout_penalty(self.player1_id)
+                await self.cancel_vm.apply_timeout_penalty(self.player1_id)
                 
                 await self.check_results_by_timeout()
                 
@@ -408,7 +418,7 @@ class ResultView(View):
                     await remove_role(player2_member, "試合中")
                 
                 # ペナルティ適用
-                self.cancel_vm.apply_timeout_penalty(self.player2_id)
+                await self.cancel_vm.apply_timeout_penalty(self.player2_id)
                 
                 await self.check_results_by_timeout()
                 
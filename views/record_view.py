@@ -1,13 +1,29 @@
 import discord
 from discord.ui import View, Button, Select, Modal, InputText
 import asyncio
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Callable
 from sqlalchemy import desc
 from models.user import UserModel
 from models.season import SeasonModel
 from models.match import MatchModel
+from models.head_to_head import HeadToHeadModel
+from models.deck_class import deck_class_registry
+from utils.helpers import rendered_page_cache
 import logging
 
+# 直近50戦の表示設定
+LAST50_MATCH_LIMIT = 50
+LAST50_MATCHES_PER_PAGE = 10
+
+
+def page_signature(matches: List[dict]) -> tuple:
+    """ページの表示内容を識別するキー（試合IDと結果）"""
+    return tuple(
+        (match['id'], match.get('winner_user_id'), match.get('after_user1_rating'), match.get('after_user2_rating'))
+        for match in matches
+    )
+
+
 class CurrentSeasonRecordView(View):
     """現在シーズンの戦績表示View"""
     
@@ -71,31 +87,59 @@ class CurrentSeasonRecordView(View):
             user_id = get_attr(user_data, 'id')
             user_name = get_attr(user_data, 'user_name')
             
-            # 試合履歴を取得
+            # 直近50戦の件数と最初の10戦のみ取得（以降のページは表示時に取得）
             match_model = MatchModel()
-            matches = match_model.get_user_match_history(user_id, 50)
+            total_matches = min(match_model.count_user_matches(user_id), LAST50_MATCH_LIMIT)
             
-            # 完了した試合のみフィルタリング
-            completed_matches = []
-            for match in matches:
-                if (match.get('winner_user_id') is not None and 
-                    match.get('after_user1_rating') is not None and 
-                    match.get('after_user2_rating') is not None):
-                    completed_matches.append(match)
-            
-            if not completed_matches:
+            if total_matches == 0:
                 await interaction.followup.send("完了した試合履歴が見つかりません。", ephemeral=True)
                 return
             
+            page = match_model.get_user_match_history_page(user_id, page_size=LAST50_MATCHES_PER_PAGE)
+            total_pages = (total_matches + LAST50_MATCHES_PER_PAGE - 1) // LAST50_MATCHES_PER_PAGE
+            
             # 最初の10戦を表示
-            await self.display_matches_page(interaction, completed_matches, 0, user_data)
+            await self.display_matches_page(interaction, page, 0, total_pages, user_data)
             
         except Exception as e:
             logging.error(f"Error showing last 50 matches: {e}")
             await interaction.followup.send("直近50戦の取得中にエラーが発生しました。", ephemeral=True)
     
-    async def display_matches_page(self, interaction: discord.Interaction, matches: List[dict], 
-                                  page: int, user_data: dict):
+    async def display_matches_page(self, interaction: discord.Interaction, page: dict,
+                                  page_index: int, total_pages: int, user_data: dict, update: bool = False):
+        def get_attr(data, attr_name, default=None):
+            if isinstance(data, dict):
+                return data.get(attr_name, default)
+            else:
+                return getattr(data, attr_name, default)
+        
+        user_id = get_attr(user_data, 'id')
+        page_matches = page['matches']
+        
+        # Viewを作成（ページネーションとマッチボタン）
+        view = Last50MatchesView(page, page_index, total_pages, user_data)
+        
+        # Embedは共有キャッシュ経由で描画
+        cache_key = (
+            'last50_matches', interaction.guild.id if interaction.guild else None,
+            user_id, page_index, total_pages, page_signature(page_matches)
+        )
+        embed = rendered_page_cache.get_or_render(
+            cache_key,
+            lambda: self.render_matches_page(interaction.guild, page_matches, page_index, total_pages, user_data)
+        )
+        
+        # メッセージを送信または編集
+        if not update:
+            # 初回送信
+            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+        else:
+            # ページ更新
+            await interaction.edit_original_response(embed=embed, view=view)
+    
+    def render_matches_page(self, guild: Optional[discord.Guild], page_matches: List[dict],
+                            page_index: int, total_pages: int, user_data: dict) -> discord.Embed:
+        """直近50戦の1ページ分のEmbedを作成"""
         user_model = UserModel()
         
         def get_attr(data, attr_name, default=None):
@@ -106,34 +150,30 @@ class CurrentSeasonRecordView(View):
         
         user_id = get_attr(user_data, 'id')
         user_name = get_attr(user_data, 'user_name')
-        
-        # ページング設定
-        matches_per_page = 10
-        start_idx = page * matches_per_page
-        end_idx = min(start_idx + matches_per_page, len(matches))
-        page_matches = matches[start_idx:end_idx]
+        start_idx = page_index * LAST50_MATCHES_PER_PAGE
         
         # Embedを作成
-        total_pages = (len(matches) + matches_per_page - 1) // matches_per_page
         embed = discord.Embed(
-            title=f"{user_name} の直近50戦 (Page {page + 1}/{total_pages})",
+            title=f"{user_name} の直近50戦 (Page {page_index + 1}/{total_pages})",
             description="各試合のボタンを押すとその相手との全対戦履歴が表示されます",
             color=discord.Color.blue()
         )
         
-        # Viewを作成（ページネーションとマッチボタン）
-        view = Last50MatchesView(matches, page, user_data, page_matches)
+        # ページ内の対戦相手をまとめて取得
+        opponents = user_model.get_users_by_ids(
+            match['user2_id'] if match['user1_id'] == user_id else match['user1_id'] for match in page_matches
+        )
         
         # 各試合の情報を表示
         for i, match in enumerate(page_matches):
             if match['user1_id'] == user_id:
-                opponent_data = user_model.get_user_by_id(match['user2_id'])
+                opponent_data = opponents.get(match['user2_id'])
                 user_rating_change = match.get('user1_rating_change', 0)
                 after_rating = match.get('after_user1_rating')
                 user_won = match['winner_user_id'] == user_id
                 user_selected_class = match.get('user1_selected_class', 'Unknown')
             else:
-                opponent_data = user_model.get_user_by_id(match['user1_id'])
+                opponent_data = opponents.get(match['user1_id'])
                 user_rating_change = match.get('user2_rating_change', 0)
                 after_rating = match.get('after_user2_rating')
                 user_won = match['winner_user_id'] == user_id
@@ -147,7 +187,7 @@ class CurrentSeasonRecordView(View):
                 opponent_username = None
                 if opponent_discord_id:
                     try:
-                        discord_member = interaction.guild.get_member(int(opponent_discord_id))
+                        discord_member = guild.get_member(int(opponent_discord_id))
                         if discord_member:
                             opponent_username = discord_member.name  # @username の username部分
                     except (ValueError, AttributeError):
@@ -186,39 +226,33 @@ class CurrentSeasonRecordView(View):
                 inline=True
             )
         
-        # メッセージを送信または編集
-        if page == 0:
-            # 初回送信
-            await interaction.followup.send(embed=embed, view=view, ephemeral=True)
-        else:
-            # ページ更新
-            await interaction.edit_original_response(embed=embed, view=view)
+        return embed
 
 class Last50MatchesView(View):
+    """直近50戦のページネーションView（現在ページの試合と前後のキーのみ保持）"""
     
-    def __init__(self, all_matches: List[dict], current_page: int, user_data: dict, page_matches: List[dict]):
+    def __init__(self, page: dict, current_page: int, total_pages: int, user_data: dict):
         super().__init__(timeout=600)
-        self.all_matches = all_matches
         self.current_page = current_page
+        self.total_pages = total_pages
         self.user_data = user_data
-        self.page_matches = page_matches
+        self.first_cursor = page['first_cursor']
+        self.last_cursor = page['last_cursor']
+        page_matches = page['matches']
         
         # ページネーションボタン
-        matches_per_page = 10
-        total_pages = (len(all_matches) + matches_per_page - 1) // matches_per_page
-        
-        if current_page > 0:
+        if current_page > 0 and page['has_newer']:
             prev_button = Button(label="⬅️ 前へ", style=discord.ButtonStyle.secondary, row=0)
             prev_button.callback = self.previous_page
             self.add_item(prev_button)
         
-        if current_page < total_pages - 1:
+        if current_page < total_pages - 1 and page['has_older']:
             next_button = Button(label="➡️ 次へ", style=discord.ButtonStyle.secondary, row=0)
             next_button.callback = self.next_page
             self.add_item(next_button)
         
         # 各試合のボタンを追加（最大10個）
-        start_idx = current_page * matches_per_page
+        start_idx = current_page * LAST50_MATCHES_PER_PAGE
         for i, match in enumerate(page_matches):
             button_num = start_idx + i + 1
             button = MatchOpponentButton(
@@ -229,21 +263,32 @@ class Last50MatchesView(View):
             )
             self.add_item(button)
     
+    def _user_id(self):
+        if isinstance(self.user_data, dict):
+            return self.user_data.get('id')
+        return getattr(self.user_data, 'id', None)
+    
+    async def _show_page(self, interaction: discord.Interaction, page_index: int, cursor, newer: bool):
+        """指定方向のページを取得して表示"""
+        page = MatchModel().get_user_match_history_page(
+            self._user_id(), page_size=LAST50_MATCHES_PER_PAGE, cursor=cursor, newer=newer
+        )
+        if not page['matches']:
+            return
+        view = CurrentSeasonRecordView()
+        await view.display_matches_page(interaction, page, page_index, self.total_pages, self.user_data, update=True)
+    
     async def previous_page(self, interaction: discord.Interaction):
         """前のページへ"""
         if self.current_page > 0:
             await interaction.response.defer()
-            view = CurrentSeasonRecordView()
-            await view.display_matches_page(interaction, self.all_matches, self.current_page - 1, self.user_data)
+            await self._show_page(interaction, self.current_page - 1, self.first_cursor, newer=True)
     
     async def next_page(self, interaction: discord.Interaction):
         """次のページへ"""
-        matches_per_page = 10
-        total_pages = (len(self.all_matches) + matches_per_page - 1) // matches_per_page
-        if self.current_page < total_pages - 1:
+        if self.current_page < self.total_pages - 1:
             await interaction.response.defer()
-            view = CurrentSeasonRecordView()
-            await view.display_matches_page(interaction, self.all_matches, self.current_page + 1, self.user_data)
+            await self._show_page(interaction, self.current_page + 1, self.last_cursor, newer=False)
 
 class MatchOpponentButton(Button):
     
@@ -253,6 +298,25 @@ class MatchOpponentButton(Button):
         self.user_data = user_data
         self.logger = logging.getLogger(self.__class__.__name__)
     
+    def _count_vs_record(self, match_model: MatchModel, user_id: int, opponent_id: int) -> Dict:
+        """集計テーブルが利用できない場合に対戦履歴から成績を数える"""
+        user_wins = 0
+        opponent_wins = 0
+        for match in match_model.get_user_vs_user_history(user_id, opponent_id):
+            if (match.get('winner_user_id') is None or
+                match.get('after_user1_rating') is None or
+                match.get('after_user2_rating') is None):
+                continue
+            if match['winner_user_id'] == user_id:
+                user_wins += 1
+            elif match['winner_user_id'] == opponent_id:
+                opponent_wins += 1
+        return {
+            'user_wins': user_wins,
+            'opponent_wins': opponent_wins,
+            'total_matches': user_wins + opponent_wins
+        }
+    
     async def callback(self, interaction: discord.Interaction):
         try:
             await interaction.response.defer(ephemeral=True)
@@ -301,139 +365,127 @@ class MatchOpponentButton(Button):
                 opponent_display = opponent_name
                 title = f"{user_name} vs {opponent_display}"
 
-            # 全シーズンの対戦履歴を取得
+            # 全シーズンの対戦成績を集計テーブルから取得（対戦履歴はページ表示時に取得）
             match_model = MatchModel()
-            vs_matches = match_model.get_user_vs_user_history(user_id, opponent_id)
-            
-            if not vs_matches:
-                await interaction.followup.send(
-                    f"**{user_name}** vs **{opponent_name}** の対戦履歴はありません。",
-                    ephemeral=True
-                )
-                return
+            record = HeadToHeadModel().get_record(user_id, opponent_id)
+            if record is None:
+                record = self._count_vs_record(match_model, user_id, opponent_id)
             
-            # 完了した試合のみフィルタリング
-            completed_matches = []
-            for match in vs_matches:
-                if (match.get('winner_user_id') is not None and 
-                    match.get('after_user1_rating') is not None and 
-                    match.get('after_user2_rating') is not None):
-                    completed_matches.append(match)
+            user_wins = record['user_wins']
+            opponent_wins = record['opponent_wins']
+            total_matches = record['total_matches']
             
-            if not completed_matches:
+            if total_matches == 0:
                 await interaction.followup.send(
-                    f"**{user_name}** vs **{opponent_name}** の完了した対戦はありません。",
+                    f"**{user_name}** vs **{opponent_name}** の対戦履歴はありません。",
                     ephemeral=True
                 )
                 return
             
-            # 勝敗を集計
-            user_wins = 0
-            opponent_wins = 0
-            
-            for match in completed_matches:
-                if match['winner_user_id'] == user_id:
-                    user_wins += 1
-                elif match['winner_user_id'] == opponent_id:
-                    opponent_wins += 1
-            
-            total_matches = user_wins + opponent_wins
             user_win_rate = (user_wins / total_matches) * 100
             
-            # 対戦履歴をEmbedで表示
-            embeds = []
-            current_embed = None
+            # 対戦履歴はページごとに取得してEmbedを描画
             matches_per_embed = 8
+            total_pages = (total_matches + matches_per_embed - 1) // matches_per_embed
+            
+            def fetch_page(cursor, newer):
+                return match_model.get_user_vs_user_history_page(
+                    user_id, opponent_id, page_size=matches_per_embed, cursor=cursor, newer=newer
+                )
             
-            for i, match in enumerate(completed_matches):
-                if i % matches_per_embed == 0:
-                    page_num = i // matches_per_embed + 1
-                    total_pages = (len(completed_matches) + matches_per_embed - 1) // matches_per_embed
+            def render_page(page_matches, page_index):
+                description = f"{user_wins}勝{opponent_wins}敗(勝率{user_win_rate:.0f}%) | Page {page_index + 1}/{total_pages}"
+                
+                current_embed = discord.Embed(
+                    title=title,
+                    description=description,
+                    color=discord.Color.purple()
+                )
+                
+                for match in page_matches:
+                    # ユーザーの視点で情報を整理
+                    if match['user1_id'] == user_id:
+                        # ユーザーがuser1
+                        user_rating_change = match.get('user1_rating_change', 0)
+                        opponent_rating_change = match.get('user2_rating_change', 0)
+                        user_after_rating = match.get('after_user1_rating')
+                        opponent_after_rating = match.get('after_user2_rating')
+                        user_won = match['winner_user_id'] == user_id
+                        user_selected_class = match.get('user1_selected_class', 'Unknown')
+                        opponent_selected_class = match.get('user2_selected_class', 'Unknown')
+                    else:
+                        # ユーザーがuser2
+                        user_rating_change = match.get('user2_rating_change', 0)
+                        opponent_rating_change = match.get('user1_rating_change', 0)
+                        user_after_rating = match.get('after_user2_rating')
+                        opponent_after_rating = match.get('after_user1_rating')
+                        user_won = match['winner_user_id'] == user_id
+                        user_selected_class = match.get('user2_selected_class', 'Unknown')
+                        opponent_selected_class = match.get('user1_selected_class', 'Unknown')
                     
-                    description = f"{user_wins}勝{opponent_wins}敗(勝率{user_win_rate:.0f}%) | Page {page_num}/{total_pages}"
+                    # None値チェックとデフォルト値設定
+                    if user_rating_change is None:
+                        user_rating_change = 0
+                    if opponent_rating_change is None:
+                        opponent_rating_change = 0
+                    if user_after_rating is None:
+                        user_after_rating = 0
+                    if opponent_after_rating is None:
+                        opponent_after_rating = 0
                     
-                    current_embed = discord.Embed(
-                        title=title,
-                        description=description,
-                        color=discord.Color.purple()
+                    # クラス情報の整理
+                    if not user_selected_class:
+                        user_selected_class = 'Unknown'
+                    if not opponent_selected_class:
+                        opponent_selected_class = 'Unknown'
+                    
+                    # 試合結果の表示
+                    result_emoji = "🔵" if user_won else "🔴"
+                    result_text = "勝利" if user_won else "敗北"
+                    user_rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
+                    opponent_rating_change_str = f"{opponent_rating_change:+.0f}" if opponent_rating_change != 0 else "±0"
+                    
+                    # 日付のフォーマット
+                    match_date = match.get('match_date', '')
+                    if match_date:
+                        match_date = match_date[:16]
+                    else:
+                        match_date = 'Unknown'
+                    
+                    # シーズン情報
+                    season_name = match.get('season_name', 'Unknown')
+                    
+                    field_value = (
+                        f"**結果：** {result_text}\n"
+                        f"**シーズン：** {season_name}\n"
+                        f"**あなたのクラス：** {user_selected_class}\n"
+                        f"**相手のクラス：** {opponent_selected_class}\n"
+                        f"**レート変動：**\n"
+                        f"├ あなた： {user_rating_change_str} (→ {user_after_rating:.0f})\n"
+                        f"└ 相手： {opponent_rating_change_str} (→ {opponent_after_rating:.0f})"
+                    )
+                    
+                    current_embed.add_field(
+                        name=f"{result_emoji} {match_date}",
+                        value=field_value,
+                        inline=False
                     )
-                    embeds.append(current_embed)
-                
-                # ユーザーの視点で情報を整理
-                if match['user1_id'] == user_id:
-                    # ユーザーがuser1
-                    user_rating_change = match.get('user1_rating_change', 0)
-                    opponent_rating_change = match.get('user2_rating_change', 0)
-                    user_after_rating = match.get('after_user1_rating')
-                    opponent_after_rating = match.get('after_user2_rating')
-                    user_won = match['winner_user_id'] == user_id
-                    user_selected_class = match.get('user1_selected_class', 'Unknown')
-                    opponent_selected_class = match.get('user2_selected_class', 'Unknown')
-                else:
-                    # ユーザーがuser2
-                    user_rating_change = match.get('user2_rating_change', 0)
-                    opponent_rating_change = match.get('user1_rating_change', 0)
-                    user_after_rating = match.get('after_user2_rating')
-                    opponent_after_rating = match.get('after_user1_rating')
-                    user_won = match['winner_user_id'] == user_id
-                    user_selected_class = match.get('user2_selected_class', 'Unknown')
-                    opponent_selected_class = match.get('user1_selected_class', 'Unknown')
-                
-                # None値チェックとデフォルト値設定
-                if user_rating_change is None:
-                    user_rating_change = 0
-                if opponent_rating_change is None:
-                    opponent_rating_change = 0
-                if user_after_rating is None:
-                    user_after_rating = 0
-                if opponent_after_rating is None:
-                    opponent_after_rating = 0
-                
-                # クラス情報の整理
-                if not user_selected_class:
-                    user_selected_class = 'Unknown'
-                if not opponent_selected_class:
-                    opponent_selected_class = 'Unknown'
-                
-                # 試合結果の表示
-                result_emoji = "🔵" if user_won else "🔴"
-                result_text = "勝利" if user_won else "敗北"
-                user_rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
-                opponent_rating_change_str = f"{opponent_rating_change:+.0f}" if opponent_rating_change != 0 else "±0"
-                
-                # 日付のフォーマット
-                match_date = match.get('match_date', '')
-                if match_date:
-                    match_date = match_date[:16]
-                else:
-                    match_date = 'Unknown'
-                
-                # シーズン情報
-                season_name = match.get('season_name', 'Unknown')
-                
-                field_value = (
-                    f"**結果：** {result_text}\n"
-                    f"**シーズン：** {season_name}\n"
-                    f"**あなたのクラス：** {user_selected_class}\n"
-                    f"**相手のクラス：** {opponent_selected_class}\n"
-                    f"**レート変動：**\n"
-                    f"├ あなた： {user_rating_change_str} (→ {user_after_rating:.0f})\n"
-                    f"└ 相手： {opponent_rating_change_str} (→ {opponent_after_rating:.0f})"
-                )
                 
-                current_embed.add_field(
-                    name=f"{result_emoji} {match_date}",
-                    value=field_value,
-                    inline=False
-                )
+                return current_embed
+            
+            view = MatchHistoryPaginatorView(
+                fetch_page, render_page, total_pages,
+                ('vs_history', interaction.guild.id if interaction.guild else None, user_id, opponent_id,
+                 user_wins, opponent_wins)
+            )
+            embed = view.load_page()
             
             # 最初のEmbedを送信
-            if embeds:
-                message = await interaction.followup.send(embed=embeds[0], ephemeral=True)
+            if embed:
+                message = await interaction.followup.send(embed=embed, ephemeral=True)
                 
                 # 複数ページがある場合はページネーションを追加
-                if len(embeds) > 1:
-                    view = MatchHistoryPaginatorView(embeds)
+                if total_pages > 1:
                     await message.edit(view=view)
             
         except Exception as e:
@@ -441,28 +493,66 @@ class MatchOpponentButton(Button):
             await interaction.followup.send("対戦履歴の取得中にエラーが発生しました。", ephemeral=True)
 
 class MatchHistoryPaginatorView(View):
+    """試合履歴のページネーションView（ページはキーセットで取得し、表示時に描画）
     
-    def __init__(self, embeds: List[discord.Embed]):
+    保持するのは現在のページ番号と前後のキーのみ。fetch_page(cursor, newer) でページを取得し、
+    render_page(matches, page_index) で作成したEmbedは共有キャッシュに保存される。
+    """
+    
+    def __init__(self, fetch_page: Callable[[Optional[tuple], bool], dict],
+                 render_page: Callable[[List[dict], int], discord.Embed],
+                 total_pages: int, cache_key: tuple):
         super().__init__(timeout=600)
-        self.embeds = embeds
+        self.fetch_page = fetch_page
+        self.render_page = render_page
+        self.total_pages = total_pages
+        self.cache_key = cache_key
         self.current = 0
+        self.first_cursor = None
+        self.last_cursor = None
+        self.has_newer = False
+        self.has_older = False
         self.logger = logging.getLogger(self.__class__.__name__)
     
+    def load_page(self, cursor: Optional[tuple] = None, newer: bool = False) -> Optional[discord.Embed]:
+        """ページを取得してEmbedを返す（該当する試合がない場合は None）"""
+        page = self.fetch_page(cursor, newer)
+        page_matches = page['matches']
+        if not page_matches:
+            return None
+        
+        self.first_cursor = page['first_cursor']
+        self.last_cursor = page['last_cursor']
+        self.has_newer = page['has_newer']
+        self.has_older = page['has_older']
+        
+        page_index = self.current
+        return rendered_page_cache.get_or_render(
+            (self.cache_key, page_index, self.total_pages, page_signature(page_matches)),
+            lambda: self.render_page(page_matches, page_index)
+        )
+    
     @discord.ui.button(label="⬅️ 前へ", style=discord.ButtonStyle.primary)
     async def previous(self, button: Button, interaction: discord.Interaction):
-        if self.current > 0:
+        if self.current > 0 and self.has_newer:
             self.current -= 1
-            await interaction.response.edit_message(embed=self.embeds[self.current], view=self)
-        else:
-            await interaction.response.defer()
+            embed = self.load_page(self.first_cursor, newer=True)
+            if embed:
+                await interaction.response.edit_message(embed=embed, view=self)
+                return
+            self.current += 1
+        await interaction.response.defer()
     
     @discord.ui.button(label="➡️ 次へ", style=discord.ButtonStyle.primary)
     async def next(self, button: Button, interaction: discord.Interaction):
-        if self.current < len(self.embeds) - 1:
+        if self.current < self.total_pages - 1 and self.has_older:
             self.current += 1
-            await interaction.response.edit_message(embed=self.embeds[self.current], view=self)
-        else:
-            await interaction.response.defer()
+            embed = self.load_page(self.last_cursor)
+            if embed:
+                await interaction.response.edit_message(embed=embed, view=self)
+                return
+            self.current -= 1
+        await interaction.response.defer()
     
     async def on_timeout(self):
         try:
@@ -471,6 +561,110 @@ class MatchHistoryPaginatorView(View):
         except Exception as e:
             self.logger.error(f"Error in on_timeout: {e}")
 
+def build_detailed_match_history_embed(user_id: int, user_name: str, matches: List[Dict],
+                                       page_num: int, total_pages: int, total_matches: int) -> discord.Embed:
+    """詳細対戦履歴の1ページ分のEmbedを作成"""
+    user_model = UserModel()
+    
+    def get_attr(data, attr_name, default=None):
+        if isinstance(data, dict):
+            return data.get(attr_name, default)
+        else:
+            return getattr(data, attr_name, default)
+    
+    current_embed = discord.Embed(
+        title=f"{user_name} の全対戦履歴 (Page {page_num}/{total_pages})",
+        description=f"総試合数: {total_matches}試合",
+        color=discord.Color.green()
+    )
+    
+    # ページ内の対戦相手をまとめて取得
+    opponents = user_model.get_users_by_ids(
+        match['user2_id'] if match['user1_id'] == user_id else match['user1_id'] for match in matches
+    )
+    
+    for match in matches:
+        # 対戦相手と自分の情報を取得
+        if match['user1_id'] == user_id:
+            # 自分がuser1
+            opponent_data = opponents.get(match['user2_id'])
+            user_rating_change = match.get('user1_rating_change', 0)
+            after_rating = match.get('after_user1_rating')
+            user_won = match['winner_user_id'] == user_id
+        
+            # クラス情報
+            my_class_a = match.get('user1_class_a', 'Unknown')
+            my_class_b = match.get('user1_class_b', 'Unknown')
+            my_selected_class = match.get('user1_selected_class', 'Unknown')
+            opp_class_a = match.get('user2_class_a', 'Unknown')
+            opp_class_b = match.get('user2_class_b', 'Unknown')
+            opp_selected_class = match.get('user2_selected_class', 'Unknown')
+        else:
+            # 自分がuser2
+            opponent_data = opponents.get(match['user1_id'])
+            user_rating_change = match.get('user2_rating_change', 0)
+            after_rating = match.get('after_user2_rating')
+            user_won = match['winner_user_id'] == user_id
+        
+            # クラス情報
+            my_class_a = match.get('user2_class_a', 'Unknown')
+            my_class_b = match.get('user2_class_b', 'Unknown')
+            my_selected_class = match.get('user2_selected_class', 'Unknown')
+            opp_class_a = match.get('user1_class_a', 'Unknown')
+            opp_class_b = match.get('user1_class_b', 'Unknown')
+            opp_selected_class = match.get('user1_selected_class', 'Unknown')
+        
+        opponent_name = get_attr(opponent_data, 'user_name', 'Unknown') if opponent_data else 'Unknown'
+        
+        # None値チェックとデフォルト値設定
+        if user_rating_change is None:
+            user_rating_change = 0
+        if after_rating is None:
+            after_rating = 0
+        
+        # 試合結果の表示
+        result_emoji = "🔵" if user_won else "🔴"
+        result_text = "勝利" if user_won else "敗北"
+        rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
+        
+        # クラス情報の整理
+        my_classes = f"{my_class_a or 'Unknown'} / {my_class_b or 'Unknown'}"
+        opp_classes = f"{opp_class_a or 'Unknown'} / {opp_class_b or 'Unknown'}"
+        
+        # 選択クラスの表示（Noneや空文字列の場合はUnknown）
+        my_selected = my_selected_class if my_selected_class else 'Unknown'
+        opp_selected = opp_selected_class if opp_selected_class else 'Unknown'
+        
+        # 日付のフォーマット
+        match_date = match.get('match_date', '')
+        if match_date:
+            match_date = match_date[:16]
+        else:
+            match_date = 'Unknown'
+        
+        # シーズン情報
+        season_name = match.get('season_name', 'Unknown')
+        
+        field_value = (
+            f"**対戦相手:** {opponent_name}\n"
+            f"**結果:** {result_text}\n"
+            f"**レート変動:** {rating_change_str} (→ {after_rating:.0f})\n"
+            f"**シーズン:** {season_name}\n"
+            f"**あなたの登録クラス:** {my_classes}\n"
+            f"**あなたの選択クラス:** {my_selected}\n"
+            f"**相手の登録クラス:** {opp_classes}\n"
+            f"**相手の選択クラス:** {opp_selected}"
+        )
+        
+        current_embed.add_field(
+            name=f"{result_emoji} {match_date}",
+            value=field_value,
+            inline=False
+        )
+    
+    return current_embed
+
+
 class DetailedMatchHistoryView(View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -504,125 +698,21 @@ class DetailedMatchHistoryView(View):
             user_id = get_attr(user_data, 'id')
             user_name = get_attr(user_data, 'user_name')
             
-            # 全試合履歴を取得
+            # 完了した試合の件数と最新ページのみ取得（以降のページは表示時に取得）
             match_model = MatchModel()
-            matches = match_model.get_user_match_history(user_id, limit=None)  # 全履歴
-            
-            # 完了した試合のみフィルタリング
-            completed_matches = []
-            for match in matches:
-                if (match.get('winner_user_id') is not None and 
-                    match.get('after_user1_rating') is not None and 
-                    match.get('after_user2_rating') is not None):
-                    completed_matches.append(match)
+            total_matches = match_model.count_user_matches(user_id)
             
-            if not completed_matches:
+            if total_matches == 0:
                 await interaction.followup.send("完了した試合履歴が見つかりません。", ephemeral=True)
                 return
             
-            # Embedを作成して詳細な試合履歴を表示
-            embeds = []
-            current_embed = None
-            matches_per_embed = 8  # クラス情報が多いので1ページあたりの試合数を減らす
-            
-            for i, match in enumerate(completed_matches):
-                # 8試合ごとに新しいEmbedを作成
-                if i % matches_per_embed == 0:
-                    page_num = i // matches_per_embed + 1
-                    total_pages = (len(completed_matches) + matches_per_embed - 1) // matches_per_embed
-                    current_embed = discord.Embed(
-                        title=f"{user_name} の全対戦履歴 (Page {page_num}/{total_pages})",
-                        description=f"総試合数: {len(completed_matches)}試合",
-                        color=discord.Color.green()
-                    )
-                    embeds.append(current_embed)
-                
-                # 対戦相手と自分の情報を取得
-                if match['user1_id'] == user_id:
-                    # 自分がuser1
-                    opponent_data = user_model.get_user_by_id(match['user2_id'])
-                    user_rating_change = match.get('user1_rating_change', 0)
-                    after_rating = match.get('after_user1_rating')
-                    user_won = match['winner_user_id'] == user_id
-                    
-                    # クラス情報
-                    my_class_a = match.get('user1_class_a', 'Unknown')
-                    my_class_b = match.get('user1_class_b', 'Unknown')
-                    my_selected_class = match.get('user1_selected_class', 'Unknown')
-                    opp_class_a = match.get('user2_class_a', 'Unknown')
-                    opp_class_b = match.get('user2_class_b', 'Unknown')
-                    opp_selected_class = match.get('user2_selected_class', 'Unknown')
-                else:
-                    # 自分がuser2
-                    opponent_data = user_model.get_user_by_id(match['user1_id'])
-                    user_rating_change = match.get('user2_rating_change', 0)
-                    after_rating = match.get('after_user2_rating')
-                    user_won = match['winner_user_id'] == user_id
-                    
-                    # クラス情報
-                    my_class_a = match.get('user2_class_a', 'Unknown')
-                    my_class_b = match.get('user2_class_b', 'Unknown')
-                    my_selected_class = match.get('user2_selected_class', 'Unknown')
-                    opp_class_a = match.get('user1_class_a', 'Unknown')
-                    opp_class_b = match.get('user1_class_b', 'Unknown')
-                    opp_selected_class = match.get('user1_selected_class', 'Unknown')
-                
-                opponent_name = get_attr(opponent_data, 'user_name', 'Unknown') if opponent_data else 'Unknown'
-                
-                # None値チェックとデフォルト値設定
-                if user_rating_change is None:
-                    user_rating_change = 0
-                if after_rating is None:
-                    after_rating = 0
-                
-                # 試合結果の表示
-                result_emoji = "🔵" if user_won else "🔴"
-                result_text = "勝利" if user_won else "敗北"
-                rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
-                
-                # クラス情報の整理
-                my_classes = f"{my_class_a or 'Unknown'} / {my_class_b or 'Unknown'}"
-                opp_classes = f"{opp_class_a or 'Unknown'} / {opp_class_b or 'Unknown'}"
-                
-                # 選択クラスの表示（Noneや空文字列の場合はUnknown）
-                my_selected = my_selected_class if my_selected_class else 'Unknown'
-                opp_selected = opp_selected_class if opp_selected_class else 'Unknown'
-                
-                # 日付のフォーマット
-                match_date = match.get('match_date', '')
-                if match_date:
-                    match_date = match_date[:16]
-                else:
-                    match_date = 'Unknown'
-                
-                # シーズン情報
-                season_name = match.get('season_name', 'Unknown')
-                
-                field_value = (
-                    f"**対戦相手:** {opponent_name}\n"
-                    f"**結果:** {result_text}\n"
-                    f"**レート変動:** {rating_change_str} (→ {after_rating:.0f})\n"
-                    f"**シーズン:** {season_name}\n"
-                    f"**あなたの登録クラス:** {my_classes}\n"
-                    f"**あなたの選択クラス:** {my_selected}\n"
-                    f"**相手の登録クラス:** {opp_classes}\n"
-                    f"**相手の選択クラス:** {opp_selected}"
-                )
-                
-                current_embed.add_field(
-                    name=f"{result_emoji} {match_date}",
-                    value=field_value,
-                    inline=False
-                )
+            view = DetailedMatchHistoryCursorView(user_id, user_name, total_matches)
+            embed = view.load_page()
+            message = await interaction.followup.send(embed=embed, ephemeral=True)
             
-            # 最初のEmbedを送信
-            if embeds:
-                message = await interaction.followup.send(embed=embeds[0], ephemeral=True)
-                
-                # 複数ページがある場合はページネーションを追加
-                if len(embeds) > 1:
-                    view = DetailedMatchHistoryPaginatorView(embeds)
-                    await message.edit(view=view)
+            # 複数ページがある場合はページネーションを追加
+            if view.total_pages > 1:
+                await message.edit(view=view)
             
         except Exception as e:
             logging.getLogger(self.__class__.__name__).error(f"Error displaying detailed match history: {e}")
@@ -646,13 +736,8 @@ class RecordClassSelect(Select):
         self.season_id = season_id
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # データベースからクラス名を取得
-        user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
-        
-        # 全クラスを一番上に置く
-        options = [discord.SelectOption(label="全クラス", value="all_classes")]
-        options.extend([discord.SelectOption(label=cls, value=cls) for cls in valid_classes])
+        # 作成済みの選択肢を使う（全クラスを一番上に置く）
+        options = deck_class_registry.select_options(include_all=True)
         
         super().__init__(
             placeholder="クラスを選択してください...", 
@@ -816,121 +901,128 @@ class Last50RecordButton(Button):
             user_id = get_attr(user_data, 'id')
             user_name = get_attr(user_data, 'user_name')
             
-            # 試合履歴を取得（50戦のみ）
-            matches = match_model.get_user_match_history(user_id, 50)
-            
-            # 完了した試合のみフィルタリング
-            completed_matches = []
-            for match in matches:
-                if (match.get('winner_user_id') is not None and
-                    match.get('after_user1_rating') is not None and
-                    match.get('after_user2_rating') is not None):
-                    completed_matches.append(match)
+            # 直近50戦の件数のみ取得し、各ページは表示時に取得・描画
+            total_matches = min(match_model.count_user_matches(user_id), LAST50_MATCH_LIMIT)
             
-            if not completed_matches:
+            if total_matches == 0:
                 await interaction.followup.send("完了した試合履歴が見つかりません。", ephemeral=True)
                 return
             
-            # Embedを作成して試合履歴を表示
-            embeds = []
-            current_embed = None
             matches_per_embed = 10
+            total_pages = (total_matches + matches_per_embed - 1) // matches_per_embed
+            guild = interaction.guild
             
-            for i, match in enumerate(completed_matches):
-                # 10試合ごとに新しいEmbedを作成
-                if i % matches_per_embed == 0:
-                    current_embed = discord.Embed(
-                        title=f"{user_name} の直近50戦 (Page {i//matches_per_embed + 1})",
-                        color=discord.Color.blue()
-                    )
-                    embeds.append(current_embed)
+            def fetch_page(cursor, newer):
+                return match_model.get_user_match_history_page(
+                    user_id, page_size=matches_per_embed, cursor=cursor, newer=newer
+                )
+            
+            def render_page(page_matches, page_index):
+                current_embed = discord.Embed(
+                    title=f"{user_name} の直近50戦 (Page {page_index + 1})",
+                    color=discord.Color.blue()
+                )
                 
-                # 対戦相手名を取得
-                if match['user1_id'] == user_id:
-                    opponent_data = user_model.get_user_by_id(match['user2_id'])
-                    user_rating_change = match.get('user1_rating_change', 0)
-                    after_rating = match.get('after_user1_rating')
-                    before_rating = match.get('before_user1_rating')
-                    user_won = match['winner_user_id'] == user_id
-                else:
-                    opponent_data = user_model.get_user_by_id(match['user1_id'])
-                    user_rating_change = match.get('user2_rating_change', 0)
-                    after_rating = match.get('after_user2_rating')
-                    before_rating = match.get('before_user2_rating')
-                    user_won = match['winner_user_id'] == user_id
+                # ページ内の対戦相手をまとめて取得
+                opponents = user_model.get_users_by_ids(
+                    match['user2_id'] if match['user1_id'] == user_id else match['user1_id']
+                    for match in page_matches
+                )
                 
-                if opponent_data:
-                    opponent_name = get_attr(opponent_data, 'user_name', 'Unknown')
-                    opponent_discord_id = get_attr(opponent_data, 'discord_id', None)
+                for match in page_matches:
+                    # 対戦相手名を取得
+                    if match['user1_id'] == user_id:
+                        opponent_data = opponents.get(match['user2_id'])
+                        user_rating_change = match.get('user1_rating_change', 0)
+                        after_rating = match.get('after_user1_rating')
+                        before_rating = match.get('before_user1_rating')
+                        user_won = match['winner_user_id'] == user_id
+                    else:
+                        opponent_data = opponents.get(match['user1_id'])
+                        user_rating_change = match.get('user2_rating_change', 0)
+                        after_rating = match.get('after_user2_rating')
+                        before_rating = match.get('before_user2_rating')
+                        user_won = match['winner_user_id'] == user_id
+                    
+                    if opponent_data:
+                        opponent_name = get_attr(opponent_data, 'user_name', 'Unknown')
+                        opponent_discord_id = get_attr(opponent_data, 'discord_id', None)
                     
-                    # Discord Username を取得
-                    opponent_username = None
-                    if opponent_discord_id:
-                        try:
-                            discord_member = interaction.guild.get_member(int(opponent_discord_id))
-                            if discord_member:
-                                opponent_username = discord_member.name
-                        except (ValueError, AttributeError):
-                            pass
+                        # Discord Username を取得
+                        opponent_username = None
+                        if opponent_discord_id:
+                            try:
+                                discord_member = guild.get_member(int(opponent_discord_id))
+                                if discord_member:
+                                    opponent_username = discord_member.name
+                            except (ValueError, AttributeError):
+                                pass
                     
-                    if opponent_username:
-                        opponent_display = f"{opponent_name} (@{opponent_username})"
+                        if opponent_username:
+                            opponent_display = f"{opponent_name} (@{opponent_username})"
+                        else:
+                            opponent_display = opponent_name
                     else:
-                        opponent_display = opponent_name
-                else:
-                    opponent_display = 'Unknown'
-                
-                # None値チェックとデフォルト値設定
-                if user_rating_change is None:
-                    user_rating_change = 0
-                if after_rating is None:
-                    after_rating = 0
-                if before_rating is None:
-                    before_rating = 0
-                
-                # 試合結果の表示
-                result_emoji = "🔵" if user_won else "🔴"
-                result_text = "勝利" if user_won else "敗北"
-                rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
-                
-                # 使用クラス情報を取得（新しいデータベース構造対応）
-                if match['user1_id'] == user_id:
-                    user_class = match.get('user1_selected_class', 'Unknown')
-                else:
-                    user_class = match.get('user2_selected_class', 'Unknown')
-                
-                # Noneや空文字列の場合はUnknownに設定
-                if not user_class:
-                    user_class = 'Unknown'
-                
-                field_value = (
-                    f"vs {opponent_display}\n"
-                    f"結果: {result_text}\n"
-                    f"使用クラス: {user_class}\n"
-                    f"レート変動: {rating_change_str}\n"
-                    f"試合後レート: {after_rating:.0f}"
-                )
-                
-                # 日付のフォーマット
-                match_date = match.get('match_date', '')
-                if match_date:
-                    match_date = match_date[:16]
-                else:
-                    match_date = 'Unknown'
+                        opponent_display = 'Unknown'
+                    
+                    # None値チェックとデフォルト値設定
+                    if user_rating_change is None:
+                        user_rating_change = 0
+                    if after_rating is None:
+                        after_rating = 0
+                    if before_rating is None:
+                        before_rating = 0
+                    
+                    # 試合結果の表示
+                    result_emoji = "🔵" if user_won else "🔴"
+                    result_text = "勝利" if user_won else "敗北"
+                    rating_change_str = f"{user_rating_change:+.0f}" if user_rating_change != 0 else "±0"
+                    
+                    # 使用クラス情報を取得（新しいデータベース構造対応）
+                    if match['user1_id'] == user_id:
+                        user_class = match.get('user1_selected_class', 'Unknown')
+                    else:
+                        user_class = match.get('user2_selected_class', 'Unknown')
+                    
+                    # Noneや空文字列の場合はUnknownに設定
+                    if not user_class:
+                        user_class = 'Unknown'
+                    
+                    field_value = (
+                        f"vs {opponent_display}\n"
+                        f"結果: {result_text}\n"
+                        f"使用クラス: {user_class}\n"
+                        f"レート変動: {rating_change_str}\n"
+                        f"試合後レート: {after_rating:.0f}"
+                    )
+                    
+                    # 日付のフォーマット
+                    match_date = match.get('match_date', '')
+                    if match_date:
+                        match_date = match_date[:16]
+                    else:
+                        match_date = 'Unknown'
+                    
+                    current_embed.add_field(
+                        name=f"{result_emoji} {match_date}",
+                        value=field_value,
+                        inline=False
+                    )
                 
-                current_embed.add_field(
-                    name=f"{result_emoji} {match_date}",
-                    value=field_value,
-                    inline=False
-                )
+                return current_embed
+            
+            view = MatchHistoryPaginatorView(
+                fetch_page, render_page, total_pages,
+                ('last50_record', guild.id if guild else None, user_id)
+            )
+            embed = view.load_page()
             
             # 最初のEmbedを送信
-            if embeds:
-                message = await interaction.followup.send(embed=embeds[0], ephemeral=True)
+            if embed:
+                message = await interaction.followup.send(embed=embed, ephemeral=True)
                 
                 # 複数ページがある場合はページネーションを追加
-                if len(embeds) > 1:
-                    view = MatchHistoryPaginatorView(embeds)
+                if total_pages > 1:
                     await message.edit(view=view)
             
         except Exception as e:
@@ -1154,11 +1246,8 @@ class OpponentAnalysisClassSelect(Select):
         self.date_range = date_range
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # データベースからクラス名を取得
-        user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
-        
-        options = [discord.SelectOption(label=cls, value=cls) for cls in valid_classes]
+        # 作成済みの選択肢を使う
+        options = deck_class_registry.select_options()
         
         super().__init__(
             placeholder="クラスを選択してください（1つまたは2つ）...", 
@@ -1233,209 +1322,18 @@ class OpponentAnalysisClassSelect(Select):
     async def get_opponent_class_analysis_data(self, selected_classes: List[str], 
                                              season_id: Optional[int], season_name: Optional[str],
                                              date_range: Optional[tuple]) -> List[Dict]:
-        def _get_analysis_data(session):
-            from config.database import MatchHistory
-            from sqlalchemy import or_, and_
-            from itertools import combinations
-            
-            # ベースクエリ：完了した試合のみ
-            query = session.query(MatchHistory).filter(
-                MatchHistory.winner_user_id.isnot(None)
-            )
-            
-            # 期間フィルター
-            if season_name:
-                query = query.filter(MatchHistory.season_name == season_name)
-            elif date_range:
-                start_date, end_date = date_range
-                query = query.filter(
-                    and_(
-                        MatchHistory.match_date >= start_date,
-                        MatchHistory.match_date <= end_date
-                    )
-                )
-            
-            # 指定クラス組み合わせに関する対戦のみ
-            if len(selected_classes) == 1:
-                # 単体クラス - 修正版
-                class_name = selected_classes[0]
-                query = query.filter(
-                    or_(
-                        # user1が指定クラスを選択
-                        MatchHistory.user1_selected_class == class_name,
-                        # user2が指定クラスを選択
-                        MatchHistory.user2_selected_class == class_name
-                    )
-                )
-            else:
-                # 2つのクラス組み合わせ（既存のまま）
-                class1, class2 = selected_classes
-                query = query.filter(
-                    or_(
-                        # user1が指定クラス組み合わせを登録
-                        and_(
-                            or_(
-                                and_(MatchHistory.user1_class_a == class1, MatchHistory.user1_class_b == class2),
-                                and_(MatchHistory.user1_class_a == class2, MatchHistory.user1_class_b == class1)
-                            )
-                        ),
-                        # user2が指定クラス組み合わせを登録
-                        and_(
-                            or_(
-                                and_(MatchHistory.user2_class_a == class1, MatchHistory.user2_class_b == class2),
-                                and_(MatchHistory.user2_class_a == class2, MatchHistory.user2_class_b == class1)
-                            )
-                        )
-                    )
-                )
-            
-            matches = query.all()
-            
-            opponent_stats = {}
-            
-            if len(selected_classes) == 1:
-                # 単一クラス選択時：7種類のクラスそれぞれとの戦績を集計
-                from config.settings import VALID_CLASSES
-                class_name = selected_classes[0]
-                
-                # 各クラスに対して統計を初期化
-                for opponent_class in VALID_CLASSES:
-                    opponent_stats[opponent_class] = {
-                        'total_matches': 0,
-                        'opponent_wins': 0,
-                        'my_wins': 0
-                    }
-                
-                # マッチデータを分析
-                for match in matches:
-                    # 指定クラス使用者を特定
-                    my_user_id = None
-                    opponent_user_id = None
-                    opponent_selected_class = None
-                    
-                    if match.user1_selected_class == class_name:
-                        my_user_id = match.user1_id
-                        opponent_user_id = match.user2_id
-                        opponent_selected_class = match.user2_selected_class
-                    elif match.user2_selected_class == class_name:
-                        my_user_id = match.user2_id
-                        opponent_user_id = match.user1_id
-                        opponent_selected_class = match.user1_selected_class
-                    
-                    # 統計を更新
-                    if opponent_selected_class and opponent_selected_class in opponent_stats:
-                        opponent_stats[opponent_selected_class]['total_matches'] += 1
-                        
-                        if match.winner_user_id == my_user_id:
-                            opponent_stats[opponent_selected_class]['my_wins'] += 1
-                        else:
-                            opponent_stats[opponent_selected_class]['opponent_wins'] += 1
-                
-                # 結果を整形
-                result = []
-                for opponent_class, stats in opponent_stats.items():
-                    if stats['total_matches'] > 0:  # 対戦があったクラスのみ
-                        win_rate = (stats['my_wins'] / stats['total_matches']) * 100
-                        result.append({
-                            'opponent_class_combo': opponent_class,  # 単一クラス名
-                            'opponent_selected_class': opponent_class,
-                            'total_matches': stats['total_matches'],
-                            'opponent_wins': stats['opponent_wins'],
-                            'my_wins': stats['my_wins'],
-                            'win_rate': win_rate
-                        })
-                
-                return result
-                
-            else:
-                # 2つのクラス組み合わせ（既存の処理をそのまま維持）
-                # 全クラス組み合わせを生成
-                from config.settings import VALID_CLASSES
-                all_combinations = []
-                
-                # 2つのクラスの組み合わせ（C(7,2) = 21通り）
-                for combo in combinations(VALID_CLASSES, 2):
-                    combo_key = tuple(sorted(combo))
-                    all_combinations.append(combo_key)
-                
-                # 各組み合わせに対して、どちらを選択したかで分ける
-                for combo in all_combinations:
-                    for selected_class in combo:
-                        key = (combo, selected_class)
-                        opponent_stats[key] = {
-                            'total_matches': 0,
-                            'opponent_wins': 0,
-                            'my_wins': 0
-                        }
-                
-                # マッチデータを分析（既存の処理）
-                for match in matches:
-                    # 指定クラス使用者を特定
-                    my_user_id = None
-                    opponent_user_id = None
-                    opponent_class_combo = None
-                    opponent_selected_class = None
-                    
-                    class1, class2 = selected_classes
-                    class_set = {class1, class2}
-                    
-                    if match.user1_class_a and match.user1_class_b:
-                        user1_class_set = {match.user1_class_a, match.user1_class_b}
-                    else:
-                        user1_class_set = set()
-                    
-                    if match.user2_class_a and match.user2_class_b:
-                        user2_class_set = {match.user2_class_a, match.user2_class_b}
-                    else:
-                        user2_class_set = set()
-                    
-                    if user1_class_set == class_set:
-                        my_user_id = match.user1_id
-                        opponent_user_id = match.user2_id
-                        if match.user2_class_a and match.user2_class_b:
-                            opponent_class_combo = tuple(sorted([match.user2_class_a, match.user2_class_b]))
-                            opponent_selected_class = match.user2_selected_class
-                    elif user2_class_set == class_set:
-                        my_user_id = match.user2_id
-                        opponent_user_id = match.user1_id
-                        if match.user1_class_a and match.user1_class_b:
-                            opponent_class_combo = tuple(sorted([match.user1_class_a, match.user1_class_b]))
-                            opponent_selected_class = match.user1_selected_class
-                    
-                    # 統計を更新
-                    if (opponent_class_combo and opponent_selected_class and 
-                        opponent_class_combo in [combo for combo, _ in opponent_stats.keys()]):
-                        
-                        key = (opponent_class_combo, opponent_selected_class)
-                        if key in opponent_stats:
-                            opponent_stats[key]['total_matches'] += 1
-                            
-                            if match.winner_user_id == my_user_id:
-                                opponent_stats[key]['my_wins'] += 1
-                            else:
-                                opponent_stats[key]['opponent_wins'] += 1
-                
-                # 結果を整形（既存の処理）
-                result = []
-                for (combo, selected_class), stats in opponent_stats.items():
-                    if stats['total_matches'] > 0:
-                        combo_str = f"{combo[0]} + {combo[1]}"
-                        win_rate = (stats['my_wins'] / stats['total_matches']) * 100
-                        result.append({
-                            'opponent_class_combo': combo_str,
-                            'opponent_selected_class': selected_class,
-                            'total_matches': stats['total_matches'],
-                            'opponent_wins': stats['opponent_wins'],
-                            'my_wins': stats['my_wins'],
-                            'win_rate': win_rate
-                        })
-                
-                return result
+        """投げられたクラスの分析データを取得（クラス相性集計を使用）"""
+        from viewmodels.record_vm import RecordViewModel
+        record_vm = RecordViewModel()
+        analysis_data = record_vm._get_analysis_data(selected_classes, season_name, date_range)
         
-        # データベースアクセス
-        from models.match import MatchModel
-        match_model = MatchModel()
-        return match_model.safe_execute(_get_analysis_data) or []
+        # 組み合わせ選択時は表示用に "A + B" 形式の文字列へ変換
+        if len(selected_classes) > 1:
+            for item in analysis_data:
+                combo = item['opponent_class_combo']
+                item['opponent_class_combo'] = f"{combo[0]} + {combo[1]}"
+        
+        return analysis_data
     
     def create_analysis_embeds(self, analysis_data: List[Dict], class_desc: str, 
                             period_desc: str, sort_desc: str) -> List[discord.Embed]:
@@ -1981,13 +1879,8 @@ class SingleClassSelect(Select):
         self.date_range = date_range
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # データベースからクラス名を取得
-        user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
-        
-        # 全クラスオプションを追加
-        options = [discord.SelectOption(label="全クラス", value="all_classes")]
-        options.extend([discord.SelectOption(label=cls, value=cls) for cls in valid_classes])
+        # 作成済みの選択肢を使う（全クラスオプションを含む）
+        options = deck_class_registry.select_options(include_all=True)
         
         super().__init__(
             placeholder="クラスを1つ選択してください...", 
@@ -2039,11 +1932,8 @@ class DualClassSelect(Select):
         self.date_range = date_range
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # データベースからクラス名を取得
-        user_model = UserModel()
-        valid_classes = user_model.get_valid_classes()
-        
-        options = [discord.SelectOption(label=cls, value=cls) for cls in valid_classes]
+        # 作成済みの選択肢を使う
+        options = deck_class_registry.select_options()
         
         super().__init__(
             placeholder="クラスを2つ選択してください...", 
@@ -2078,6 +1968,37 @@ class DualClassSelect(Select):
             pass
 
 
+class DetailedMatchHistoryCursorView(MatchHistoryPaginatorView):
+    """詳細対戦履歴のページネーションView（ページを表示時にキーセットで取得）"""
+    
+    MATCHES_PER_PAGE = 8  # クラス情報が多いので1ページあたりの試合数を減らす
+    
+    def __init__(self, user_id: int, user_name: str, total_matches: int):
+        match_model = MatchModel()
+        total_pages = max(1, (total_matches + self.MATCHES_PER_PAGE - 1) // self.MATCHES_PER_PAGE)
+        
+        def fetch_page(cursor, newer):
+            return match_model.get_user_match_history_page(
+                user_id, page_size=self.MATCHES_PER_PAGE, cursor=cursor, newer=newer
+            )
+        
+        def render_page(page_matches, page_index):
+            return build_detailed_match_history_embed(
+                user_id, user_name, page_matches,
+                page_index + 1, max(total_pages, page_index + 1), total_matches
+            )
+        
+        super().__init__(fetch_page, render_page, total_pages, ('detailed_history', user_id, total_matches))
+    
+    @discord.ui.button(label="🔢 ページ情報", style=discord.ButtonStyle.secondary)
+    async def page_info(self, button: Button, interaction: discord.Interaction):
+        """現在のページ情報を表示"""
+        await interaction.response.send_message(
+            f"現在のページ: {self.current + 1} / {self.total_pages}", 
+            ephemeral=True
+        )
+
+
 class DetailedMatchHistoryPaginatorView(View):
     """詳細対戦履歴のページネーションView"""
     
@@ -335,7 +335,8 @@ class PremiumModal(Modal):
                     return
             
             # Premium日数を追加
-            success = user_model.add_premium_days(user_id, days)
+            from models.writer import get_database_writer
+            success = await get_database_writer().submit(user_model.add_premium_days, user_id, days)
             if not success:
                 await interaction.response.send_message(
                     "Premium機能の追加に失敗しました。", 
@@ -382,7 +383,8 @@ class PremiumExtendConfirmView(View):
             user_id = str(interaction.user.id)
             
             # Premium日数を追加
-            success = user_model.add_premium_days(user_id, self.add_days)
+            from models.writer import get_database_writer
+            success = await get_database_writer().submit(user_model.add_premium_days, user_id, self.add_days)
             if not success:
                 await interaction.response.edit_message(
                     content="Premium機能の追加に失敗しました。", 
@@ -546,9 +548,14 @@ class ProfileButton(Button):
         try:
             # 遅延インポートで循環インポートを回避
             from models.user import UserModel
+            from models.base import unit_of_work
             user_model = UserModel()
             
-            user_instance = user_model.get_user_by_discord_id(user_id)
+            # プロフィール表示に必要な読み取りを1つのセッションで行う
+            with unit_of_work(read_only=True):
+                user_instance = user_model.get_user_by_discord_id(user_id)
+                rank = user_model.get_user_rank(user_id) if user_instance else None
+                premium_days = user_model.get_premium_days(user_id) if user_instance else 0
             
             if user_instance:
                 # ユーザー情報の取得（辞書形式）
@@ -562,8 +569,7 @@ class ProfileButton(Button):
                 # 効果的レート
                 effective_rating = max(user_instance['rating'], user_instance['stayed_rating'] or 0)
                 
-                # ユーザーの順位を計算
-                rank = user_model.get_user_rank(user_id)
+                # ユーザーの順位
                 if rank is None:
                     rank = "未参加です"
                 
@@ -571,7 +577,6 @@ class ProfileButton(Button):
                 name_change_status = "利用可能" if user_instance.get('name_change_available', True) else "使用済み（来月1日復活）"
                 
                 # Premium状態の確認
-                premium_days = user_model.get_premium_days(user_id)
                 if premium_days > 0:
                     premium_status = f"✨ Premium（残り{premium_days}日）"
                 else:
@@ -792,8 +797,11 @@ class StayConfirmView(View):
             from models.user import UserModel
             user_model = UserModel()
             
-            # ViewModelでStay機能を実行
-            result = user_model.toggle_stay_flag(self.user_instance['discord_id'])
+            # 書き込みタスクでStay機能を実行
+            from models.writer import get_database_writer
+            result = await get_database_writer().submit(
+                user_model.toggle_stay_flag, self.user_instance['discord_id']
+            )
             
             if result:
                 await interaction.response.edit_message(
@@ -874,7 +882,14 @@ class AchievementButton(Button):
             pass
     
     def get_user_achievements(self, user) -> Optional[str]:
-        """ユーザーの実績を取得"""
+        """ユーザーの実績を取得（シーズンごとの読み取りを1つのセッションで行う）"""
+        from models.base import unit_of_work
+        
+        with unit_of_work(read_only=True):
+            return self._get_user_achievements(user)
+    
+    def _get_user_achievements(self, user) -> Optional[str]:
+        """ユーザーの実績を集計して表示用の文字列にする"""
         try:
             # 遅延インポートで循環インポートを回避
             from models.user import UserModel